@@ -6,15 +6,22 @@ from random import randint
 from flask import Flask, request
 import logging
 
+from metricas_config import BoundedInstrument
+
 # Acquire a tracer
 tracer = trace.get_tracer("diceroller.tracer")
 # Acquire a meter.
 meter = metrics.get_meter("diceroller.meter")
 
 # Now create a counter instrument to make measurements with
-roll_counter = meter.create_counter(
-    "dice.rolls",
-    description="The number of rolls by roll value",
+# (o opentelemetry-instrument monta o MeterProvider, então não há Views: o BoundedInstrument aplica a
+# allowlist de metricas_config.ATTRIBUTE_ALLOWLISTS, só `roll.value`, e limita as combinações)
+roll_counter = BoundedInstrument(
+    meter.create_counter(
+        "dice.rolls",
+        description="The number of rolls by roll value",
+    ),
+    max_attribute_sets=100,
 )
 
 app = Flask(__name__)
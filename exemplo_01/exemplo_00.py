@@ -1,33 +1,40 @@
 from opentelemetry.metrics import get_meter
-from opentelemetry.sdk.metrics import MeterProvider
-from opentelemetry.sdk.metrics.export import (
-    ConsoleMetricExporter,
-    PeriodicExportingMetricReader,
-)
-from opentelemetry.sdk.resources import SERVICE_NAME, Resource
 
-# Configurar recurso do OpenTelemetry
-resource = Resource(
-    attributes={
-        SERVICE_NAME: "pipeline-etl",
+import os
+from time import sleep
+
+# Bootstrap de telemetria compartilhado (OTLP em lote para o collector), em src/telemetria.py
+from metricas_config import DELTA_TEMPORALITY, BoundedInstrument, metric_views
+from metricas_prometheus import PrometheusPullReader, start_http_server
+from telemetria import configure_telemetry
+
+# Com PROMETHEUS_PORT=<porta>, as métricas também ficam em /metrics para o Prometheus (pull)
+prometheus_reader = PrometheusPullReader() if os.getenv("PROMETHEUS_PORT") else None
+
+# Configurar recurso e provedores do OpenTelemetry (métricas via OTLP para o compose otel-lgtm)
+_, provider = configure_telemetry(
+    "pipeline-etl",
+    resource_attributes={
         "pipeline_id": "etl_sales_2025",
         "environment": "production",
         "team": "data_engineering",
-    }
+    },
+    metric_readers=[prometheus_reader] if prometheus_reader else [],
+    views=metric_views(),  # allowlist de atributos (status, stage) e buckets explícitos
+    metric_temporality=DELTA_TEMPORALITY,  # o OTLP recebe só o que mudou em cada intervalo
 )
 
-# Configurar leitor de métricas e provedor
-reader = PeriodicExportingMetricReader(ConsoleMetricExporter())
-provider = MeterProvider(resource=resource, metric_readers=[reader])
-
 # Criar o 'meter'
 meter = get_meter("etl_pipeline_meter", meter_provider=provider)
 
-# Criar contador para rastrear o número de registros processados
-counter = meter.create_counter(
-    name="records_processed",
-    description="Número de registros processados pelo pipeline ETL.",
-    unit="1",  # Contagem
+# Criar contador para rastrear o número de registros processados (no máximo 500 combinações de atributos)
+counter = BoundedInstrument(
+    meter.create_counter(
+        name="records_processed",
+        description="Número de registros processados pelo pipeline ETL.",
+        unit="1",  # Contagem
+    ),
+    max_attribute_sets=500,
 )
 
 # Função: Extração de dados
@@ -67,3 +74,13 @@ def run_pipeline():
 
 # Executar pipeline
 run_pipeline()
+
+# O endpoint só existe enquanto o processo está vivo: espera os scrapes até Ctrl+C
+if prometheus_reader:
+    server = start_http_server(prometheus_reader, port=int(os.environ["PROMETHEUS_PORT"]))
+    print(f"Métricas em http://localhost:{os.environ['PROMETHEUS_PORT']}/metrics (Ctrl+C para sair)")
+    try:
+        while True:
+            sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -18,18 +18,12 @@ from requests import get
 
 from opentelemetry import trace
 from opentelemetry.propagate import inject
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import (
-    BatchSpanProcessor,
-    ConsoleSpanExporter,
-)
 
-trace.set_tracer_provider(TracerProvider())
-tracer = trace.get_tracer_provider().get_tracer(__name__)
+# Bootstrap de telemetria compartilhado (OTLP em lote para o collector), em src/telemetria.py
+from telemetria import configure_telemetry
 
-trace.get_tracer_provider().add_span_processor(
-    BatchSpanProcessor(ConsoleSpanExporter())
-)
+configure_telemetry("exemplo-02-client")
+tracer = trace.get_tracer_provider().get_tracer(__name__)
 
 
 assert len(argv) == 2
@@ -1,15 +1,10 @@
 from opentelemetry import trace
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import (
-    BatchSpanProcessor,
-    ConsoleSpanExporter,
-)
 
-# Configuração do tracer provider
-provider = TracerProvider()
-processor = BatchSpanProcessor(ConsoleSpanExporter())
-provider.add_span_processor(processor)
-trace.set_tracer_provider(provider)
+# Bootstrap de telemetria compartilhado (OTLP em lote para o collector), em src/telemetria.py
+from telemetria import configure_telemetry
+
+# Configuração do tracer provider (BatchSpanProcessor + exporter OTLP)
+configure_telemetry("exemplo-02-instrumentation")
 
 # Criação do tracer
 tracer = trace.get_tracer("my.tracer.name")
@@ -1,29 +1,14 @@
 from opentelemetry import trace, metrics
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import (
-    BatchSpanProcessor,
-    ConsoleSpanExporter,
-)
-from opentelemetry.sdk.metrics import MeterProvider
-from opentelemetry.sdk.metrics.export import (
-    ConsoleMetricExporter,
-    PeriodicExportingMetricReader,
-)
 
-# Configuração do tracer provider
-tracer_provider = TracerProvider()
-span_processor = BatchSpanProcessor(ConsoleSpanExporter())
-tracer_provider.add_span_processor(span_processor)
-trace.set_tracer_provider(tracer_provider)
+# Bootstrap de telemetria compartilhado (OTLP em lote para o collector), em src/telemetria.py
+from telemetria import configure_telemetry
+
+# Configuração dos providers de traces e métricas (OTLP em lote)
+configure_telemetry("exemplo-02-instrumentation-metrics")
 
 # Criação do tracer
 tracer = trace.get_tracer("my.tracer.name")
 
-# Configuração do meter provider para métricas
-metric_reader = PeriodicExportingMetricReader(ConsoleMetricExporter())
-meter_provider = MeterProvider(metric_readers=[metric_reader])
-metrics.set_meter_provider(meter_provider)
-
 # Criação do meter
 meter = metrics.get_meter("my.meter.name")
 
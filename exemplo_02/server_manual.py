@@ -16,26 +16,19 @@ from flask import Flask, request
 
 from opentelemetry.instrumentation.wsgi import collect_request_attributes
 from opentelemetry.propagate import extract
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import (
-    BatchSpanProcessor,
-    ConsoleSpanExporter,
-)
 from opentelemetry.trace import (
     SpanKind,
     get_tracer_provider,
-    set_tracer_provider,
 )
 
+# Bootstrap de telemetria compartilhado (OTLP em lote para o collector), em src/telemetria.py
+from telemetria import configure_telemetry
+
 app = Flask(__name__)
 
-set_tracer_provider(TracerProvider())
+configure_telemetry("exemplo-02-server")
 tracer = get_tracer_provider().get_tracer(__name__)
 
-get_tracer_provider().add_span_processor(
-    BatchSpanProcessor(ConsoleSpanExporter())
-)
-
 
 @app.route("/server_request")
 def server_request():
@@ -15,24 +15,22 @@
 from flask import Flask, request
 
 from opentelemetry.instrumentation.flask import FlaskInstrumentor
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import (
-    BatchSpanProcessor,
-    ConsoleSpanExporter,
-)
-from opentelemetry.trace import get_tracer_provider, set_tracer_provider
-
-set_tracer_provider(TracerProvider())
-get_tracer_provider().add_span_processor(
-    BatchSpanProcessor(ConsoleSpanExporter())
-)
+
+# Bootstrap de telemetria compartilhado (OTLP em lote para o collector), em src/telemetria.py
+from metricas_prometheus import PrometheusPullReader, register_metrics_route
+from telemetria import configure_telemetry
+
+# Métricas em OTLP (push) e em /metrics para o Prometheus (pull), no mesmo MeterProvider
+prometheus_reader = PrometheusPullReader()
+configure_telemetry("exemplo-02-server", metric_readers=[prometheus_reader])
 
 instrumentor = FlaskInstrumentor()
 
 app = Flask(__name__)
 
 # instrumentor.instrument_app(app)
-instrumentor.instrument_app(app, excluded_urls="/server_request")
+instrumentor.instrument_app(app, excluded_urls="/server_request,/metrics")
+register_metrics_route(app, prometheus_reader)
 
 
 @app.route("/server_request")
@@ -1,13 +1,16 @@
 import logfire
 
-from pipeline_2 import etl_pipeline
+# Auto-tracing adaptativo (limite ajustado ao orçamento de CPU), em src/rastreamento_adaptativo.py
+from rastreamento_adaptativo import install_adaptive_auto_tracing
 
 
 # Configuração do logfire
 logfire.configure()
-logfire.install_auto_tracing(modules=['app'], min_duration=0.01)
+# Começa em 10 ms como antes, mas sobe o limite (ou desliga funções) se passar de 2% da CPU
+install_adaptive_auto_tracing(modules=['pipeline_2'], min_duration=0.01, cpu_budget=0.02)
 
-# Importa a função principal do módulo app
+# Importa a função principal do módulo instrumentado (depois do install, para o import hook pegar)
+from pipeline_2 import etl_pipeline  # noqa: E402
 
 if __name__ == "__main__":
     etl_pipeline()
@@ -0,0 +1,201 @@
+"""Tail sampling em processo para os traces de cada iteração do pipeline.
+
+Cada iteração gera um trace completo (iteração, três etapas, spans de SQL e HTTP e vários logs),
+e quase todos são iguais. O `TailSamplingProcessor` segura os spans de cada trace até o span raiz
+terminar e só então decide:
+- mantém se algum span teve erro (status ERROR ou log de nível error do Logfire);
+- mantém se o span raiz (a iteração) foi mais lento que o percentil `slow_percentile` das últimas
+  iterações com o mesmo nome. Só o raiz é julgado: a duração dele já inclui as etapas, e comparar
+  cada filho (SQL, HTTP, logs) com o próprio p95 manteria boa parte dos traces normais;
+- mantém uma fração aleatória `baseline_rate` dos demais, para termos o "normal" como referência;
+- descarta o resto antes de chegar no exporter.
+
+A memória é limitada: no máximo `max_traces` traces e `max_spans_per_trace` spans por trace em buffer;
+ao passar disso (ou de `max_trace_age_s`, verificado a cada span), o trace mais antigo é decidido com
+o que se sabe até ali. A decisão dos últimos `max_traces` traces fica guardada, então spans que
+terminam depois (inclusive o raiz de um trace despejado) seguem a mesma decisão em vez de virar um
+trace parcial novo. As janelas de duração são no máximo `max_windows` nomes de raiz; os excedentes
+dividem uma única janela.
+
+Uso com Logfire enviando para um collector OTLP (no `main_logfire_07_lag.py`, com `TAIL_SAMPLING=1`):
+
+    processor = TailSamplingProcessor(BatchSpanProcessor(OTLPSpanExporter()))
+    logfire.configure(send_to_logfire=False, additional_span_processors=[processor])
+"""
+import random
+import threading
+from collections import OrderedDict, deque
+from time import monotonic
+
+from opentelemetry import metrics
+from opentelemetry.metrics import Observation
+from opentelemetry.sdk.trace import SpanProcessor
+from opentelemetry.trace import StatusCode
+
+LOGFIRE_ERROR_LEVEL = 17  # logfire.level_num de logfire.error
+OVERFLOW_WINDOW = "__overflow__"
+_DROPPED = frozenset(("dropped", "evicted_dropped"))
+
+_meter = metrics.get_meter("pipeline_etl.tail_sampling")
+trace_decisions = _meter.create_counter(
+    "tail_sampling_traces",
+    unit="1",
+    description="Traces decididos pelo tail sampler, por decisão",
+)
+
+
+class _TraceBuffer:
+    __slots__ = ("spans", "keep_reason", "dropped_spans", "created")
+
+    def __init__(self):
+        self.spans = []
+        self.keep_reason = None
+        self.dropped_spans = 0
+        self.created = monotonic()
+
+
+class _DurationWindow:
+    """Janela das últimas durações de um nome de span, com o percentil recalculado de tempos em tempos."""
+
+    __slots__ = ("values", "threshold", "pending")
+
+    def __init__(self, size):
+        self.values = deque(maxlen=size)
+        self.threshold = None
+        self.pending = 0
+
+    def add(self, duration, percentile, min_samples, refresh_every):
+        self.values.append(duration)
+        self.pending += 1
+        if len(self.values) >= min_samples and (self.threshold is None or self.pending >= refresh_every):
+            ordered = sorted(self.values)
+            self.threshold = ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+            self.pending = 0
+
+
+class TailSamplingProcessor(SpanProcessor):
+    """Span processor que repassa ao `downstream` apenas os traces lentos, com erro ou da amostra base."""
+
+    def __init__(
+        self,
+        downstream,
+        slow_percentile=95,
+        baseline_rate=0.01,
+        max_traces=1_000,
+        max_spans_per_trace=500,
+        max_trace_age_s=300,
+        window_size=1_000,
+        min_samples=50,
+        max_windows=100,
+    ):
+        self.downstream = downstream
+        self.slow_percentile = slow_percentile
+        self.baseline_rate = baseline_rate
+        self.max_traces = max_traces
+        self.max_spans_per_trace = max_spans_per_trace
+        self.max_trace_age_s = max_trace_age_s
+        self.window_size = window_size
+        self.min_samples = min_samples
+        self.max_windows = max_windows
+        self._traces = OrderedDict()
+        self._decided = OrderedDict()  # trace_id -> decisão, para spans que terminam depois dela
+        self._windows = {}
+        self._lock = threading.Lock()
+        _meter.create_observable_gauge(
+            "tail_sampling_buffered_spans",
+            callbacks=[lambda options: [Observation(self.buffered_spans())]],
+            unit="1",
+            description="Spans em buffer aguardando o fim do span raiz",
+        )
+
+    def on_start(self, span, parent_context=None):
+        # O downstream ainda vê todo início de span (processadores que anotam atributos dependem disso);
+        # só o on_end passa pela decisão de amostragem
+        self.downstream.on_start(span, parent_context=parent_context)
+
+    def _is_slow(self, span):
+        """Compara a duração do span raiz com o percentil das últimas iterações do mesmo nome."""
+        name = span.name if span.name in self._windows or len(self._windows) < self.max_windows else OVERFLOW_WINDOW
+        window = self._windows.get(name)
+        if window is None:
+            window = self._windows[name] = _DurationWindow(self.window_size)
+        duration = span.end_time - span.start_time
+        slow = window.threshold is not None and duration > window.threshold
+        window.add(duration, self.slow_percentile, self.min_samples, refresh_every=max(1, self.window_size // 10))
+        return slow
+
+    def on_end(self, span):
+        ready, late = [], None
+        with self._lock:
+            ready.extend(self._evict(monotonic()))
+            trace_id = span.context.trace_id
+            decision = self._decided.get(trace_id)
+            if decision is not None:
+                # Trace já decidido (despejado, ou span que terminou depois do raiz): segue a decisão
+                late = None if decision in _DROPPED else span
+            else:
+                buffer = self._traces.get(trace_id)
+                if buffer is None:
+                    buffer = self._traces[trace_id] = _TraceBuffer()
+                if len(buffer.spans) < self.max_spans_per_trace:
+                    buffer.spans.append(span)
+                else:
+                    buffer.dropped_spans += 1
+                attributes = span.attributes or {}
+                is_root = span.parent is None or span.parent.is_remote
+                if span.status.status_code is StatusCode.ERROR or attributes.get("logfire.level_num", 0) >= LOGFIRE_ERROR_LEVEL:
+                    buffer.keep_reason = buffer.keep_reason or "error"
+                if is_root and attributes.get("logfire.span_type") != "log" and self._is_slow(span):
+                    buffer.keep_reason = buffer.keep_reason or "slow"
+                if is_root:
+                    del self._traces[trace_id]
+                    ready.append((trace_id, buffer, self._remember(trace_id, self._decide(buffer))))
+        self._forward(ready)
+        if late is not None:
+            self.downstream.on_end(late)
+
+    def _decide(self, buffer):
+        if buffer.keep_reason is not None:
+            return buffer.keep_reason
+        return "baseline" if random.random() < self.baseline_rate else "dropped"
+
+    def _remember(self, trace_id, decision):
+        self._decided[trace_id] = decision
+        if len(self._decided) > self.max_traces:
+            self._decided.popitem(last=False)
+        return decision
+
+    def _evict(self, now):
+        """Decide traces antigos demais ou além do limite de memória (chamado com o lock)."""
+        evicted = []
+        while self._traces:
+            trace_id, buffer = next(iter(self._traces.items()))
+            if len(self._traces) <= self.max_traces and now - buffer.created <= self.max_trace_age_s:
+                break
+            del self._traces[trace_id]
+            decision = buffer.keep_reason or "dropped"
+            evicted.append((trace_id, buffer, self._remember(trace_id, f"evicted_{decision}")))
+        return evicted
+
+    def _forward(self, ready):
+        for _, buffer, decision in ready:
+            trace_decisions.add(1, {"decision": decision})
+            if decision in _DROPPED:
+                continue
+            for span in buffer.spans:
+                self.downstream.on_end(span)
+
+    def buffered_spans(self):
+        """Quantidade de spans atualmente em buffer."""
+        with self._lock:
+            return sum(len(buffer.spans) for buffer in self._traces.values())
+
+    def shutdown(self):
+        with self._lock:
+            pending = [(trace_id, buffer, buffer.keep_reason or "dropped") for trace_id, buffer in self._traces.items()]
+            self._traces.clear()
+        self._forward(pending)
+        self.downstream.shutdown()
+
+    def force_flush(self, timeout_millis=30_000):
+        return self.downstream.force_flush(timeout_millis)
@@ -0,0 +1,273 @@
+"""Análise offline de traces do pipeline: caminho crítico, self-time, percentis e regressões.
+
+Lê arquivos OTLP JSON (o que o `fileexporter` do collector grava: um `{"resourceSpans": [...]}`
+por linha, ou um único documento) e, para cada iteração (span raiz → extract/transform/load →
+filhos HTTP/SQL), calcula:
+- caminho crítico: a cadeia de spans que determina a duração da iteração, com o tempo que cada
+  um contribui (o trecho em que nenhum filho no caminho estava rodando);
+- self-time: duração do span menos o tempo coberto pelos filhos;
+- p50/p95/p99 de duração e self-time por nome de span.
+
+`comparar` faz o mesmo para duas execuções (dois conjuntos de arquivos) ou duas janelas de tempo
+do mesmo conjunto, e aponta os spans cujo p50/p95 piorou mais que `--limite`. Sai com código 1
+quando encontra regressão, para poder rodar em CI.
+
+Uso:
+    python analise_traces.py resumo traces.jsonl
+    python analise_traces.py comparar --base ontem.jsonl --novo hoje.jsonl --limite 0.2
+    python analise_traces.py comparar --base traces.jsonl --janela-base 2026-10-19T10:00 2026-10-19T11:00 \\
+        --janela-nova 2026-10-19T14:00 2026-10-19T15:00
+"""
+import argparse
+import base64
+import json
+import sys
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+ERROR_STATUS = (2, "STATUS_CODE_ERROR")
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: str
+    name: str
+    start: int  # ns
+    end: int  # ns
+    error: bool
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+
+def _id(value, size):
+    """Ids OTLP JSON vêm em hex (especificação) ou base64 (json_format do protobuf)."""
+    if not value:
+        return ""
+    if len(value) == size * 2:
+        return value.lower()
+    return base64.b64decode(value).hex()
+
+
+def _spans_from_document(document):
+    for resource_spans in document.get("resourceSpans", ()):
+        for scope_spans in resource_spans.get("scopeSpans", ()):
+            for span in scope_spans.get("spans", ()):
+                yield Span(
+                    trace_id=_id(span["traceId"], 16),
+                    span_id=_id(span["spanId"], 8),
+                    parent_id=_id(span.get("parentSpanId"), 8),
+                    name=span["name"],
+                    start=int(span["startTimeUnixNano"]),
+                    end=int(span["endTimeUnixNano"]),
+                    error=span.get("status", {}).get("code") in ERROR_STATUS,
+                )
+
+
+def load_spans(paths):
+    """Spans de um ou mais arquivos OTLP JSON (um documento por linha ou um único documento)."""
+    spans = []
+    for path in paths:
+        with open(path, encoding="utf-8") as file:
+            content = file.read()
+        try:
+            documents = [json.loads(content)]
+        except json.JSONDecodeError:
+            documents = [json.loads(line) for line in content.splitlines() if line.strip()]
+        for document in documents:
+            spans.extend(_spans_from_document(document))
+    return spans
+
+
+class Trace:
+    """Spans de um trace, com índice de filhos e as raízes (spans sem pai no trace)."""
+
+    def __init__(self, spans):
+        self.spans = spans
+        ids = {span.span_id for span in spans}
+        self.children = defaultdict(list)
+        self.roots = []
+        for span in spans:
+            if span.parent_id in ids:
+                self.children[span.parent_id].append(span)
+            else:
+                self.roots.append(span)
+
+    def self_time(self, span):
+        """Duração do span menos a união dos intervalos dos filhos (recortados ao pai)."""
+        covered, cursor = 0, span.start
+        for child in sorted(self.children.get(span.span_id, ()), key=lambda child: child.start):
+            start, end = max(child.start, cursor), min(child.end, span.end)
+            if end > start:
+                covered += end - start
+                cursor = end
+        return span.duration - covered
+
+    def critical_path(self, root):
+        """[(span, contribuição_ns)] do caminho crítico de `root`, pais antes dos filhos.
+
+        Anda de trás para frente: a partir do fim do span, pega o filho que terminou por último
+        antes do cursor, desce nele e continua a partir do início desse filho.
+        """
+        path = []
+
+        def walk(span, limit):
+            cursor = min(span.end, limit)
+            own = 0
+            for child in sorted(self.children.get(span.span_id, ()), key=lambda child: child.end, reverse=True):
+                if child.start >= cursor:
+                    continue  # rodou em paralelo com um filho que já está no caminho
+                child_end = min(child.end, cursor)
+                own += cursor - child_end
+                walk(child, child_end)
+                cursor = max(child.start, span.start)
+            own += cursor - span.start
+            path.append((span, own))
+
+        walk(root, root.end)
+        path.reverse()
+        return path
+
+
+def group_traces(spans):
+    by_trace = defaultdict(list)
+    for span in spans:
+        by_trace[span.trace_id].append(span)
+    return [Trace(trace_spans) for trace_spans in by_trace.values()]
+
+
+def in_window(traces, start=None, end=None):
+    """Traces cuja primeira raiz começou em [start, end) (datetimes UTC)."""
+    start_ns = int(start.timestamp() * 1e9) if start else None
+    end_ns = int(end.timestamp() * 1e9) if end else None
+    selected = []
+    for trace in traces:
+        began = min(root.start for root in trace.roots)
+        if (start_ns is None or began >= start_ns) and (end_ns is None or began < end_ns):
+            selected.append(trace)
+    return selected
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+@dataclass
+class NameStats:
+    count: int
+    errors: int
+    p50: float
+    p95: float
+    p99: float
+    self_p50: float
+    self_p95: float
+    critical_ms: float  # tempo total contribuído ao caminho crítico
+
+
+def analyze(traces):
+    """Estatísticas por nome de span (ms) e contagem das sequências de caminho crítico."""
+    durations, self_times, errors = defaultdict(list), defaultdict(list), Counter()
+    critical, paths = Counter(), Counter()
+    for trace in traces:
+        for span in trace.spans:
+            durations[span.name].append(span.duration / 1e6)
+            self_times[span.name].append(trace.self_time(span) / 1e6)
+            errors[span.name] += span.error
+        for root in trace.roots:
+            path = trace.critical_path(root)
+            paths[" → ".join(span.name for span, _ in path)] += 1
+            for span, contribution in path:
+                critical[span.name] += contribution / 1e6
+    stats = {}
+    for name, values in durations.items():
+        ordered, ordered_self = sorted(values), sorted(self_times[name])
+        stats[name] = NameStats(
+            count=len(ordered),
+            errors=errors[name],
+            p50=percentile(ordered, 50),
+            p95=percentile(ordered, 95),
+            p99=percentile(ordered, 99),
+            self_p50=percentile(ordered_self, 50),
+            self_p95=percentile(ordered_self, 95),
+            critical_ms=critical[name],
+        )
+    return stats, paths
+
+
+def regressions(base, new, threshold=0.2, min_count=20):
+    """[(nome, métrica, antes, depois, variação)] dos spans cujo p50/p95 piorou mais que `threshold`."""
+    found = []
+    for name, after in new.items():
+        before = base.get(name)
+        if before is None or before.count < min_count or after.count < min_count:
+            continue
+        for metric in ("p50", "p95"):
+            old, current = getattr(before, metric), getattr(after, metric)
+            if old > 0 and (current - old) / old > threshold:
+                found.append((name, metric, old, current, (current - old) / old))
+    return sorted(found, key=lambda item: item[4], reverse=True)
+
+
+def _print_stats(stats, paths, top_paths=5):
+    total_critical = sum(item.critical_ms for item in stats.values()) or 1
+    print(f"{'span':<40}{'n':>8}{'erros':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'self p50':>10}{'self p95':>10}{'crítico':>9}")
+    for name, item in sorted(stats.items(), key=lambda pair: pair[1].critical_ms, reverse=True):
+        print(
+            f"{name[:39]:<40}{item.count:>8}{item.errors:>7}{item.p50:>10.2f}{item.p95:>10.2f}{item.p99:>10.2f}"
+            f"{item.self_p50:>10.2f}{item.self_p95:>10.2f}{item.critical_ms / total_critical:>9.1%}"
+        )
+    print("\nCaminhos críticos mais comuns:")
+    for path, count in paths.most_common(top_paths):
+        print(f"{count:>8}  {path}")
+
+
+def _parse_time(value):
+    moment = datetime.fromisoformat(value)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="comando", required=True)
+    summary = commands.add_parser("resumo", help="Caminho crítico, self-time e percentis")
+    summary.add_argument("arquivos", nargs="+")
+    compare = commands.add_parser("comparar", help="Regressões entre duas execuções ou janelas")
+    compare.add_argument("--base", nargs="+", required=True, help="Arquivos da execução de referência")
+    compare.add_argument("--novo", nargs="+", help="Arquivos da execução nova (padrão: os mesmos de --base)")
+    compare.add_argument("--janela-base", nargs=2, type=_parse_time, metavar=("INICIO", "FIM"))
+    compare.add_argument("--janela-nova", nargs=2, type=_parse_time, metavar=("INICIO", "FIM"))
+    compare.add_argument("--limite", type=float, default=0.2, help="Piora relativa tolerada (0.2 = 20%%)")
+    compare.add_argument("--minimo", type=int, default=20, help="Amostras mínimas por span em cada lado")
+    args = parser.parse_args()
+
+    if args.comando == "resumo":
+        traces = group_traces(load_spans(args.arquivos))
+        print(f"{len(traces)} traces\n")
+        _print_stats(*analyze(traces))
+        return
+
+    base_traces = group_traces(load_spans(args.base))
+    new_traces = group_traces(load_spans(args.novo)) if args.novo else base_traces
+    if args.janela_base:
+        base_traces = in_window(base_traces, *args.janela_base)
+    if args.janela_nova:
+        new_traces = in_window(new_traces, *args.janela_nova)
+    base_stats, _ = analyze(base_traces)
+    new_stats, _ = analyze(new_traces)
+    found = regressions(base_stats, new_stats, args.limite, args.minimo)
+    print(f"base: {len(base_traces)} traces, novo: {len(new_traces)} traces\n")
+    if not found:
+        print(f"Nenhuma regressão acima de {args.limite:.0%}.")
+        return
+    print(f"{'span':<40}{'métrica':>8}{'antes (ms)':>12}{'depois (ms)':>13}{'variação':>10}")
+    for name, metric, before, after, change in found:
+        print(f"{name[:39]:<40}{metric:>8}{before:>12.2f}{after:>13.2f}{change:>+10.0%}")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""Armazém local de métricas em SQLite, para rodar as consultas do README_07 sem o Logfire.
+
+As consultas de `README_07_Dashboard.md` (resumo por etapa, resumo diário, exemplars) usam a
+tabela `metrics` do Logfire. O `SqliteMetricExporter` grava cada ponto exportado em uma tabela
+`metrics` com as mesmas colunas (`day`, `metric_name`, `attributes` em JSON, `scalar_value`,
+`histogram_min/max/sum/count`, `exemplars` no formato da consulta 3), então as consultas 1, 2 e 4
+rodam como estão (o SQLite >= 3.38 entende `attributes->>'stage'`).
+
+Semanas de pontos a cada 10 s são milhões de linhas; para o dashboard não varrer tudo, a mesma
+transação que grava o lote atualiza `metrics_daily`, um rollup por (métrica, dia, atributos) com
+mínimo, máximo, soma e contagem, mais `points` e `histogram_mean_sum` (soma das médias de cada
+ponto), para que `resumo` e `diario` devolvam exatamente o que as consultas 1 e 2 devolveriam sobre
+a tabela crua. Os pontos crus ficam `raw_retention_days` dias (para os exemplars); o rollup fica
+para sempre.
+
+O exporter pede temporalidade delta para contadores e histogramas: cada ponto é só o intervalo
+exportado, e somar pontos do mesmo dia dá o total do dia. UpDownCounters e gauges continuam
+cumulativos (ficam em `scalar_min/max/last` no rollup).
+
+Uso como exporter (ao lado do exporter do Logfire/OTLP):
+
+    reader = PeriodicExportingMetricReader(SqliteMetricExporter("metricas.db"))
+    logfire.configure(metrics=logfire.MetricsOptions(additional_readers=[reader]))
+
+Consultas:
+    python armazem_metricas.py --db metricas.db resumo --metrica stage_duration --atributo stage
+    python armazem_metricas.py --db metricas.db diario
+    python armazem_metricas.py --db metricas.db exemplars --valor load --dias 7 --limite 10
+    python armazem_metricas.py --db metricas.db sql "SELECT COUNT(*) FROM metrics"
+"""
+import argparse
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+
+from opentelemetry.sdk.metrics.export import (
+    AggregationTemporality,
+    ExponentialHistogram as ExponentialHistogramData,
+    Gauge as GaugeData,
+    Histogram as HistogramData,
+    MetricExporter,
+    MetricExportResult,
+    Sum as SumData,
+)
+
+from metricas_config import DELTA_TEMPORALITY
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metrics (
+    recorded_timestamp TEXT NOT NULL,
+    start_timestamp TEXT,
+    day TEXT NOT NULL,
+    metric_name TEXT NOT NULL,
+    metric_type TEXT NOT NULL,
+    unit TEXT,
+    service_name TEXT,
+    attributes TEXT NOT NULL,
+    scalar_value REAL,
+    histogram_min REAL,
+    histogram_max REAL,
+    histogram_sum REAL,
+    histogram_count INTEGER,
+    histogram_bucket_counts TEXT,
+    histogram_explicit_bounds TEXT,
+    exemplars TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_metrics_name_day ON metrics (metric_name, day);
+CREATE INDEX IF NOT EXISTS idx_metrics_day ON metrics (day);
+CREATE TABLE IF NOT EXISTS metrics_daily (
+    metric_name TEXT NOT NULL,
+    day TEXT NOT NULL,
+    attributes TEXT NOT NULL,
+    metric_type TEXT NOT NULL,
+    unit TEXT,
+    points INTEGER NOT NULL,
+    scalar_sum REAL,
+    scalar_min REAL,
+    scalar_max REAL,
+    scalar_last REAL,
+    histogram_min REAL,
+    histogram_max REAL,
+    histogram_sum REAL,
+    histogram_count INTEGER,
+    histogram_mean_sum REAL,
+    PRIMARY KEY (metric_name, day, attributes)
+) WITHOUT ROWID;
+"""
+INSERT_POINT = "INSERT INTO metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+# min/max do SQLite com NULL dão NULL: coalesce para que um lado vazio não apague o outro
+UPSERT_DAILY = """
+INSERT INTO metrics_daily VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (metric_name, day, attributes) DO UPDATE SET
+    points = points + 1,
+    scalar_sum = scalar_sum + excluded.scalar_sum,
+    scalar_min = min(coalesce(scalar_min, excluded.scalar_min), coalesce(excluded.scalar_min, scalar_min)),
+    scalar_max = max(coalesce(scalar_max, excluded.scalar_max), coalesce(excluded.scalar_max, scalar_max)),
+    scalar_last = coalesce(excluded.scalar_last, scalar_last),
+    histogram_min = min(coalesce(histogram_min, excluded.histogram_min), coalesce(excluded.histogram_min, histogram_min)),
+    histogram_max = max(coalesce(histogram_max, excluded.histogram_max), coalesce(excluded.histogram_max, histogram_max)),
+    histogram_sum = histogram_sum + excluded.histogram_sum,
+    histogram_count = histogram_count + excluded.histogram_count,
+    histogram_mean_sum = histogram_mean_sum + excluded.histogram_mean_sum
+"""
+ANALYZE_EVERY = 256  # lotes entre atualizações das estatísticas dos índices
+
+
+def connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA analysis_limit=1000")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _iso(time_unix_nano):
+    if not time_unix_nano:
+        return None
+    return datetime.fromtimestamp(time_unix_nano / 1e9, tz=timezone.utc).isoformat()
+
+
+def _exemplars(point):
+    exemplars = [
+        {
+            "trace_id": format(exemplar.trace_id, "032x") if exemplar.trace_id else None,
+            "span_id": format(exemplar.span_id, "016x") if exemplar.span_id else None,
+            "value": exemplar.value,
+            "time": _iso(exemplar.time_unix_nano),
+        }
+        for exemplar in getattr(point, "exemplars", None) or ()
+    ]
+    return json.dumps(exemplars) if exemplars else None
+
+
+def point_rows(metric, service_name):
+    """Linhas (`metrics`, `metrics_daily`) de cada ponto de uma métrica exportada."""
+    data = metric.data
+    if isinstance(data, SumData):
+        metric_type = "sum"
+    elif isinstance(data, GaugeData):
+        metric_type = "gauge"
+    elif isinstance(data, HistogramData):
+        metric_type = "histogram"
+    elif isinstance(data, ExponentialHistogramData):
+        metric_type = "exponential_histogram"
+    else:
+        return
+    # Soma cumulativa (UpDownCounter) não pode ser somada por dia
+    additive = isinstance(data, SumData) and data.aggregation_temporality == AggregationTemporality.DELTA
+    for point in data.data_points:
+        attributes = json.dumps(dict(point.attributes or {}), sort_keys=True, default=str)
+        day = datetime.fromtimestamp(point.time_unix_nano / 1e9, tz=timezone.utc).date().isoformat()
+        if metric_type in ("sum", "gauge"):
+            value = point.value
+            histogram = (None, None, None, None)
+            buckets = bounds = None
+            daily_scalar = (value if additive else 0.0, value, value, value)
+            mean = None
+        else:
+            if not point.count:  # ponto delta sem medições no intervalo
+                continue
+            histogram = (point.min, point.max, point.sum, point.count)
+            value = None
+            if metric_type == "histogram":
+                buckets, bounds = json.dumps(list(point.bucket_counts)), json.dumps(list(point.explicit_bounds))
+            else:
+                buckets = bounds = None
+            daily_scalar = (0.0, None, None, None)
+            mean = point.sum / point.count
+        yield (
+            (
+                _iso(point.time_unix_nano), _iso(point.start_time_unix_nano), day, metric.name, metric_type,
+                metric.unit, service_name, attributes, value, *histogram, buckets, bounds, _exemplars(point),
+            ),
+            (
+                metric.name, day, attributes, metric_type, metric.unit, *daily_scalar,
+                *(histogram if mean is not None else (None, None, 0.0, 0)), mean if mean is not None else 0.0,
+            ),
+        )
+
+
+class SqliteMetricExporter(MetricExporter):
+    """Exporter que grava os pontos em SQLite e mantém o rollup diário na mesma transação."""
+
+    def __init__(self, path, raw_retention_days=14, preferred_temporality=None, preferred_aggregation=None):
+        super().__init__(
+            preferred_temporality={**DELTA_TEMPORALITY, **(preferred_temporality or {})},
+            preferred_aggregation=preferred_aggregation,
+        )
+        self.path = path
+        self.raw_retention_days = raw_retention_days
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._pruned_day = None
+
+    def export(self, metrics_data, timeout_millis=10_000, **kwargs):
+        raw, daily = [], []
+        for resource_metrics in metrics_data.resource_metrics:
+            service_name = resource_metrics.resource.attributes.get("service.name")
+            for scope_metrics in resource_metrics.scope_metrics:
+                for metric in scope_metrics.metrics:
+                    for raw_row, daily_row in point_rows(metric, service_name):
+                        raw.append(raw_row)
+                        daily.append(daily_row)
+        try:
+            with self._lock:
+                with self._conn:  # um lote = uma transação (pontos crus + rollup)
+                    self._conn.executemany(INSERT_POINT, raw)
+                    self._conn.executemany(UPSERT_DAILY, daily)
+                    self._prune()
+                if self._batches % ANALYZE_EVERY == 0:
+                    with self._conn:
+                        self._conn.execute("ANALYZE")
+                self._batches += 1
+        except sqlite3.Error:
+            return MetricExportResult.FAILURE
+        return MetricExportResult.SUCCESS
+
+    def _prune(self):
+        # Uma vez por dia: apaga os pontos crus fora da retenção (o rollup diário fica)
+        today = datetime.now(timezone.utc).date()
+        if self.raw_retention_days is None or self._pruned_day == today:
+            return
+        cutoff = (today - timedelta(days=self.raw_retention_days)).isoformat()
+        self._conn.execute("DELETE FROM metrics WHERE day < ?", (cutoff,))
+        self._pruned_day = today
+
+    def force_flush(self, timeout_millis=10_000):
+        return True
+
+    def shutdown(self, timeout_millis=30_000, **kwargs):
+        with self._lock:
+            self._conn.close()
+
+
+# Mesmos resultados das consultas 1 e 2 do README_07, lidos do rollup em vez dos pontos crus
+SUMMARY_SQL = """
+SELECT
+    attributes->>:attribute AS value,
+    MIN(histogram_min) AS min_value,
+    MAX(histogram_max) AS max_value,
+    SUM(histogram_mean_sum) / SUM(points) AS avg_value,
+    SUM(histogram_sum) AS total_value
+FROM metrics_daily
+WHERE metric_name = :metric
+GROUP BY attributes->>:attribute
+"""
+DAILY_SQL = """
+SELECT
+    day,
+    attributes->>:attribute AS value,
+    SUM(points) AS total_records,
+    MIN(histogram_min) AS min_value,
+    MAX(histogram_max) AS max_value,
+    SUM(histogram_mean_sum) / SUM(points) AS avg_value,
+    SUM(histogram_sum) AS total_value
+FROM metrics_daily
+WHERE metric_name = :metric
+GROUP BY day, attributes->>:attribute
+"""
+# Consulta 3 do README_07 em SQLite (json_each no lugar de jsonb_array_elements)
+EXEMPLARS_SQL = """
+SELECT
+    attributes->>:attribute AS value,
+    exemplar.value->>'value' AS measured,
+    exemplar.value->>'trace_id' AS trace_id,
+    exemplar.value->>'span_id' AS span_id,
+    exemplar.value->>'time' AS recorded_at
+FROM metrics, json_each(metrics.exemplars) AS exemplar
+WHERE metric_name = :metric
+  AND (:value IS NULL OR attributes->>:attribute = :value)
+  AND (:since_day IS NULL OR day >= :since_day)
+ORDER BY measured DESC
+LIMIT :limit
+"""
+
+
+def query(path, sql, params=()):
+    """Executa `sql` no armazém (somente leitura) e devolve (colunas, linhas)."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(sql, params)
+        return [column[0] for column in cursor.description or ()], cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def _print_table(columns, rows):
+    formatted = [["" if value is None else f"{value:.2f}" if isinstance(value, float) else str(value) for value in row] for row in rows]
+    widths = [max([len(column), *(len(row[i]) for row in formatted)]) for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in formatted:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="metricas.db", help="Arquivo do armazém")
+    commands = parser.add_subparsers(dest="comando", required=True)
+    for name, help_text in (("resumo", "Resumo por atributo (consulta 1)"), ("diario", "Resumo diário (consulta 2)")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--metrica", default="stage_duration")
+        command.add_argument("--atributo", default="stage")
+    exemplars = commands.add_parser("exemplars", help="Exemplars das medições mais lentas (consulta 3)")
+    exemplars.add_argument("--metrica", default="stage_duration")
+    exemplars.add_argument("--atributo", default="stage")
+    exemplars.add_argument("--valor", help="Valor do atributo (ex.: load)")
+    exemplars.add_argument("--dias", type=int, default=7, help="Só os últimos N dias (0: todos)")
+    exemplars.add_argument("--limite", type=int, default=10)
+    raw_sql = commands.add_parser("sql", help="Consulta SQL livre (ex.: as do README_07)")
+    raw_sql.add_argument("consulta")
+    args = parser.parse_args()
+
+    start = perf_counter()
+    if args.comando == "sql":
+        columns, rows = query(args.db, args.consulta)
+    else:
+        params = {"metric": args.metrica, "attribute": f"$.{args.atributo}"}
+        if args.comando == "exemplars":
+            since_day = (datetime.now(timezone.utc).date() - timedelta(days=args.dias)).isoformat() if args.dias else None
+            params.update(value=args.valor, since_day=since_day, limit=args.limite)
+        sql = {"resumo": SUMMARY_SQL, "diario": DAILY_SQL, "exemplars": EXEMPLARS_SQL}[args.comando]
+        columns, rows = query(args.db, sql, params)
+    elapsed = perf_counter() - start
+    _print_table(columns, rows)
+    print(f"\n{len(rows)} linhas em {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""Armazém local de spans em SQLite, para investigar o pipeline sem o Logfire.
+
+Sem o Logfire a alternativa era rolar o JSON do `ConsoleSpanExporter`. O `SqliteSpanExporter`
+grava cada lote do `BatchSpanProcessor` em uma única transação em `spans-NNNNNN.db`, com índices
+em `trace_id`, `start_ns`, `duration_ms`, `(name, start_ns)` e `(name, duration_ms)`. Quando o
+arquivo atual passa de `max_bytes` começa um novo, e só os `max_files` mais recentes são mantidos.
+Os "pending spans" do Logfire são ignorados (o span final chega depois com os mesmos ids).
+
+Uso como exporter:
+
+    exporter = SqliteSpanExporter("spans_db")
+    logfire.configure(send_to_logfire=False, additional_span_processors=[BatchSpanProcessor(exporter)])
+
+Consultas:
+    python armazem_spans.py --dir spans_db lentos --nome load --minutos 60 --limite 20
+    python armazem_spans.py --dir spans_db trace 4bf92f3577b34da6a3ce929d0e0e4736
+"""
+import argparse
+import glob
+import heapq
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from time import perf_counter, time_ns
+
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS spans (
+    trace_id TEXT NOT NULL,
+    span_id TEXT NOT NULL,
+    parent_span_id TEXT,
+    name TEXT NOT NULL,
+    kind TEXT,
+    status_code TEXT,
+    status_message TEXT,
+    service_name TEXT,
+    start_ns INTEGER NOT NULL,
+    end_ns INTEGER NOT NULL,
+    duration_ms REAL NOT NULL,
+    attributes TEXT,
+    events TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_spans_trace_id ON spans (trace_id);
+CREATE INDEX IF NOT EXISTS idx_spans_name_start ON spans (name, start_ns);
+CREATE INDEX IF NOT EXISTS idx_spans_start ON spans (start_ns);
+CREATE INDEX IF NOT EXISTS idx_spans_name_duration ON spans (name, duration_ms);
+CREATE INDEX IF NOT EXISTS idx_spans_duration ON spans (duration_ms);
+"""
+INSERT_SPAN = "INSERT INTO spans VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+COLUMNS = (
+    "trace_id", "span_id", "parent_span_id", "name", "kind", "status_code", "status_message",
+    "service_name", "start_ns", "end_ns", "duration_ms", "attributes", "events",
+)
+
+
+ANALYZE_EVERY = 256  # lotes entre atualizações das estatísticas dos índices
+
+
+def connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # ANALYZE por amostragem: custa ~2 ms mesmo com milhões de linhas
+    conn.execute("PRAGMA analysis_limit=1000")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def store_files(directory):
+    """Arquivos do armazém, do mais antigo para o mais novo."""
+    return sorted(glob.glob(os.path.join(directory, "spans-*.db")))
+
+
+def span_row(span):
+    attributes = dict(span.attributes or {})
+    events = [
+        {"name": event.name, "timestamp": event.timestamp, "attributes": dict(event.attributes or {})}
+        for event in span.events
+    ]
+    return (
+        format(span.context.trace_id, "032x"),
+        format(span.context.span_id, "016x"),
+        format(span.parent.span_id, "016x") if span.parent else None,
+        span.name,
+        span.kind.name.lower(),
+        span.status.status_code.name,
+        span.status.description,
+        span.resource.attributes.get("service.name") if span.resource else None,
+        span.start_time,
+        span.end_time,
+        (span.end_time - span.start_time) / 1e6,
+        json.dumps(attributes, default=str) if attributes else None,
+        json.dumps(events, default=str) if events else None,
+    )
+
+
+class SqliteSpanExporter(SpanExporter):
+    """Exporter que grava os spans em SQLite indexado, com rotação por tamanho."""
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024, max_files=8):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        files = store_files(directory)
+        self._number = int(os.path.basename(files[-1])[6:12]) if files else 1
+        self._conn = connect(self._path())
+        self._batches = 0
+
+    def _path(self):
+        return os.path.join(self.directory, f"spans-{self._number:06d}.db")
+
+    def _size(self):
+        page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        return page_count * page_size
+
+    def _analyze(self):
+        # Sem estatísticas o SQLite escolhe (name, start_ns) e ordena todos os spans do intervalo;
+        # com elas, "mais lentos de um nome" percorre (name, duration_ms) e para no LIMIT.
+        with self._conn:
+            self._conn.execute("ANALYZE")
+
+    def _rotate(self):
+        self._analyze()
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._conn.close()
+        self._number += 1
+        self._conn = connect(self._path())
+        for path in store_files(self.directory)[:-self.max_files]:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    def export(self, spans):
+        rows = [
+            span_row(span) for span in spans
+            if (span.attributes or {}).get("logfire.span_type") != "pending_span"
+        ]
+        try:
+            with self._lock:
+                with self._conn:  # um lote = uma transação
+                    self._conn.executemany(INSERT_SPAN, rows)
+                if self._batches % ANALYZE_EVERY == 0:
+                    self._analyze()
+                self._batches += 1
+                if self._size() > self.max_bytes:
+                    self._rotate()
+        except sqlite3.Error:
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        with self._lock:
+            self._analyze()
+            self._conn.close()
+
+    def force_flush(self, timeout_millis=30_000):
+        return True
+
+
+def _query(directory, sql, params, newest_first=True):
+    files = store_files(directory)
+    for path in reversed(files) if newest_first else files:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            yield from conn.execute(sql, params)
+        finally:
+            conn.close()
+
+
+def slowest_spans(directory, name=None, since_ns=None, limit=20):
+    """Os `limit` spans mais lentos (opcionalmente de um nome e a partir de `since_ns`)."""
+    conditions, params = [], []
+    if name is not None:
+        conditions.append("name = ?")
+        params.append(name)
+    if since_ns is not None:
+        conditions.append("start_ns >= ?")
+        params.append(since_ns)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = f"SELECT * FROM spans {where} ORDER BY duration_ms DESC LIMIT ?"
+    rows = _query(directory, sql, (*params, limit))
+    return heapq.nlargest(limit, rows, key=lambda row: row[COLUMNS.index("duration_ms")])
+
+
+def trace_spans(directory, trace_id):
+    """Todos os spans de um trace, em ordem de início."""
+    rows = _query(directory, "SELECT * FROM spans WHERE trace_id = ?", (trace_id.lower(),), newest_first=False)
+    return sorted(rows, key=lambda row: row[COLUMNS.index("start_ns")])
+
+
+def _format_time(ns):
+    return datetime.fromtimestamp(ns / 1e9, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def _print_slowest(rows):
+    print(f"{'início (UTC)':<25}{'duração (ms)':>14}  {'status':<7}{'trace_id':<34}nome")
+    for row in rows:
+        record = dict(zip(COLUMNS, row))
+        print(
+            f"{_format_time(record['start_ns']):<25}{record['duration_ms']:>14.2f}  "
+            f"{record['status_code']:<7}{record['trace_id']:<34}{record['name']}"
+        )
+
+
+def _print_trace(rows):
+    if not rows:
+        print("Trace não encontrado.")
+        return
+    records = [dict(zip(COLUMNS, row)) for row in rows]
+    children = {}
+    for record in records:
+        children.setdefault(record["parent_span_id"], []).append(record)
+    span_ids = {record["span_id"] for record in records}
+    trace_start = records[0]["start_ns"]
+
+    def show(record, depth):
+        offset_ms = (record["start_ns"] - trace_start) / 1e6
+        status = " [ERRO]" if record["status_code"] == "ERROR" else ""
+        print(f"{offset_ms:>10.2f} ms {record['duration_ms']:>10.2f} ms  {'  ' * depth}{record['name']}{status}")
+        for child in children.get(record["span_id"], []):
+            show(child, depth + 1)
+
+    print(f"{'offset':>13} {'duração':>13}  span")
+    for record in records:
+        if record["parent_span_id"] not in span_ids:  # raízes (ou pais que não estão no armazém)
+            show(record, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default="spans_db", help="Diretório do armazém")
+    commands = parser.add_subparsers(dest="comando", required=True)
+    slowest = commands.add_parser("lentos", help="Spans mais lentos")
+    slowest.add_argument("--nome", help="Nome do span (ex.: load)")
+    slowest.add_argument("--minutos", type=float, help="Só spans iniciados nos últimos N minutos")
+    slowest.add_argument("--limite", type=int, default=20)
+    full_trace = commands.add_parser("trace", help="Trace completo")
+    full_trace.add_argument("trace_id")
+    args = parser.parse_args()
+
+    start = perf_counter()
+    if args.comando == "lentos":
+        since_ns = time_ns() - int(args.minutos * 60e9) if args.minutos else None
+        rows = slowest_spans(args.dir, args.nome, since_ns, args.limite)
+        elapsed = perf_counter() - start
+        _print_slowest(rows)
+    else:
+        rows = trace_spans(args.dir, args.trace_id)
+        elapsed = perf_counter() - start
+        _print_trace(rows)
+    print(f"\n{len(rows)} spans em {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""Arquivo comprimido de ticks de preço no estilo Gorilla.
+
+Cada par (base/currency) é gravado em blocos de até `block_size` ticks:
+- timestamps em microssegundos, codificados como delta-de-delta;
+- valores (`amount`) convertidos para inteiros decimais escalados e codificados como delta,
+  o que preserva exatamente a string original (um XOR de float perderia os zeros à direita).
+
+O índice de blocos fica no rodapé do arquivo, então a leitura por intervalo de tempo
+pula direto para os blocos que interessam.
+"""
+import struct
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from modelos import BitcoinData
+
+MAGIC = b"BTCTICK1"
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Cabeçalho de bloco: count, first_ts, last_ts, tamanho do payload
+_BLOCK_HEADER = struct.Struct(">IqqI")
+# Rodapé: offset do índice + magic
+_FOOTER = struct.Struct(">Q8s")
+
+# Faixas (prefixo, bits) no estilo do paper do Gorilla; o último caso grava 64 bits crus
+_TS_BUCKETS = ((0b10, 2, 7), (0b110, 3, 12), (0b1110, 4, 20), (0b11110, 5, 32))
+_VALUE_BUCKETS = ((0b10, 2, 8), (0b110, 3, 16), (0b1110, 4, 24))
+
+
+def to_micros(timestamp):
+    """Converte um datetime em microssegundos desde a época (naive é tratado como UTC)."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    delta = timestamp - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def from_micros(micros):
+    """Converte microssegundos desde a época em um datetime UTC."""
+    seconds, micros = divmod(micros, 1_000_000)
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).replace(microsecond=micros)
+
+
+def _zigzag(value):
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def _unzigzag(value):
+    return -((value + 1) >> 1) if value & 1 else value >> 1
+
+
+def _split_amount(amount):
+    """Separa '67123.45' em (6712345, 2)."""
+    sign, digits, exponent = Decimal(amount).as_tuple()
+    mantissa = int("".join(map(str, digits)) or "0")
+    if exponent > 0:
+        mantissa *= 10 ** exponent
+        exponent = 0
+    return (-mantissa if sign else mantissa), -exponent
+
+
+def _join_amount(mantissa, scale):
+    """Operação inversa de `_split_amount`, sem passar por notação científica."""
+    sign = "-" if mantissa < 0 else ""
+    digits = str(abs(mantissa))
+    if scale == 0:
+        return sign + digits
+    digits = digits.rjust(scale + 1, "0")
+    return f"{sign}{digits[:-scale]}.{digits[-scale:]}"
+
+
+class _BitWriter:
+    def __init__(self):
+        self._buffer = bytearray()
+        self._acc = 0
+        self._bits = 0
+
+    def write(self, value, bits):
+        self._acc = (self._acc << bits) | (value & ((1 << bits) - 1))
+        self._bits += bits
+        while self._bits >= 8:
+            self._bits -= 8
+            self._buffer.append((self._acc >> self._bits) & 0xFF)
+        self._acc &= (1 << self._bits) - 1
+
+    def getvalue(self):
+        if self._bits:
+            return bytes(self._buffer) + bytes([(self._acc << (8 - self._bits)) & 0xFF])
+        return bytes(self._buffer)
+
+
+class _BitReader:
+    def __init__(self, data):
+        self._value = int.from_bytes(data, "big")
+        self._remaining = len(data) * 8
+
+    def read(self, bits):
+        self._remaining -= bits
+        return (self._value >> self._remaining) & ((1 << bits) - 1)
+
+    def read_prefix(self, limit):
+        """Conta quantos bits '1' vêm antes do primeiro '0' (até `limit`)."""
+        ones = 0
+        while ones < limit and self.read(1):
+            ones += 1
+        return ones
+
+
+def _write_varbits(writer, value, buckets):
+    if value == 0:
+        writer.write(0, 1)
+        return
+    encoded = _zigzag(value)
+    for prefix, prefix_bits, bits in buckets:
+        if encoded < (1 << bits):
+            writer.write(prefix, prefix_bits)
+            writer.write(encoded, bits)
+            return
+    if encoded >= (1 << 64):
+        raise ValueError(f"Valor fora do intervalo de 64 bits: {value}")
+    writer.write((1 << (len(buckets) + 1)) - 1, len(buckets) + 1)
+    writer.write(encoded, 64)
+
+
+def _read_varbits(reader, buckets):
+    ones = reader.read_prefix(len(buckets) + 1)
+    if ones == 0:
+        return 0
+    bits = buckets[ones - 1][2] if ones <= len(buckets) else 64
+    return _unzigzag(reader.read(bits))
+
+
+def encode_block(ticks):
+    """Codifica uma lista de (micros, amount) em bytes."""
+    writer = _BitWriter()
+    prev_ts = prev_delta = 0
+    prev_mantissa = prev_scale = 0
+    for i, (ts, amount) in enumerate(ticks):
+        mantissa, scale = _split_amount(amount)
+        if i == 0:
+            writer.write(ts, 64)
+        else:
+            delta = ts - prev_ts
+            _write_varbits(writer, delta - prev_delta, _TS_BUCKETS)
+            prev_delta = delta
+        prev_ts = ts
+        if i > 0 and scale == prev_scale:
+            writer.write(0, 1)
+        else:
+            if scale > 31:
+                raise ValueError(f"Casas decimais demais em {amount!r}")
+            writer.write(1, 1)
+            writer.write(scale, 5)
+        _write_varbits(writer, mantissa - prev_mantissa, _VALUE_BUCKETS)
+        prev_mantissa, prev_scale = mantissa, scale
+    return writer.getvalue()
+
+
+def decode_block(payload, count):
+    """Decodifica `count` ticks de um bloco, devolvendo uma lista de (micros, amount)."""
+    reader = _BitReader(payload)
+    ticks = []
+    ts = delta = mantissa = scale = 0
+    for i in range(count):
+        if i == 0:
+            ts = reader.read(64)
+            if ts >= 1 << 63:
+                ts -= 1 << 64
+        else:
+            delta += _read_varbits(reader, _TS_BUCKETS)
+            ts += delta
+        if reader.read(1):
+            scale = reader.read(5)
+        mantissa += _read_varbits(reader, _VALUE_BUCKETS)
+        ticks.append((ts, _join_amount(mantissa, scale)))
+    return ticks
+
+
+class TickArchiveWriter:
+    """Grava registros `BitcoinData` em blocos comprimidos por par."""
+
+    def __init__(self, path, block_size=1024):
+        self.block_size = block_size
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._pending = {}
+        self._index = []
+
+    def append(self, record: BitcoinData, timestamp: datetime):
+        """Adiciona um tick; o bloco do par é gravado quando atinge `block_size`."""
+        pair = (record.base, record.currency)
+        ticks = self._pending.setdefault(pair, [])
+        ticks.append((to_micros(timestamp), record.amount))
+        if len(ticks) >= self.block_size:
+            self._flush_pair(pair)
+
+    def _flush_pair(self, pair):
+        ticks = self._pending.pop(pair, None)
+        if not ticks:
+            return
+        payload = encode_block(ticks)
+        offset = self._file.tell()
+        first_ts = min(ts for ts, _ in ticks)
+        last_ts = max(ts for ts, _ in ticks)
+        self._file.write(_BLOCK_HEADER.pack(len(ticks), first_ts, last_ts, len(payload)))
+        self._file.write(payload)
+        self._index.append((offset, pair[0], pair[1], len(ticks), first_ts, last_ts))
+
+    def close(self):
+        """Grava os blocos pendentes, o índice e o rodapé."""
+        if self._file.closed:
+            return
+        for pair in list(self._pending):
+            self._flush_pair(pair)
+        index_offset = self._file.tell()
+        self._file.write(struct.pack(">I", len(self._index)))
+        for offset, base, currency, count, first_ts, last_ts in self._index:
+            base_bytes, currency_bytes = base.encode(), currency.encode()
+            self._file.write(struct.pack(">QB", offset, len(base_bytes)) + base_bytes)
+            self._file.write(struct.pack(">B", len(currency_bytes)) + currency_bytes)
+            self._file.write(struct.pack(">Iqq", count, first_ts, last_ts))
+        self._file.write(_FOOTER.pack(index_offset, MAGIC))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TickArchiveReader:
+    """Lê um arquivo gravado por `TickArchiveWriter`, com busca por intervalo de tempo."""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        if self._file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} não é um arquivo de ticks")
+        self._file.seek(-_FOOTER.size, 2)
+        index_offset, magic = _FOOTER.unpack(self._file.read(_FOOTER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} está truncado (rodapé ausente)")
+        self._file.seek(index_offset)
+        self.blocks = self._read_index()
+
+    def _read_index(self):
+        (total,) = struct.unpack(">I", self._file.read(4))
+        blocks = []
+        for _ in range(total):
+            offset, base_len = struct.unpack(">QB", self._file.read(9))
+            base = self._file.read(base_len).decode()
+            (currency_len,) = struct.unpack(">B", self._file.read(1))
+            currency = self._file.read(currency_len).decode()
+            count, first_ts, last_ts = struct.unpack(">Iqq", self._file.read(20))
+            blocks.append((offset, base, currency, count, first_ts, last_ts))
+        return blocks
+
+    def pairs(self):
+        """Pares (base, currency) presentes no arquivo."""
+        return sorted({(base, currency) for _, base, currency, *_ in self.blocks})
+
+    def read(self, base=None, currency=None, start=None, end=None):
+        """Itera (timestamp, BitcoinData) no intervalo [start, end), lendo só os blocos necessários."""
+        start_us = to_micros(start) if start is not None else None
+        end_us = to_micros(end) if end is not None else None
+        for offset, block_base, block_currency, count, first_ts, last_ts in self.blocks:
+            if base is not None and block_base != base:
+                continue
+            if currency is not None and block_currency != currency:
+                continue
+            if (start_us is not None and last_ts < start_us) or (end_us is not None and first_ts >= end_us):
+                continue
+            self._file.seek(offset)
+            _, _, _, size = _BLOCK_HEADER.unpack(self._file.read(_BLOCK_HEADER.size))
+            for ts, amount in decode_block(self._file.read(size), count):
+                if (start_us is not None and ts < start_us) or (end_us is not None and ts >= end_us):
+                    continue
+                yield from_micros(ts), BitcoinData(amount=amount, base=block_base, currency=block_currency)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,226 @@
+"""Backfill histórico da tabela `bitcoin_data` em paralelo.
+
+O loop do pipeline só busca o preço "agora"; este script preenche os buracos de um intervalo:
+1. para cada par, descobre quais intervalos de `granularity` segundos ainda não têm nenhuma linha;
+2. quebra os buracos em blocos de até 300 candles (limite da API da Coinbase Exchange);
+3. busca os blocos em um pool de threads, todas passando por um único rate limiter;
+4. insere cada bloco com um INSERT em lote.
+
+Progresso e vazão saem como métricas (`backfill_candles`, `backfill_chunk_duration`,
+`backfill_progress`, `backfill_throughput`).
+
+Uso (contra o servidor local de testes):
+    python servidor_precos_local.py --porta 8085 &
+    python backfill.py --pares BTC-USD,ETH-USD --inicio 2025-01-01 --fim 2025-01-08 --api http://localhost:8085
+"""
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from time import monotonic, perf_counter, sleep
+
+import logfire
+import requests
+from sqlalchemy import insert, select
+
+from conexao import get_engine
+from modelos import POSTGRES_URI, Base, BitcoinDataModel
+
+API_URL = "https://api.exchange.coinbase.com"
+MAX_CANDLES = 300  # máximo de candles por requisição na API da Coinbase Exchange
+GRANULARITIES = (60, 300, 900, 3600, 21600, 86400)
+
+candles_loaded = logfire.metric_counter(
+    "backfill_candles",
+    unit="1",
+    description="Candles históricos inseridos pelo backfill"
+)
+chunk_duration = logfire.metric_histogram(
+    "backfill_chunk_duration",
+    unit="ms",
+    description="Duração da busca de cada bloco do backfill"
+)
+backfill_progress = logfire.metric_gauge(
+    "backfill_progress",
+    unit="1",
+    description="Fração dos blocos do backfill já concluída"
+)
+backfill_throughput = logfire.metric_gauge(
+    "backfill_throughput",
+    unit="1/s",
+    description="Candles inseridos por segundo desde o início do backfill"
+)
+
+
+class RateLimiter:
+    """Rate limiter global (token bucket) compartilhado entre as threads."""
+
+    def __init__(self, rate, burst=1):
+        self.interval = 1 / rate
+        self.burst = burst
+        self._next = monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloqueia até a próxima requisição ser permitida."""
+        with self._lock:
+            now = monotonic()
+            slot = max(now - (self.burst - 1) * self.interval, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            sleep(slot - now)
+
+
+def to_naive_utc(value):
+    """A coluna `timestamp` é DateTime sem timezone, gravada em UTC."""
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def _epoch(value):
+    return int(value.replace(tzinfo=timezone.utc).timestamp())
+
+
+def _from_epoch(seconds):
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).replace(tzinfo=None)
+
+
+def find_gaps(engine, base, currency, start, end, granularity):
+    """Faixas [início, fim) do intervalo em que nenhum bucket de `granularity` segundos tem dados."""
+    table = BitcoinDataModel.__table__
+    stmt = select(table.c.timestamp).where(
+        table.c.base == base,
+        table.c.currency == currency,
+        table.c.timestamp >= start,
+        table.c.timestamp < end,
+    )
+    with engine.connect() as conn:
+        present = {_epoch(ts) // granularity for ts in conn.execute(stmt).scalars()}
+
+    gaps = []
+    first_bucket = _epoch(start) // granularity
+    last_bucket = -(-_epoch(end) // granularity)
+    gap_start = None
+    for bucket in range(first_bucket, last_bucket):
+        if bucket in present:
+            if gap_start is not None:
+                gaps.append((gap_start, bucket))
+                gap_start = None
+        elif gap_start is None:
+            gap_start = bucket
+    if gap_start is not None:
+        gaps.append((gap_start, last_bucket))
+    return [(_from_epoch(a * granularity), _from_epoch(b * granularity)) for a, b in gaps]
+
+
+def split_chunks(gaps, granularity, max_candles=MAX_CANDLES):
+    """Quebra os buracos em blocos que cabem em uma requisição."""
+    step = timedelta(seconds=granularity * max_candles)
+    chunks = []
+    for gap_start, gap_end in gaps:
+        while gap_start < gap_end:
+            chunks.append((gap_start, min(gap_start + step, gap_end)))
+            gap_start += step
+    return chunks
+
+
+_local = threading.local()
+
+
+def _session():
+    # requests.Session não é garantidamente thread-safe: uma por thread, reaproveitando conexões
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+        _local.session.headers["User-Agent"] = "workshop-observabilidade-backfill"
+    return _local.session
+
+
+def fetch_chunk(api_url, pair, start, end, granularity, limiter, retries=5):
+    """Busca os candles de [start, end) e devolve as linhas para `bitcoin_data`."""
+    base, currency = pair.split("-")
+    params = {"start": f"{start.isoformat()}Z", "end": f"{end.isoformat()}Z", "granularity": granularity}
+    for attempt in range(retries):
+        limiter.acquire()
+        response = _session().get(f"{api_url}/products/{pair}/candles", params=params, timeout=30)
+        if response.status_code == 429 or response.status_code >= 500:
+            sleep(0.5 * 2 ** attempt)
+            continue
+        response.raise_for_status()
+        start_s, end_s = _epoch(start), _epoch(end)
+        return [
+            {"amount": str(close), "base": base, "currency": currency, "timestamp": _from_epoch(time_s)}
+            for time_s, _low, _high, _open, close, _volume in response.json()
+            if start_s <= time_s < end_s
+        ]
+    raise RuntimeError(f"Falha ao buscar {pair} de {start} a {end} após {retries} tentativas")
+
+
+def _timed_fetch(api_url, pair, start, end, granularity, limiter):
+    began = perf_counter()
+    rows = fetch_chunk(api_url, pair, start, end, granularity, limiter)
+    chunk_duration.record((perf_counter() - began) * 1000, {"pair": pair})
+    return rows
+
+
+def backfill(engine, pairs, start, end, granularity=60, workers=4, rate=3.0, api_url=API_URL):
+    """Preenche os buracos de `pairs` em [start, end). Retorna o total de linhas inseridas."""
+    start, end = to_naive_utc(start), to_naive_utc(end)
+    Base.metadata.create_all(engine)
+
+    plan = []
+    for pair in pairs:
+        base, currency = pair.split("-")
+        gaps = find_gaps(engine, base, currency, start, end, granularity)
+        chunks = split_chunks(gaps, granularity)
+        logfire.info("Backfill de {pair}: {gaps} buracos, {chunks} blocos", pair=pair, gaps=len(gaps), chunks=len(chunks))
+        plan.extend((pair, chunk_start, chunk_end) for chunk_start, chunk_end in chunks)
+    if not plan:
+        logfire.info("Nenhum buraco encontrado, nada a fazer.")
+        return 0
+
+    limiter = RateLimiter(rate, burst=workers)
+    table = BitcoinDataModel.__table__
+    inserted = done = 0
+    began = perf_counter()
+    with logfire.span("Backfill de {pairs}", pairs=pairs), ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_timed_fetch, api_url, pair, chunk_start, chunk_end, granularity, limiter): pair
+            for pair, chunk_start, chunk_end in plan
+        }
+        for future in as_completed(futures):
+            pair = futures[future]
+            rows = future.result()
+            if rows:
+                with engine.begin() as conn:
+                    conn.execute(insert(table), rows)
+            inserted += len(rows)
+            done += 1
+            candles_loaded.add(len(rows), {"pair": pair})
+            backfill_progress.set(done / len(plan))
+            backfill_throughput.set(inserted / (perf_counter() - began))
+    elapsed = perf_counter() - began
+    logfire.info(
+        "Backfill concluído: {rows} linhas em {elapsed:.1f}s ({rate:.0f} linhas/s)",
+        rows=inserted, elapsed=elapsed, rate=inserted / elapsed,
+    )
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default=POSTGRES_URI)
+    parser.add_argument("--pares", default="BTC-USD", help="lista separada por vírgula, ex.: BTC-USD,ETH-USD")
+    parser.add_argument("--inicio", type=datetime.fromisoformat, required=True)
+    parser.add_argument("--fim", type=datetime.fromisoformat, required=True)
+    parser.add_argument("--granularidade", type=int, choices=GRANULARITIES, default=60)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=3.0, help="requisições por segundo (todas as threads)")
+    parser.add_argument("--api", default=API_URL)
+    args = parser.parse_args()
+
+    logfire.configure(send_to_logfire="if-token-present", inspect_arguments=False)
+    engine = get_engine(args.uri)
+    backfill(engine, args.pares.split(","), args.inicio, args.fim, args.granularidade, args.workers, args.rate, args.api)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Benchmark do arquivo de ticks: bytes/tick e velocidade de leitura contra Parquet e a tabela crua.
+
+Uso:
+    python benchmark_arquivo.py --ticks 200000 --pairs BTC-USD,BTC-EUR,ETH-USD
+"""
+import argparse
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+
+from sqlalchemy import create_engine, insert, select
+
+from arquivo_ticks import TickArchiveReader, TickArchiveWriter
+from modelos import Base, BitcoinData, BitcoinDataModel
+
+
+def generate_ticks(total, pairs, interval_s=10, seed=42):
+    """Gera ticks sintéticos: passeio aleatório com muitos preços repetidos, como a API spot."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    prices = {pair: 60_000.0 + 1_000 * i for i, pair in enumerate(pairs)}
+    ticks = []
+    for i in range(total // len(pairs)):
+        for pair in pairs:
+            if rng.random() < 0.4:
+                prices[pair] += rng.choice((-1, 1)) * rng.randint(1, 5_000) / 100
+            base, currency = pair.split("-")
+            timestamp = start + timedelta(seconds=i * interval_s, microseconds=rng.randint(0, 5_000))
+            ticks.append((timestamp, BitcoinData(amount=f"{prices[pair]:.2f}", base=base, currency=currency)))
+    return ticks
+
+
+def bench_archive(ticks, workdir):
+    path = os.path.join(workdir, "ticks.btc")
+    with TickArchiveWriter(path) as writer:
+        for timestamp, record in ticks:
+            writer.append(record, timestamp)
+    start = perf_counter()
+    with TickArchiveReader(path) as reader:
+        decoded = sum(1 for _ in reader.read())
+    elapsed = perf_counter() - start
+    return os.path.getsize(path), decoded, elapsed
+
+
+def bench_parquet(ticks, workdir):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+    path = os.path.join(workdir, "ticks.parquet")
+    table = pa.table({
+        "timestamp": pa.array([t for t, _ in ticks], type=pa.timestamp("us", tz="UTC")),
+        "amount": [r.amount for _, r in ticks],
+        "base": [r.base for _, r in ticks],
+        "currency": [r.currency for _, r in ticks],
+    })
+    pq.write_table(table, path, compression="zstd")
+    start = perf_counter()
+    rows = pq.read_table(path).to_pylist()
+    decoded = sum(1 for row in rows if BitcoinData(amount=row["amount"], base=row["base"], currency=row["currency"]))
+    elapsed = perf_counter() - start
+    return os.path.getsize(path), decoded, elapsed
+
+
+def bench_table(ticks, workdir):
+    path = os.path.join(workdir, "ticks.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(BitcoinDataModel.__table__), [
+            {"amount": r.amount, "base": r.base, "currency": r.currency, "timestamp": t} for t, r in ticks
+        ])
+    table = BitcoinDataModel.__table__
+    start = perf_counter()
+    with engine.connect() as conn:
+        result = conn.execute(select(table.c.timestamp, table.c.amount, table.c.base, table.c.currency))
+        decoded = sum(1 for row in result if BitcoinData(amount=row.amount, base=row.base, currency=row.currency))
+    elapsed = perf_counter() - start
+    engine.dispose()
+    return os.path.getsize(path), decoded, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=100_000)
+    parser.add_argument("--pairs", default="BTC-USD,BTC-EUR,ETH-USD")
+    args = parser.parse_args()
+
+    ticks = generate_ticks(args.ticks, args.pairs.split(","))
+    print(f"{len(ticks)} ticks sintéticos")
+    print(f"{'formato':<22}{'bytes/tick':>12}{'leitura (ticks/s)':>20}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, bench in (
+            ("arquivo gorilla", bench_archive),
+            ("parquet (zstd)", bench_parquet),
+            ("tabela sqlite", bench_table),
+        ):
+            result = bench(ticks, workdir)
+            if result is None:
+                print(f"{name:<22}{'pyarrow não instalado':>32}")
+                continue
+            size, decoded, elapsed = result
+            print(f"{name:<22}{size / decoded:>12.2f}{decoded / elapsed:>20,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Memória do SDK de métricas por 10 mil combinações de atributos, com e sem as proteções de
+`metricas_config.py`.
+
+Grava `--conjuntos` combinações distintas (`player` único por medição, `status` e `stage` com
+poucos valores) em um contador, em um `MeterProvider` isolado, e mede com `tracemalloc`:
+- memória retida pelo SDK depois das gravações e de uma coleta (bytes por 10 mil combinações);
+- tempo da coleta (o que o `PeriodicExportingMetricReader` paga a cada intervalo; com o
+  `tracemalloc` ligado fica várias vezes maior que em produção, vale a comparação entre casos);
+- pontos exportados na coleta seguinte, sem medições novas (delta não reexporta o que não mudou).
+
+Uso:
+    python benchmark_cardinalidade.py --conjuntos 50000
+"""
+import argparse
+import gc
+import tracemalloc
+from time import perf_counter
+
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.metrics.view import View
+
+from metricas_config import DELTA_TEMPORALITY, BoundedInstrument
+
+STATUSES = ("success", "failure")
+STAGES = ("extraction", "transformation", "loading")
+
+
+def points(metrics_data):
+    return sum(
+        len(metric.data.data_points)
+        for resource_metrics in metrics_data.resource_metrics
+        for scope_metrics in resource_metrics.scope_metrics
+        for metric in scope_metrics.metrics
+    ) if metrics_data else 0
+
+
+def run(total, temporality=None, views=(), limit=None):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    reader = InMemoryMetricReader(preferred_temporality=temporality)
+    provider = MeterProvider(metric_readers=[reader], views=views)
+    counter = provider.get_meter("benchmark").create_counter("records_processed")
+    if limit:
+        # Sem a allowlist do instrumento, para medir o limite sozinho
+        counter = BoundedInstrument(counter, max_attribute_sets=limit, attribute_keys=())
+    for i in range(total):
+        counter.add(1, {"player": f"player-{i}", "status": STATUSES[i % 2], "stage": STAGES[i % 3]})
+    start = perf_counter()
+    first = points(reader.get_metrics_data())
+    collect_ms = (perf_counter() - start) * 1000
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    second = points(reader.get_metrics_data())
+    tracemalloc.stop()
+    provider.shutdown()
+    return retained, collect_ms, first, second
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conjuntos", type=int, default=50_000)
+    parser.add_argument("--limite", type=int, default=2_000, help="max_attribute_sets do BoundedInstrument")
+    args = parser.parse_args()
+    n = args.conjuntos
+
+    cases = [
+        ("cumulativo", {}),
+        ("delta", {"temporality": DELTA_TEMPORALITY}),
+        ("delta + allowlist (View)", {
+            "temporality": DELTA_TEMPORALITY,
+            "views": [View(instrument_name="records_processed", attribute_keys={"status", "stage"})],
+        }),
+        (f"delta + limite {args.limite}", {"temporality": DELTA_TEMPORALITY, "limit": args.limite}),
+    ]
+    print(f"{'caso':<28}{'KiB/10k conjuntos':>18}{'retido (MiB)':>14}{'coleta (ms)':>13}{'pontos':>9}{'2ª coleta':>11}")
+    for name, kwargs in cases:
+        retained, collect_ms, first, second = run(n, **kwargs)
+        print(
+            f"{name:<28}{retained / n * 10_000 / 1024:>18,.0f}{retained / 2**20:>14.1f}"
+            f"{collect_ms:>13.1f}{first:>9}{second:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
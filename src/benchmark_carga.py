@@ -0,0 +1,71 @@
+"""Custo de CPU por linha: `load()` via ORM (como era em main_logfire_06.py) contra `carga_core`.
+
+Roda em um SQLite em memória para que o tempo medido seja quase só o overhead do Python/SQLAlchemy.
+
+Uso:
+    python benchmark_carga.py --linhas 5000
+"""
+import argparse
+from datetime import datetime, timezone
+from time import perf_counter, process_time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from carga_core import insert_rows, load_core, to_rows
+from modelos import Base, BitcoinData, BitcoinDataModel
+
+
+def orm_load(Session, record):
+    """Caminho antigo do load() dos scripts main_logfire_*.py: ORM + commit + leitura dos atributos para o log."""
+    session = Session()
+    bitcoin_entry = BitcoinDataModel(
+        amount=record.amount,
+        base=record.base,
+        currency=record.currency,
+        timestamp=datetime.now(timezone.utc)
+    )
+    session.add(bitcoin_entry)
+    session.commit()
+    _ = (bitcoin_entry.amount, bitcoin_entry.base, bitcoin_entry.currency, bitcoin_entry.timestamp)
+    session.close()
+
+
+def measure(name, total, func):
+    cpu, wall = process_time(), perf_counter()
+    func()
+    cpu, wall = process_time() - cpu, perf_counter() - wall
+    print(f"{name:<28}{cpu / total * 1e6:>12.1f}{wall / total * 1e6:>16.1f}")
+    return cpu / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=5_000)
+    parser.add_argument("--lote", type=int, default=100, help="linhas por transação no caso em lote")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    records = [BitcoinData(amount=f"{60000 + i / 100:.2f}", base="BTC", currency="USD") for i in range(args.linhas)]
+
+    def core_batches():
+        for i in range(0, len(records), args.lote):
+            with engine.begin() as conn:
+                insert_rows(conn, to_rows(records[i:i + args.lote]))
+
+    # Aquecimento: popula o cache de compilação dos dois caminhos
+    orm_load(Session, records[0])
+    load_core(engine, records[0])
+
+    print(f"{'caminho':<28}{'CPU µs/linha':>12}{'parede µs/linha':>16}")
+    orm = measure("ORM (load antigo)", args.linhas, lambda: [orm_load(Session, r) for r in records])
+    core = measure("Core, 1 linha/transação", args.linhas, lambda: [load_core(engine, r) for r in records])
+    measure(f"Core, {args.lote} linhas/transação", args.linhas, core_batches)
+    print(f"Core por linha usa {orm / core:.1f}x menos CPU que o ORM.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Overhead por chamada de `etapas.stage` contra o padrão manual antigo (datetime + span + record).
+
+Usa o SDK do OpenTelemetry sem exporters, para medir só o custo da instrumentação. O padrão antigo é
+a referência: a coluna "vs antigo" mostra quanto `stage()` custa a mais (positivo) ou a menos, com o
+trace amostrado e com o pai descartado pelo sampler. O overhead com o pai descartado além do
+`stage_duration.record` é medido com o histograma trocado por um no-op (meta: menos de 1 µs).
+
+Uso:
+    python benchmark_etapas.py --iteracoes 200000 --repeticoes 5
+"""
+import argparse
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from time import perf_counter_ns
+
+from opentelemetry import context, metrics, trace
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.trace import NonRecordingSpan, SpanContext, TraceFlags
+
+trace.set_tracer_provider(TracerProvider())
+metrics.set_meter_provider(MeterProvider(metric_readers=[InMemoryMetricReader()]))
+
+import etapas  # noqa: E402  (precisa dos providers já configurados)
+from etapas import stage, stage_duration  # noqa: E402
+
+tracer = trace.get_tracer("benchmark")
+
+
+def old_pattern():
+    with tracer.start_as_current_span("extract"):
+        start_time = datetime.now(timezone.utc)
+        duration = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
+        stage_duration.record(duration, {"stage": "extract"})
+
+
+def new_pattern():
+    with stage("extract"):
+        pass
+
+
+def histogram_only():
+    stage_duration.record(1.0, {"stage": "extract"})
+
+
+def empty():
+    pass
+
+
+def empty_context_manager():
+    with nullcontext():
+        pass
+
+
+class _NoopHistogram:
+    def record(self, amount, attributes=None):
+        pass
+
+
+def sampled_out():
+    """Contexto com um span pai válido mas não amostrado, como num trace descartado pelo sampler."""
+    parent = NonRecordingSpan(SpanContext(trace_id=1, span_id=1, is_remote=False, trace_flags=TraceFlags(0)))
+    return context.attach(trace.set_span_in_context(parent))
+
+
+@contextmanager
+def conditions(dropped=False, noop_histogram=False):
+    """Pai descartado no contexto e/ou `stage_duration` trocado por um no-op durante a rodada."""
+    token = sampled_out() if dropped else None
+    if noop_histogram:
+        etapas.stage_duration = _NoopHistogram()
+    try:
+        yield
+    finally:
+        etapas.stage_duration = stage_duration
+        if token is not None:
+            context.detach(token)
+
+
+def measure(cases, iterations, repeat=5):
+    """Menor média por chamada de cada caso entre `repeat` rodadas.
+
+    As rodadas são intercaladas (todos os casos na rodada 1, depois na 2...), então uma fase de ruído
+    da máquina pesa igual em todos e a comparação com o padrão antigo não depende da ordem dos casos.
+    """
+    best = {}
+    for _ in range(repeat):
+        for name, func, options in cases:
+            with conditions(**options):
+                start = perf_counter_ns()
+                for _ in range(iterations):
+                    func()
+                elapsed = (perf_counter_ns() - start) / iterations
+            best[name] = min(best.get(name, elapsed), elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iteracoes", type=int, default=200_000)
+    parser.add_argument("--repeticoes", type=int, default=5, help="rodadas intercaladas (vale a mais rápida de cada caso)")
+    args = parser.parse_args()
+
+    dropped = {"dropped": True}
+    best = measure([
+        ("chamada", empty, {}),
+        ("padrão antigo (amostrado)", old_pattern, {}),
+        ("stage() (amostrado)", new_pattern, {}),
+        ("padrão antigo (pai descartado)", old_pattern, dropped),
+        ("stage() (pai descartado)", new_pattern, dropped),
+        ("só stage_duration.record", histogram_only, dropped),
+        ("stage() sem histograma", new_pattern, {"dropped": True, "noop_histogram": True}),
+        ("context manager vazio", empty_context_manager, {}),
+    ], args.iteracoes, args.repeticoes)
+    call = best.pop("chamada")  # custo da chamada de função em si, descontado de todos os casos
+    cost = {name: ns - call for name, ns in best.items()}
+
+    print(f"{'caso':<34}{'ns/chamada':>12}{'vs antigo':>12}")
+    for context_ in ("amostrado", "pai descartado"):
+        baseline = cost[f"padrão antigo ({context_})"]
+        for name in (f"padrão antigo ({context_})", f"stage() ({context_})"):
+            print(f"{name:<34}{cost[name]:>12.0f}{cost[name] - baseline:>+12.0f}")
+    for name in ("só stage_duration.record", "context manager vazio"):
+        print(f"{name:<34}{cost[name]:>12.0f}")
+    print(f"stage() com pai descartado, além do histograma: {cost['stage() sem histograma']:.0f} ns (meta: < 1000 ns)")
+    old, new = cost["padrão antigo (amostrado)"], cost["stage() (amostrado)"]
+    if new > old:
+        print(f"REGRESSÃO: stage() amostrado custa {new / old:.2f}x o padrão antigo")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Vazão de export de spans: ConsoleSpanExporter (como nos exemplos) contra OTLP gRPC e HTTP em lote.
+
+Sobe o `coletor_local.LocalCollector` no próprio processo, gera `--spans` spans e mede:
+- vazão do produtor (spans/s criados pela aplicação);
+- tempo até tudo ser entregue (force_flush), spans recebidos pelo collector e perdidos com a fila cheia.
+
+Uso:
+    python benchmark_exportacao.py --spans 50000
+"""
+import argparse
+import os
+from time import perf_counter
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+from coletor_local import HAS_GRPC, LocalCollector
+from telemetria import configure_telemetry
+
+GRPC_PORT, HTTP_PORT = 14317, 14318
+
+
+def produce(tracer_provider, total):
+    tracer = tracer_provider.get_tracer("benchmark")
+    start = perf_counter()
+    for i in range(total):
+        with tracer.start_as_current_span("load") as span:
+            span.set_attribute("stage", "load")
+            span.set_attribute("iteration", i)
+    produced = perf_counter() - start
+    tracer_provider.force_flush()
+    return produced, perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spans", type=int, default=50_000)
+    parser.add_argument("--lote", type=int, default=512, help="max_export_batch_size")
+    parser.add_argument("--fila", type=int, default=8_192, help="max_queue_size")
+    args = parser.parse_args()
+
+    print(f"{'exporter':<22}{'produtor (spans/s)':>20}{'até entregar (s)':>18}{'recebidos':>12}{'perdidos':>10}")
+    with open(os.devnull, "w") as devnull:
+        provider = TracerProvider()
+        provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter(out=devnull)))
+        produced, delivered = produce(provider, args.spans)
+        provider.shutdown()
+        print(f"{'console (devnull)':<22}{args.spans / produced:>20,.0f}{delivered:>18.2f}{'-':>12}{'-':>10}")
+
+    with LocalCollector(GRPC_PORT, HTTP_PORT) as collector:
+        protocols = (("grpc", GRPC_PORT), ("http", HTTP_PORT)) if HAS_GRPC else (("http", HTTP_PORT),)
+        for protocol, port in protocols:  # gRPC só com o grpcio instalado
+            before = collector.stats["spans"]
+            tracer_provider, meter_provider = configure_telemetry(
+                "benchmark",
+                protocol=protocol,
+                endpoint=f"http://localhost:{port}",
+                max_export_batch_size=args.lote,
+                max_queue_size=args.fila,
+                schedule_delay_millis=200,
+                set_global=False,
+            )
+            produced, delivered = produce(tracer_provider, args.spans)
+            tracer_provider.shutdown()
+            meter_provider.shutdown()
+            received = collector.stats["spans"] - before
+            print(f"{'otlp ' + protocol + ' (gzip)':<22}{args.spans / produced:>20,.0f}{delivered:>18.2f}{received:>12}{args.spans - received:>10}")
+
+
+if __name__ == "__main__":
+    main()
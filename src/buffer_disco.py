@@ -0,0 +1,260 @@
+"""Buffer em disco para a telemetria sobreviver a quedas do collector.
+
+Se o collector (`grafana/otel-lgtm` do compose) ou o backend do Logfire cair, o `BatchSpanProcessor`
+descarta spans assim que a fila em memória enche, e perdemos justamente os traces que explicariam a
+queda. Os exporters daqui falam OTLP/HTTP diretamente e, quando o envio falha, gravam o lote já
+serializado (protobuf) em uma fila em disco limitada em bytes. Uma thread reenvia os lotes em ordem,
+com backoff exponencial, quando o endpoint volta. Enquanto houver fila, lotes novos também vão para
+o disco, para não passarem na frente dos antigos.
+
+Métricas: `telemetry_spill_bytes`, `telemetry_spill_batches` e `telemetry_replay_lag` (idade, em
+segundos, do lote mais antigo ainda não reenviado), além dos contadores de lotes gravados,
+reenviados e descartados.
+
+Uso (collector local ou Logfire, que também aceita OTLP/HTTP):
+
+    exporter = DiskBufferedSpanExporter("http://localhost:4318", "/var/tmp/otel-buffer")
+    exporter = DiskBufferedSpanExporter(
+        "https://logfire-api.pydantic.dev", "/var/tmp/otel-buffer", headers={"Authorization": token}
+    )
+"""
+import gzip
+import os
+import random
+import threading
+import weakref
+from time import time
+
+import requests
+from opentelemetry import metrics
+from opentelemetry.exporter.otlp.proto.common.metrics_encoder import encode_metrics
+from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+from opentelemetry.metrics import Observation
+from opentelemetry.sdk.metrics.export import MetricExporter, MetricExportResult
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+SIGNAL_PATHS = {"traces": "/v1/traces", "metrics": "/v1/metrics"}
+
+_meter = metrics.get_meter("pipeline_etl.buffer_disco")
+spill_events = _meter.create_counter(
+    "telemetry_spill_events",
+    unit="1",
+    description="Lotes de telemetria gravados, reenviados ou descartados pelo buffer em disco",
+)
+_senders = weakref.WeakSet()
+
+
+def _observe(measure):
+    def callback(options):
+        return [Observation(measure(sender), {"endpoint": sender.endpoint}) for sender in list(_senders)]
+    return callback
+
+
+_meter.create_observable_gauge(
+    "telemetry_spill_bytes",
+    callbacks=[_observe(lambda sender: sender.queue.size_bytes)],
+    unit="By",
+    description="Bytes de telemetria aguardando reenvio no disco",
+)
+_meter.create_observable_gauge(
+    "telemetry_spill_batches",
+    callbacks=[_observe(lambda sender: len(sender.queue))],
+    unit="1",
+    description="Lotes de telemetria aguardando reenvio no disco",
+)
+_meter.create_observable_gauge(
+    "telemetry_replay_lag",
+    callbacks=[_observe(lambda sender: sender.replay_lag())],
+    unit="s",
+    description="Idade do lote mais antigo ainda não reenviado",
+)
+
+
+class DiskQueue:
+    """Fila FIFO de lotes serializados em um diretório, limitada a `max_bytes`."""
+
+    def __init__(self, directory, max_bytes=100 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries = []  # (caminho, bytes), do mais antigo para o mais novo
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".pb"):
+                path = os.path.join(directory, name)
+                self._entries.append((path, os.path.getsize(path)))
+        self._bytes = sum(size for _, size in self._entries)
+        self._sequence = int(os.path.basename(self._entries[-1][0]).split("-")[0]) + 1 if self._entries else 0
+
+    def put(self, signal, payload):
+        """Grava um lote; se passar do limite, descarta os mais antigos. Devolve quantos foram descartados."""
+        with self._lock:
+            name = f"{self._sequence:012d}-{int(time() * 1000)}.{signal}.pb"
+            self._sequence += 1
+            path = os.path.join(self.directory, name)
+            with open(path + ".tmp", "wb") as file:
+                file.write(payload)
+            os.replace(path + ".tmp", path)  # rename atômico: nunca fica um lote pela metade
+            self._entries.append((path, len(payload)))
+            self._bytes += len(payload)
+            discarded = 0
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                self._remove(0)
+                discarded += 1
+            return discarded
+
+    def _remove(self, index):
+        path, size = self._entries.pop(index)
+        self._bytes -= size
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def oldest(self):
+        """(caminho, sinal, criado_em_s) do lote mais antigo, ou None."""
+        with self._lock:
+            if not self._entries:
+                return None
+            path = self._entries[0][0]
+        sequence_and_time, signal, _ = os.path.basename(path).split(".")
+        return path, signal, int(sequence_and_time.split("-")[1]) / 1000
+
+    def remove(self, path):
+        with self._lock:
+            for index, (entry_path, _) in enumerate(self._entries):
+                if entry_path == path:
+                    self._remove(index)
+                    return
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+
+class DiskBufferedSender:
+    """Envia lotes OTLP/HTTP e guarda no `DiskQueue` o que não pôde ser entregue."""
+
+    def __init__(self, endpoint, directory, max_bytes=100 * 1024 * 1024, headers=None, timeout=10,
+                 backoff_initial_s=1.0, backoff_max_s=60.0):
+        self.endpoint = endpoint.rstrip("/")
+        self.queue = DiskQueue(directory, max_bytes)
+        self.timeout = timeout
+        self.backoff_initial_s = backoff_initial_s
+        self.backoff_max_s = backoff_max_s
+        self._session = requests.Session()
+        self._session.headers.update({
+            "Content-Type": "application/x-protobuf",
+            "Content-Encoding": "gzip",
+            **(headers or {}),
+        })
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._replay_loop, name="OtelDiskReplay", daemon=True)
+        self._thread.start()
+        _senders.add(self)
+
+    def _post(self, signal, payload):
+        """Devolve 'ok', 'retry' (vale tentar de novo) ou 'reject' (erro permanente do servidor)."""
+        try:
+            response = self._session.post(
+                self.endpoint + SIGNAL_PATHS[signal], data=gzip.compress(payload), timeout=self.timeout
+            )
+        except requests.RequestException:
+            return "retry"
+        if response.ok:
+            return "ok"
+        if response.status_code in (408, 429) or response.status_code >= 500:
+            return "retry"
+        return "reject"
+
+    def send(self, signal, payload):
+        """Envia na hora se não há fila; senão (ou se falhar) grava no disco para o replay."""
+        if len(self.queue) == 0:
+            outcome = self._post(signal, payload)
+            if outcome == "ok":
+                return True
+            if outcome == "reject":
+                spill_events.add(1, {"signal": signal, "event": "rejected"})
+                return False
+        discarded = self.queue.put(signal, payload)
+        spill_events.add(1, {"signal": signal, "event": "spilled"})
+        if discarded:
+            spill_events.add(discarded, {"signal": signal, "event": "discarded"})
+        self._wake.set()
+        return True
+
+    def replay_lag(self):
+        oldest = self.queue.oldest()
+        return time() - oldest[2] if oldest else 0.0
+
+    def _replay_loop(self):
+        backoff = self.backoff_initial_s
+        while not self._stop.is_set():
+            oldest = self.queue.oldest()
+            if oldest is None:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            path, signal, _ = oldest
+            try:
+                with open(path, "rb") as file:
+                    payload = file.read()
+            except FileNotFoundError:
+                # Descartado pelo limite de bytes enquanto isso (remove é no-op) ou apagado por fora do
+                # buffer: tira a entrada da fila, senão oldest() devolve o mesmo caminho para sempre
+                self.queue.remove(path)
+                continue
+            outcome = self._post(signal, payload)
+            if outcome == "retry":
+                # Backoff exponencial com jitter até o endpoint voltar
+                self._stop.wait(backoff * random.uniform(0.5, 1.0))
+                backoff = min(backoff * 2, self.backoff_max_s)
+                continue
+            self.queue.remove(path)
+            spill_events.add(1, {"signal": signal, "event": "replayed" if outcome == "ok" else "rejected"})
+            backoff = self.backoff_initial_s
+
+    def shutdown(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self._session.close()
+
+
+class DiskBufferedSpanExporter(SpanExporter):
+    """Exporter OTLP/HTTP de spans com buffer em disco."""
+
+    def __init__(self, endpoint, directory, **kwargs):
+        self.sender = DiskBufferedSender(endpoint, directory, **kwargs)
+
+    def export(self, spans):
+        ok = self.sender.send("traces", encode_spans(spans).SerializeToString())
+        return SpanExportResult.SUCCESS if ok else SpanExportResult.FAILURE
+
+    def shutdown(self):
+        self.sender.shutdown()
+
+    def force_flush(self, timeout_millis=30_000):
+        return True
+
+
+class DiskBufferedMetricExporter(MetricExporter):
+    """Exporter OTLP/HTTP de métricas com buffer em disco."""
+
+    def __init__(self, endpoint, directory, preferred_temporality=None, preferred_aggregation=None, **kwargs):
+        super().__init__(preferred_temporality=preferred_temporality, preferred_aggregation=preferred_aggregation)
+        self.sender = DiskBufferedSender(endpoint, directory, **kwargs)
+
+    def export(self, metrics_data, timeout_millis=10_000, **kwargs):
+        ok = self.sender.send("metrics", encode_metrics(metrics_data).SerializeToString())
+        return MetricExportResult.SUCCESS if ok else MetricExportResult.FAILURE
+
+    def shutdown(self, timeout_millis=30_000, **kwargs):
+        self.sender.shutdown()
+
+    def force_flush(self, timeout_millis=10_000):
+        return True
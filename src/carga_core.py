@@ -0,0 +1,46 @@
+"""Carga rápida em `bitcoin_data` via SQLAlchemy Core, sem passar pelo ORM.
+
+O `load()` dos scripts main_logfire_*.py cria um `BitcoinDataModel`, passa pelo flush da
+unit-of-work e, depois do commit, lê `bitcoin_entry.amount` etc. para o log, o que dispara um
+SELECT de refresh. Aqui o INSERT é construído uma única vez (o SQLAlchemy guarda a versão
+compilada no cache da engine) e executado sem identity map nem instrumentação de atributos.
+Os registros viram tuplas (amount, base, currency, timestamp), que `load_core` devolve para o
+log; na execução elas passam a dicts de parâmetros, porque o `Connection.execute` do Core só
+aceita mapeamentos (a alternativa posicional, `exec_driver_sql`, depende do paramstyle de cada
+driver). main_logfire_06.py e main_logfire_07_lag.py carregam por aqui.
+"""
+from datetime import datetime, timezone
+
+from pydantic import BaseModel
+from sqlalchemy import insert
+
+from modelos import BitcoinDataModel
+
+COLUMNS = ("amount", "base", "currency", "timestamp")
+
+# Statement montado uma vez no import; a compilação fica no cache da engine após a 1ª execução
+INSERT_BITCOIN_DATA = insert(BitcoinDataModel.__table__)
+
+
+def to_rows(records, timestamp=None):
+    """Converte registros `BitcoinData` validados em tuplas (amount, base, currency, timestamp)."""
+    timestamp = timestamp or datetime.now(timezone.utc)
+    return [(record.amount, record.base, record.currency, timestamp) for record in records]
+
+
+def insert_rows(conn, rows):
+    """Executa o INSERT pré-montado para uma lista de tuplas, em uma conexão já aberta.
+
+    As tuplas viram dicts aqui: o executemany do Core recebe os parâmetros como mapeamentos.
+    """
+    conn.execute(INSERT_BITCOIN_DATA, [dict(zip(COLUMNS, row)) for row in rows])
+
+
+def load_core(engine, records, timestamp=None):
+    """Insere registros validados em uma transação e devolve as tuplas gravadas (para log)."""
+    if isinstance(records, BaseModel):  # um registro só (o BitcoinData de modelos.py ou dos scripts)
+        records = [records]
+    rows = to_rows(records, timestamp)
+    with engine.begin() as conn:
+        insert_rows(conn, rows)
+    return rows
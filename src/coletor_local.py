@@ -0,0 +1,158 @@
+"""Collector OTLP de mentira para testes e benchmarks locais (gRPC na 4317 e HTTP na 4318).
+
+Recebe traces e métricas como o `otel-collector` de `exemplo_logfire/otel-collector-config.yaml`,
+mas só conta o que chegou (requisições, spans, pontos de métrica, exemplars e bytes). Com
+`fail=True` todas as requisições respondem UNAVAILABLE/503, para simular o collector fora do ar.
+A parte gRPC precisa do `grpcio` (não está nas dependências do projeto); sem ele, ou com
+`grpc_port=None`, só o receptor HTTP sobe.
+
+Uso:
+    python coletor_local.py --porta-grpc 4317 --porta-http 4318
+"""
+import argparse
+import gzip
+import threading
+import zlib
+from collections import Counter
+from concurrent import futures
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from importlib.util import find_spec
+from time import sleep
+
+from opentelemetry.proto.collector.metrics.v1 import metrics_service_pb2
+from opentelemetry.proto.collector.trace.v1 import trace_service_pb2
+
+HAS_GRPC = find_spec("grpc") is not None
+
+
+class LocalCollector:
+    """Recebe OTLP por gRPC e HTTP e acumula contadores em `stats`."""
+
+    def __init__(self, grpc_port=4317, http_port=4318):
+        self.grpc_port = grpc_port
+        self.http_port = http_port
+        self.stats = Counter()
+        self.fail = False
+        self._lock = threading.Lock()
+        self._grpc_server = None
+        self._http_server = None
+
+    def _count_traces(self, request, size):
+        spans = sum(len(scope.spans) for resource in request.resource_spans for scope in resource.scope_spans)
+        with self._lock:
+            self.stats["trace_requests"] += 1
+            self.stats["spans"] += spans
+            self.stats["trace_bytes"] += size
+
+    def _count_metrics(self, request, size):
+        points = exemplars = 0
+        for resource in request.resource_metrics:
+            for scope in resource.scope_metrics:
+                for metric in scope.metrics:
+                    data = getattr(metric, metric.WhichOneof("data"))
+                    points += len(data.data_points)
+                    exemplars += sum(len(point.exemplars) for point in data.data_points if hasattr(point, "exemplars"))
+        with self._lock:
+            self.stats["metric_requests"] += 1
+            self.stats["metric_points"] += points
+            self.stats["exemplars"] += exemplars
+            self.stats["metric_bytes"] += size
+
+    def _start_grpc(self):
+        import grpc
+        from opentelemetry.proto.collector.metrics.v1 import metrics_service_pb2_grpc
+        from opentelemetry.proto.collector.trace.v1 import trace_service_pb2_grpc
+
+        collector = self
+
+        class TraceService(trace_service_pb2_grpc.TraceServiceServicer):
+            def Export(self, request, context):
+                if collector.fail:
+                    context.abort(grpc.StatusCode.UNAVAILABLE, "collector indisponível")
+                collector._count_traces(request, request.ByteSize())
+                return trace_service_pb2.ExportTraceServiceResponse()
+
+        class MetricsService(metrics_service_pb2_grpc.MetricsServiceServicer):
+            def Export(self, request, context):
+                if collector.fail:
+                    context.abort(grpc.StatusCode.UNAVAILABLE, "collector indisponível")
+                collector._count_metrics(request, request.ByteSize())
+                return metrics_service_pb2.ExportMetricsServiceResponse()
+
+        self._grpc_server = grpc.server(futures.ThreadPoolExecutor(max_workers=8))
+        trace_service_pb2_grpc.add_TraceServiceServicer_to_server(TraceService(), self._grpc_server)
+        metrics_service_pb2_grpc.add_MetricsServiceServicer_to_server(MetricsService(), self._grpc_server)
+        self._grpc_server.add_insecure_port(f"localhost:{self.grpc_port}")
+        self._grpc_server.start()
+
+    def start(self):
+        collector = self
+
+        class HttpHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if collector.fail:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                encoding = self.headers.get("Content-Encoding")
+                if encoding == "gzip":
+                    body = gzip.decompress(body)
+                elif encoding == "deflate":
+                    body = zlib.decompress(body)
+                if self.path == "/v1/traces":
+                    request = trace_service_pb2.ExportTraceServiceRequest.FromString(body)
+                    collector._count_traces(request, len(body))
+                    response = trace_service_pb2.ExportTraceServiceResponse()
+                elif self.path == "/v1/metrics":
+                    request = metrics_service_pb2.ExportMetricsServiceRequest.FromString(body)
+                    collector._count_metrics(request, len(body))
+                    response = metrics_service_pb2.ExportMetricsServiceResponse()
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                payload = response.SerializeToString()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-protobuf")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        if self.grpc_port and HAS_GRPC:
+            self._start_grpc()
+        self._http_server = ThreadingHTTPServer(("localhost", self.http_port), HttpHandler)
+        threading.Thread(target=self._http_server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._grpc_server is not None:
+            self._grpc_server.stop(grace=None)
+        if self._http_server is not None:
+            self._http_server.shutdown()
+            self._http_server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--porta-grpc", type=int, default=4317)
+    parser.add_argument("--porta-http", type=int, default=4318)
+    args = parser.parse_args()
+    with LocalCollector(args.porta_grpc, args.porta_http) as collector:
+        grpc = f"gRPC em {args.porta_grpc} e " if HAS_GRPC else ""
+        print(f"Collector local ouvindo {grpc}HTTP em {args.porta_http}. Ctrl+C para sair.")
+        try:
+            while True:
+                sleep(5)
+                print(dict(collector.stats))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,165 @@
+"""Fábrica de engines compartilhada, com pool configurável e telemetria do pool.
+
+Os scripts chamavam `create_engine(POSTGRES_URI)` com o pool padrão e sem pre-ping, então uma
+conexão derrubada pelo Postgres do Render só aparecia como commit falhando no meio do loop.
+`get_engine()` devolve uma engine por URL (usuário, host, banco e query; só a senha fica fora da
+chave) com:
+- `pool_pre_ping` (testa a conexão no checkout e descarta as mortas);
+- `pool_recycle` (recicla conexões antes do timeout de ociosidade do servidor);
+- `pool_use_lifo` (reusa a conexão mais recente, deixando as demais envelhecerem e serem recicladas);
+- tamanho, overflow e timeout configuráveis por argumento ou variáveis de ambiente DB_POOL_*.
+
+A engine é criada na primeira chamada e as seguintes recebem a mesma; chamar de novo com opções
+diferentes (ex.: outro `pool_size`) levanta `ValueError` em vez de devolver em silêncio um pool
+configurado de outro jeito.
+
+Métricas publicadas (atributo `pool` = host/banco):
+- `db_pool_checkout_latency` (ms): espera para obter uma conexão do pool;
+- `db_pool_in_use`, `db_pool_idle`, `db_pool_overflow`: conexões em uso, livres e além de pool_size;
+- `db_pool_invalidations`: conexões invalidadas (atributo `soft` para invalidações suaves);
+- `db_pool_connects`: conexões novas abertas no banco.
+"""
+import os
+import threading
+from time import perf_counter
+
+import logfire
+from opentelemetry.metrics import Observation
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from modelos import POSTGRES_URI
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "5"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # segundos
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # segundos
+
+checkout_latency = logfire.metric_histogram(
+    "db_pool_checkout_latency",
+    unit="ms",
+    description="Tempo de espera para obter uma conexão do pool"
+)
+invalidations = logfire.metric_counter(
+    "db_pool_invalidations",
+    unit="1",
+    description="Conexões do pool invalidadas"
+)
+connects = logfire.metric_counter(
+    "db_pool_connects",
+    unit="1",
+    description="Conexões novas abertas no banco pelo pool"
+)
+
+_engines = {}  # nome do pool (métricas) -> engine
+_by_url = {}  # URL sem senha -> (nome do pool, opções de criação)
+_lock = threading.Lock()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool que mede o tempo de checkout (inclui a espera quando o pool está esgotado)."""
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            checkout_latency.record((perf_counter() - start) * 1000, {"pool": self.logging_name})
+
+
+def pool_name(uri):
+    """Nome do pool para as métricas, sem usuário nem senha."""
+    url = make_url(uri)
+    return f"{url.host or url.drivername}/{url.database or ''}"
+
+
+def engine_key(uri):
+    """Chave do cache de engines: a URL completa, com a senha mascarada."""
+    return make_url(uri).render_as_string(hide_password=True)
+
+
+def _pool_observations(measure):
+    def callback(options):
+        for name, engine in list(_engines.items()):
+            yield Observation(measure(engine.pool), {"pool": name})
+    return callback
+
+
+logfire.metric_gauge_callback(
+    "db_pool_in_use",
+    callbacks=[_pool_observations(lambda pool: pool.checkedout())],
+    unit="1",
+    description="Conexões do pool em uso"
+)
+logfire.metric_gauge_callback(
+    "db_pool_idle",
+    callbacks=[_pool_observations(lambda pool: pool.checkedin())],
+    unit="1",
+    description="Conexões livres no pool"
+)
+logfire.metric_gauge_callback(
+    "db_pool_overflow",
+    callbacks=[_pool_observations(lambda pool: max(pool.overflow(), 0))],
+    unit="1",
+    description="Conexões abertas além de pool_size"
+)
+
+
+def _instrument_pool(engine, name):
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        connects.add(1, {"pool": name})
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        invalidations.add(1, {"pool": name, "soft": False})
+
+    @event.listens_for(engine, "soft_invalidate")
+    def on_soft_invalidate(dbapi_connection, connection_record, exception):
+        invalidations.add(1, {"pool": name, "soft": True})
+
+
+def get_engine(
+    uri=POSTGRES_URI,
+    pool_size=POOL_SIZE,
+    max_overflow=MAX_OVERFLOW,
+    pool_recycle=POOL_RECYCLE,
+    pool_timeout=POOL_TIMEOUT,
+    pool_pre_ping=True,
+    pool_use_lifo=True,
+    **kwargs,
+):
+    """Devolve a engine compartilhada de `uri`, criando-a na primeira chamada."""
+    key = engine_key(uri)
+    options = dict(
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_recycle=pool_recycle,
+        pool_timeout=pool_timeout,
+        pool_pre_ping=pool_pre_ping,
+        pool_use_lifo=pool_use_lifo,
+        **kwargs,
+    )
+    with _lock:
+        cached = _by_url.get(key)
+        if cached is not None:
+            name, cached_options = cached
+            if options != cached_options:
+                changed = sorted(k for k in {*options, *cached_options} if options.get(k) != cached_options.get(k))
+                raise ValueError(f"A engine de {key} já existe com outras opções ({', '.join(changed)})")
+            return _engines[name]
+        name = pool_name(uri)
+        if name in _engines:
+            # Mesmo host/banco com outro usuário ou query: pool separado, com nome distinto nas métricas
+            name = f"{name}#{sum(1 for other in _engines if other.split('#')[0] == name) + 1}"
+        url = make_url(uri)
+        if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+            # SQLite em memória só existe dentro de uma conexão: mantém o pool padrão dele
+            engine = create_engine(url, pool_logging_name=name, **kwargs)
+        else:
+            engine = create_engine(url, poolclass=TimedQueuePool, pool_logging_name=name, **options)
+        _instrument_pool(engine, name)
+        _engines[name] = engine
+        _by_url[key] = (name, options)
+        return engine
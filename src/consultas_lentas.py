@@ -0,0 +1,235 @@
+"""Log de consultas lentas com captura automática do plano (EXPLAIN).
+
+O `logfire.instrument_sqlalchemy(engine=engine)` mostra quanto cada statement demorou, mas não por
+quê: quando a `bitcoin_data` cresce, o `SELECT` que era um index scan pode virar seq scan e o trace
+não diz isso. `install_slow_query_explain(engine)` registra eventos na engine que, para statements
+acima de `threshold_ms`:
+- calculam um fingerprint do statement (literais, números e listas `IN (...)` normalizados);
+- se esse fingerprint não foi explicado nos últimos `min_interval_s` segundos, enfileiram o
+  statement e os parâmetros para uma thread que roda `EXPLAIN (ANALYZE off, FORMAT JSON)` em outra
+  conexão do pool (conexão DBAPI crua: o EXPLAIN não gera span nem dispara estes eventos);
+- emitem um `logfire.warn` filho do span do statement com o resumo do plano: `db.plan.scans`
+  (ex.: "Seq Scan on bitcoin_data"), `db.plan.node_types`, `db.plan.seq_scans`,
+  `db.plan.estimated_rows`, `db.plan.total_cost` e o plano JSON (truncado em `db.plan.json`).
+
+A consulta original não espera o EXPLAIN: a fila é limitada e, se estiver cheia, a captura é
+descartada. O contador `db_slow_queries` conta todas as consultas lentas por fingerprint, com
+`explained` indicando se o plano foi capturado.
+
+Só Postgres tem o EXPLAIN em JSON; no SQLite (pipeline local) usamos `EXPLAIN QUERY PLAN`, que traz
+os scans mas não estimativas de linhas/custo. Outros bancos: a engine não é instrumentada.
+
+Uso, depois do `instrument_sqlalchemy` (para o aviso sair como filho do span do statement):
+
+    logfire.instrument_sqlalchemy(engine=engine)
+    install_slow_query_explain(engine)
+"""
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import weakref
+from collections import OrderedDict
+from time import monotonic, perf_counter
+
+import logfire
+from opentelemetry import context as otel_context
+from opentelemetry import metrics, trace
+from sqlalchemy import event
+
+THRESHOLD_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+MIN_INTERVAL_S = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "600"))
+MAX_PLAN_CHARS = 8192  # plano JSON no atributo do aviso
+MAX_FINGERPRINTS = 1000
+
+_meter = metrics.get_meter("pipeline_etl.consultas_lentas")
+slow_queries = _meter.create_counter(
+    "db_slow_queries",
+    unit="1",
+    description="Statements acima do limite de consulta lenta, por fingerprint",
+)
+
+_EXPLAINABLE = re.compile(r"^\s*(select|insert|update|delete|with|values)\b", re.IGNORECASE)
+_NORMALIZE = (
+    (re.compile(r"'(?:[^']|'')*'"), "?"),  # literais de texto
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),  # números
+    (re.compile(r"%\(\w+\)s|%s|:\w+|\$\d+"), "?"),  # placeholders dos drivers
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)"), "(?+)"),  # IN (?, ?, ...) e VALUES de tamanhos diferentes
+    (re.compile(r"\s+"), " "),
+)
+
+
+def fingerprint(statement):
+    """Forma normalizada do statement e um hash curto dela (iguais para consultas do mesmo formato)."""
+    normalized = statement.strip()
+    for pattern, replacement in _NORMALIZE:
+        normalized = pattern.sub(replacement, normalized)
+    normalized = normalized.lower()
+    return normalized, hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+def summarize_postgres_plan(plan_json):
+    """Resumo do `EXPLAIN (FORMAT JSON)` do Postgres: scans, tipos de nó, linhas e custo estimados."""
+    root = plan_json[0]["Plan"]
+    scans, node_types = [], []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        node_type = node["Node Type"]
+        if node_type not in node_types:
+            node_types.append(node_type)
+        if "Relation Name" in node:
+            scan = f"{node_type} on {node['Relation Name']}"
+            if "Index Name" in node:
+                scan += f" using {node['Index Name']}"
+            scans.append(scan)
+        stack.extend(reversed(node.get("Plans", ())))
+    return {
+        "db.plan.scans": scans,
+        "db.plan.node_types": node_types,
+        "db.plan.seq_scans": sum(scan.startswith("Seq Scan") for scan in scans),
+        "db.plan.estimated_rows": root.get("Plan Rows"),
+        "db.plan.total_cost": root.get("Total Cost"),
+    }
+
+
+def summarize_sqlite_plan(rows):
+    """Resumo do `EXPLAIN QUERY PLAN` do SQLite (linhas `id, parent, notused, detail`)."""
+    details = [row[3] for row in rows]
+    scans = [detail for detail in details if detail.startswith(("SCAN", "SEARCH"))]
+    return {
+        "db.plan.scans": scans,
+        "db.plan.node_types": list(dict.fromkeys(detail.split(" ", 1)[0] for detail in details)),
+        "db.plan.seq_scans": sum(detail.startswith("SCAN") and " INDEX " not in detail for detail in scans),
+    }
+
+
+def _explain_postgres(cursor, statement, parameters):
+    cursor.execute("SET LOCAL statement_timeout = 5000")
+    cursor.execute("EXPLAIN (ANALYZE off, FORMAT JSON) " + statement, parameters)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):  # drivers que não decodificam json
+        plan = json.loads(plan)
+    return summarize_postgres_plan(plan), json.dumps(plan)
+
+
+def _explain_sqlite(cursor, statement, parameters):
+    cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+    rows = cursor.fetchall()
+    return summarize_sqlite_plan(rows), json.dumps([row[3] for row in rows])
+
+
+_EXPLAIN = {"postgresql": _explain_postgres, "sqlite": _explain_sqlite}
+_explainers = weakref.WeakKeyDictionary()  # engine -> SlowQueryExplainer (uma instrumentação por engine)
+
+
+class SlowQueryExplainer:
+    """Eventos da engine que medem cada statement e explicam os lentos em uma thread separada."""
+
+    def __init__(self, engine, threshold_ms=THRESHOLD_MS, min_interval_s=MIN_INTERVAL_S, max_pending=16):
+        self.engine = engine
+        self.threshold_ms = threshold_ms
+        self.min_interval_s = min_interval_s
+        self._explain = _EXPLAIN[engine.dialect.name]
+        self._last_explained = OrderedDict()  # fingerprint -> monotonic do último EXPLAIN
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        context._slow_query_started = perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_slow_query_started", None)
+        if started is None:
+            return
+        duration_ms = (perf_counter() - started) * 1000
+        if duration_ms < self.threshold_ms:
+            return
+        normalized, digest = fingerprint(statement)
+        explained = _EXPLAINABLE.match(statement) is not None and self._should_explain(digest)
+        if explained:
+            # Span do statement criado pelo instrument_sqlalchemy; sem ele, o span atual (a etapa)
+            span = getattr(context, "_otel_span", None) or trace.get_current_span()
+            if executemany:
+                parameters = parameters[0] if parameters else None
+            try:
+                self._queue.put_nowait((statement, parameters, normalized, digest, duration_ms, span.get_span_context()))
+                self._ensure_thread()
+            except queue.Full:
+                explained = False
+        slow_queries.add(1, {"db.statement.fingerprint": digest, "explained": explained})
+
+    def _should_explain(self, digest):
+        now = monotonic()
+        with self._lock:
+            last = self._last_explained.get(digest)
+            if last is not None and now - last < self.min_interval_s:
+                return False
+            self._last_explained[digest] = now
+            self._last_explained.move_to_end(digest)
+            if len(self._last_explained) > MAX_FINGERPRINTS:
+                self._last_explained.popitem(last=False)
+            return True
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="SlowQueryExplain", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._explain_and_log(*job)
+            except Exception as e:
+                logfire.error(f"Erro ao capturar o EXPLAIN da consulta lenta: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _explain_and_log(self, statement, parameters, normalized, digest, duration_ms, span_context):
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            try:
+                summary, plan = self._explain(cursor, statement, parameters)
+            finally:
+                cursor.close()
+            connection.rollback()
+        finally:
+            connection.close()
+        token = otel_context.attach(trace.set_span_in_context(trace.NonRecordingSpan(span_context)))
+        try:
+            logfire.warn(
+                "Consulta lenta ({duration_ms:.0f} ms): {scans}",
+                duration_ms=duration_ms,
+                scans=", ".join(summary["db.plan.scans"]) or "sem scans",
+                **{
+                    "db.statement": normalized,
+                    "db.statement.fingerprint": digest,
+                    **{key: value for key, value in summary.items() if value is not None},
+                    "db.plan.json": plan[:MAX_PLAN_CHARS],
+                },
+            )
+        finally:
+            otel_context.detach(token)
+
+    def flush(self):
+        """Espera os EXPLAINs pendentes (útil no fim de scripts e benchmarks)."""
+        self._queue.join()
+
+
+def install_slow_query_explain(engine, **kwargs):
+    """Instrumenta `engine` (Postgres ou SQLite) e devolve o `SlowQueryExplainer`; None em outros bancos."""
+    if engine.dialect.name not in _EXPLAIN:
+        return None
+    explainer = _explainers.get(engine)
+    if explainer is None:
+        explainer = _explainers[engine] = SlowQueryExplainer(engine, **kwargs)
+    return explainer
@@ -0,0 +1,119 @@
+"""Instrumentação das etapas do pipeline: span + histograma `stage_duration` em uma chamada.
+
+Antes, cada etapa fazia `datetime.now(timezone.utc)` antes e depois, calculava o delta, chamava
+`stage_duration.record` e ainda abria um `logfire.span`. Agora:
+
+    with stage("extract", "Fazendo a requisição para obter o valor do Bitcoin"):
+        ...
+
+    @stage("load")
+    def load(data):
+        ...
+
+- a duração vem de `perf_counter_ns` (monotônico, sem alocar datetime);
+- o tempo de CPU da thread (`thread_time_ns`) vai para `stage_cpu_time` e para o atributo `cpu_ms`
+  do span: `stage_duration` alto com CPU baixa é espera de rede/banco, não processamento. Só é medido
+  em traces amostrados e, entre eles, numa fração aleatória `CPU_SAMPLE_RATE` das etapas: a
+  distribuição de `stage_cpu_time` continua representativa, mas a contagem dele é ~10% da de
+  `stage_duration`;
+- o histograma é gravado com o span ainda ativo, então exemplars apontam para o trace certo;
+- exceções marcam o span com status de erro e o histograma com o atributo `error`;
+- se o span pai já foi descartado pelo sampler, nenhum span é criado e o tempo de CPU não é medido:
+  só o `stage_duration` é gravado.
+
+`benchmark_etapas.py` usa o padrão manual antigo (datetime + `start_as_current_span` + record) como
+referência. Amostrado, `stage()` saiu de 0,4 a 3,4 µs mais barato que ele (~29 µs por chamada, quase
+tudo no SDK). Com o pai descartado, a meta de menos de 1 µs além do `stage_duration.record` não é
+atingida: medimos de 1,5 a 1,9 µs, dos quais ~0,5 µs são o próprio protocolo de context manager e
+~0,6 µs a consulta ao span atual no contexto do OpenTelemetry.
+
+Os limites de bucket vão como `explicit_bucket_boundaries_advisory`. O SDK do OpenTelemetry os usa
+por padrão (e `metricas_config.metric_views()` os fixa com uma View), mas o `logfire.configure()`
+instala uma View que troca todos os histogramas por exponenciais e não aceita Views próprias: nos
+scripts main_logfire_*.py o `stage_duration` sai com buckets exponenciais, não com `STAGE_BUCKETS_MS`.
+"""
+import functools
+from random import random
+from time import perf_counter_ns, thread_time_ns
+
+from opentelemetry import context, metrics, trace
+from opentelemetry.trace import Status, StatusCode
+
+# Limites dos buckets de stage_duration em ms (extract/load ficam em dezenas a centenas de ms)
+STAGE_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Fração das etapas amostradas que medem tempo de CPU (o record extra custaria ~4 µs em toda chamada)
+CPU_SAMPLE_RATE = 0.1
+
+_tracer = trace.get_tracer("pipeline_etl")
+_current_context = context.get_current
+_current_span = trace.get_current_span
+# {"stage": nome} reaproveitado entre chamadas: o caminho sem erro não monta um dict novo
+_attributes = {}
+_meter = metrics.get_meter("pipeline_etl")
+
+stage_duration = _meter.create_histogram(
+    "stage_duration",
+    unit="ms",
+    description="Duração das etapas do pipeline ETL",
+    explicit_bucket_boundaries_advisory=STAGE_BUCKETS_MS,
+)
+stage_cpu_time = _meter.create_histogram(
+    "stage_cpu_time",
+    unit="ms",
+    description="Tempo de CPU da thread em cada etapa do pipeline ETL",
+    explicit_bucket_boundaries_advisory=STAGE_BUCKETS_MS,
+)
+
+
+class stage:
+    """Context manager/decorador que abre o span da etapa e grava `stage_duration`."""
+
+    __slots__ = ("name", "span_name", "_span", "_token", "_start", "_cpu_start")
+
+    def __init__(self, name, span_name=None):
+        self.name = name
+        self.span_name = span_name or name
+
+    def __enter__(self):
+        # Um único get_current() serve à checagem do pai, ao start_span e ao attach
+        ctx = _current_context()
+        parent = _current_span(ctx).get_span_context()
+        if parent.is_valid and not parent.trace_flags.sampled:
+            # Trace descartado pelo sampler: sem span e sem tempo de CPU, só o stage_duration
+            self._span = None
+        else:
+            self._span = _tracer.start_span(self.span_name, ctx, attributes={"stage": self.name})
+            self._token = context.attach(trace.set_span_in_context(self._span, ctx))
+            self._cpu_start = thread_time_ns() if random() < CPU_SAMPLE_RATE else None
+        self._start = perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ms = (perf_counter_ns() - self._start) / 1e6
+        if exc_type is None:
+            attributes = _attributes.get(self.name) or _attributes.setdefault(self.name, {"stage": self.name})
+        else:
+            attributes = {"stage": self.name, "error": exc_type.__name__}
+        stage_duration.record(duration_ms, attributes)
+        span = self._span
+        if span is not None:
+            if self._cpu_start is not None:
+                cpu_ms = (thread_time_ns() - self._cpu_start) / 1e6
+                stage_cpu_time.record(cpu_ms, attributes)
+                span.set_attribute("cpu_ms", cpu_ms)
+            if exc is not None:
+                span.record_exception(exc)
+                span.set_status(Status(StatusCode.ERROR, f"{exc_type.__name__}: {exc}"))
+            context.detach(self._token)
+            span.end()
+            self._span = None
+        return False
+
+    def __call__(self, func):
+        name, span_name = self.name, self.span_name
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name, span_name):
+                return func(*args, **kwargs)
+        return wrapper
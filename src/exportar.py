@@ -0,0 +1,165 @@
+"""Exportação em streaming da tabela `bitcoin_data` para CSV ou Parquet.
+
+Ao contrário do `session.query(BitcoinDataModel).all()` dos scripts do pipeline, as linhas
+vêm do banco em blocos de tamanho fixo por um cursor do lado do servidor
+(`stream_results` + `yield_per`), então a memória fica constante seja qual for o tamanho da tabela.
+Com `--particoes N` o intervalo de tempo é dividido em N faixas exportadas em paralelo,
+cada uma na sua conexão e no seu arquivo.
+
+Uso:
+    python exportar.py --inicio 2025-01-01 --fim 2025-02-01 --formato parquet --saida bitcoin.parquet --particoes 4
+"""
+import argparse
+import csv
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+
+from sqlalchemy import func, select
+
+from conexao import get_engine
+from modelos import POSTGRES_URI, BitcoinDataModel
+
+COLUMNS = ("id", "amount", "base", "currency", "timestamp")
+
+
+def iter_chunks(engine, start, end, chunk_size=10_000):
+    """Itera blocos de linhas de `bitcoin_data` com timestamp em [start, end)."""
+    table = BitcoinDataModel.__table__
+    stmt = (
+        select(*(table.c[name] for name in COLUMNS))
+        .where(table.c.timestamp >= start, table.c.timestamp < end)
+        .order_by(table.c.timestamp, table.c.id)
+    )
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+        yield from result.partitions()
+
+
+class CsvChunkWriter:
+    def __init__(self, path):
+        self._file = open(path, "w", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(COLUMNS)
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetChunkWriter:
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise SystemExit("A exportação para Parquet precisa do pyarrow (pip install pyarrow).") from e
+        self._pa = pa
+        self._schema = pa.schema([
+            ("id", pa.int64()),
+            ("amount", pa.string()),
+            ("base", pa.string()),
+            ("currency", pa.string()),
+            ("timestamp", pa.timestamp("us")),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        self._writer.write_table(self._pa.Table.from_arrays(
+            [self._pa.array(column, type=field.type) for column, field in zip(columns, self._schema)],
+            schema=self._schema,
+        ))
+
+    def close(self):
+        self._writer.close()
+
+
+WRITERS = {"csv": CsvChunkWriter, "parquet": ParquetChunkWriter}
+
+
+def export_range(engine, start, end, path, file_format="csv", chunk_size=10_000):
+    """Exporta o intervalo [start, end) para um arquivo. Retorna o número de linhas gravadas."""
+    writer = WRITERS[file_format](path)
+    total = 0
+    try:
+        for rows in iter_chunks(engine, start, end, chunk_size):
+            writer.write(rows)
+            total += len(rows)
+    finally:
+        writer.close()
+    return total
+
+
+def split_range(start, end, partitions):
+    """Divide [start, end) em `partitions` faixas de mesma duração."""
+    step = (end - start) / partitions
+    bounds = [start + step * i for i in range(partitions)] + [end]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def part_path(path, index, partitions):
+    if partitions == 1:
+        return path
+    stem, dot, extension = path.rpartition(".")
+    return f"{stem}.part-{index:03d}.{extension}" if dot else f"{path}.part-{index:03d}"
+
+
+def export_parallel(engine, start, end, path, file_format="csv", chunk_size=10_000, partitions=1):
+    """Exporta faixas de tempo em paralelo, uma conexão e um arquivo por faixa."""
+    ranges = split_range(start, end, partitions)
+    with ThreadPoolExecutor(max_workers=partitions) as pool:
+        futures = [
+            pool.submit(export_range, engine, range_start, range_end, part_path(path, i, partitions), file_format, chunk_size)
+            for i, (range_start, range_end) in enumerate(ranges)
+        ]
+        return [future.result() for future in futures]
+
+
+def table_bounds(engine):
+    """Menor e maior timestamp da tabela (o fim é exclusivo, por isso +1µs)."""
+    table = BitcoinDataModel.__table__
+    with engine.connect() as conn:
+        first, last = conn.execute(select(func.min(table.c.timestamp), func.max(table.c.timestamp))).one()
+    if first is None:
+        return None, None
+    return first, last + timedelta(microseconds=1)
+
+
+def parse_datetime(value):
+    parsed = datetime.fromisoformat(value)
+    # A coluna é DateTime sem timezone e os scripts gravam em UTC
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None) if parsed.tzinfo else parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default=POSTGRES_URI)
+    parser.add_argument("--inicio", type=parse_datetime, help="início (ISO 8601, inclusivo)")
+    parser.add_argument("--fim", type=parse_datetime, help="fim (ISO 8601, exclusivo)")
+    parser.add_argument("--formato", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("--saida", required=True)
+    parser.add_argument("--chunk", type=int, default=10_000, help="linhas por bloco do cursor")
+    parser.add_argument("--particoes", type=int, default=1, help="faixas exportadas em paralelo")
+    args = parser.parse_args()
+
+    engine = get_engine(args.uri, pool_size=args.particoes, max_overflow=0)
+    start, end = args.inicio, args.fim
+    if start is None or end is None:
+        first, last = table_bounds(engine)
+        if first is None:  # tabela vazia: sem limite para completar o que faltou
+            print("Tabela bitcoin_data vazia, nada a exportar.")
+            return
+        start, end = start or first, end or last
+
+    began = perf_counter()
+    counts = export_parallel(engine, start, end, args.saida, args.formato, args.chunk, args.particoes)
+    elapsed = perf_counter() - began
+    total = sum(counts)
+    print(f"{total} linhas exportadas em {elapsed:.2f}s ({total / elapsed:,.0f} linhas/s) em {len(counts)} arquivo(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Frescor dos dados: lag extract→commit por par e avaliação de SLO por burn rate.
+
+O `stage_duration` diz quanto cada etapa demorou, mas não quão velho está o preço gravado na
+`bitcoin_data` (o cenário do `main_logfire_07_lag.py`). O fluxo fica:
+
+    freshness = FreshnessSLO(objective_s=15, target=0.99)
+
+    stamp_ = stamp(response)                     # no extract, logo que a resposta chega
+    ...
+    session.commit()
+    freshness.committed("BTC-USD", stamp_)       # depois do commit: a linha já é visível
+
+Métricas (atributo `pair`, ex.: "BTC-USD"):
+- `freshness_lag` (s): histograma do lag até o commit, com `since` = `extract` (relógio local, no
+  momento em que a resposta chegou) ou `source` (header `Date` da API, resolução de 1 s);
+- `freshness_seconds_since_last_insert` (s): gauge do tempo desde o último commit; é o que denuncia
+  o pipeline parado (sem commits não há lag para medir);
+- `freshness_slo_burn_rate`: gauge do burn rate em cada janela (`window`, ex.: "1h", "5m").
+
+SLO: cada commit é um evento, bom se o lag desde o extract ficou até `objective_s`. O burn rate de
+uma janela é a taxa de eventos ruins dividida pelo orçamento de erro (`1 - target`): 1 consome o
+orçamento exatamente no período do SLO, 14,4 consome 2% de um orçamento de 30 dias em 1 hora.
+Cada regra de `ALERT_RULES` é (janela longa, janela curta, limite), no esquema multi-janela: o
+alerta abre quando as duas janelas passam do limite (a curta evita alertar sobre algo que já
+passou) e gera um `logfire.warn`; quando sai, um `logfire.info`.
+"""
+import threading
+import weakref
+from collections import deque
+from email.utils import parsedate_to_datetime
+from time import monotonic, time
+from typing import NamedTuple, Optional
+
+import logfire
+from opentelemetry import metrics
+from opentelemetry.metrics import Observation
+
+# (janela longa, janela curta, limite de burn rate), em segundos
+ALERT_RULES = (
+    (3600, 300, 14.4),
+    (6 * 3600, 1800, 6.0),
+)
+LAG_BUCKETS_S = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 30, 60, 120, 300)
+
+_meter = metrics.get_meter("pipeline_etl.frescor")
+freshness_lag = _meter.create_histogram(
+    "freshness_lag",
+    unit="s",
+    description="Tempo entre o preço ser obtido (extract ou Date da fonte) e a linha ser commitada",
+    explicit_bucket_boundaries_advisory=LAG_BUCKETS_S,
+)
+
+_trackers = weakref.WeakSet()
+
+
+class Stamp(NamedTuple):
+    """Marca do registro no extract: horário local da resposta e, se houver, o `Date` da fonte."""
+
+    extracted_at: float
+    source_at: Optional[float] = None
+
+
+def stamp(response=None):
+    """Marca o registro no extract (chamar logo depois de receber a resposta)."""
+    extracted_at = time()
+    source_at = None
+    date = response.headers.get("Date") if response is not None else None
+    if date:
+        try:
+            source_at = parsedate_to_datetime(date).timestamp()
+        except (TypeError, ValueError):
+            pass
+    return Stamp(extracted_at, source_at)
+
+
+def _window_label(seconds):
+    return f"{seconds // 3600}h" if seconds % 3600 == 0 else f"{seconds // 60}m"
+
+
+def _observe_since_last_insert(options):
+    now = time()
+    return [
+        Observation(now - committed_at, {"pair": pair})
+        for tracker in list(_trackers)
+        for pair, committed_at in tracker.last_commit().items()
+    ]
+
+
+def _observe_burn_rates(options):
+    return [
+        Observation(rate, {"pair": pair, "window": _window_label(window)})
+        for tracker in list(_trackers)
+        for (pair, window), rate in tracker.burn_rates().items()
+    ]
+
+
+_meter.create_observable_gauge(
+    "freshness_seconds_since_last_insert",
+    callbacks=[_observe_since_last_insert],
+    unit="s",
+    description="Segundos desde o último insert commitado, por par",
+)
+_meter.create_observable_gauge(
+    "freshness_slo_burn_rate",
+    callbacks=[_observe_burn_rates],
+    unit="1",
+    description="Burn rate do SLO de frescor por janela (1 = consome o orçamento no ritmo do SLO)",
+)
+
+
+class FreshnessSLO:
+    """Registra o lag de cada commit e avalia o SLO de frescor por burn rate multi-janela."""
+
+    def __init__(self, objective_s=15.0, target=0.99, alert_rules=ALERT_RULES):
+        self.objective_s = objective_s
+        self.target = target
+        self.alert_rules = alert_rules
+        self.alerting = set()  # (par, janela longa) com alerta aberto
+        self._horizon = max(max(long, short) for long, short, _ in alert_rules)
+        self._windows = sorted({window for rule in alert_rules for window in rule[:2]})
+        self._events = {}  # par -> deque de (monotonic, ruim)
+        self._last_commit = {}  # par -> horário (epoch) do último commit
+        self._lock = threading.Lock()
+        _trackers.add(self)
+
+    def committed(self, pair, stamp_):
+        """Chamar depois do commit do registro marcado com `stamp_`; devolve o lag desde o extract."""
+        committed_at = time()
+        lag = committed_at - stamp_.extracted_at
+        freshness_lag.record(lag, {"pair": pair, "since": "extract"})
+        if stamp_.source_at is not None:
+            freshness_lag.record(max(committed_at - stamp_.source_at, 0.0), {"pair": pair, "since": "source"})
+        now = monotonic()
+        with self._lock:
+            self._last_commit[pair] = committed_at
+            events = self._events.setdefault(pair, deque())
+            events.append((now, lag > self.objective_s))
+            while events and events[0][0] < now - self._horizon:
+                events.popleft()
+        self._evaluate(pair, now)
+        return lag
+
+    def last_commit(self):
+        with self._lock:
+            return dict(self._last_commit)
+
+    def _bad_ratio(self, events, since):
+        total = bad = 0
+        for timestamp, is_bad in reversed(events):
+            if timestamp < since:
+                break
+            total += 1
+            bad += is_bad
+        return bad / total if total else 0.0
+
+    def burn_rates(self, now=None):
+        """Burn rate de cada (par, janela) das regras de alerta."""
+        now = monotonic() if now is None else now
+        budget = 1 - self.target
+        with self._lock:
+            return {
+                (pair, window): self._bad_ratio(events, now - window) / budget
+                for pair, events in self._events.items()
+                for window in self._windows
+            }
+
+    def _evaluate(self, pair, now):
+        # Só as janelas das regras para o par que acabou de commitar, não a varredura de burn_rates()
+        budget = 1 - self.target
+        with self._lock:
+            events = self._events.get(pair, ())
+            rates = {(pair, window): self._bad_ratio(events, now - window) / budget for window in self._windows}
+        for long, short, threshold in self.alert_rules:
+            key = (pair, long)
+            burning = rates[(pair, long)] > threshold and rates[(pair, short)] > threshold
+            if burning and key not in self.alerting:
+                self.alerting.add(key)
+                logfire.warn(
+                    "SLO de frescor de {pair} queimando orçamento: burn rate {burn_rate:.1f} em {window}",
+                    pair=pair,
+                    burn_rate=rates[(pair, long)],
+                    short_burn_rate=rates[(pair, short)],
+                    window=_window_label(long),
+                    threshold=threshold,
+                    objective_s=self.objective_s,
+                    target=self.target,
+                )
+            elif not burning and key in self.alerting:
+                self.alerting.discard(key)
+                logfire.info(
+                    "SLO de frescor de {pair} normalizado em {window}",
+                    pair=pair,
+                    window=_window_label(long),
+                    burn_rate=rates[(pair, long)],
+                )
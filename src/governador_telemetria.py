@@ -0,0 +1,265 @@
+"""Governador de volume de telemetria: cardinalidade, tamanho de payload e taxa de logs.
+
+Algumas variantes mandam valores grandes ou de alta cardinalidade para a telemetria:
+`main_logfire_05.py` põe `amount` como atributo de span e de log, `main2.py` loga o `response.json()`
+inteiro e todo caminho de erro loga uma vez por iteração, então uma queda vira uma tempestade de logs.
+
+O `TelemetryGovernor` fica entre os spans e o processor de exportação e:
+- limita a `max_values_per_key` os valores distintos de cada atributo por nome de span; valores
+  novos além do limite viram `OVERFLOW_VALUE`. Os nomes de span também são limitados: passados
+  `max_span_names` nomes (logs com f-string geram um nome por mensagem), os novos dividem um único
+  conjunto de valores por atributo, então a memória do próprio governador fica limitada;
+- corta strings maiores que `max_attribute_length` (e listas maiores que `max_sequence_length`);
+- deixa passar no máximo `max_repeats` logs idênticos (mesmo template e nível) por janela de
+  `window_s` segundos; os demais são contados e viram um único log de resumo ao fim da janela.
+
+Tudo o que foi alterado ou descartado é contado na métrica `telemetry_governor_dropped`
+(atributo `reason`) e em `stats()`. Para métricas, o limite de cardinalidade fica no instrumento
+(`metricas_config.BoundedInstrument`).
+
+Uso:
+
+    governor = TelemetryGovernor(BatchSpanProcessor(OTLPSpanExporter()))
+    logfire.configure(send_to_logfire=False, additional_span_processors=[governor])
+
+Em `main_logfire_05.py` e `main2.py` o governador é opcional (`GOVERNED_OTLP=1`, via
+`governed_otlp_processor()`); sem a variável eles seguem com o `logfire.configure()` padrão.
+O exporter do Logfire não aceita um processor na frente, então com o governador o export é OTLP: para o
+collector (`OTEL_EXPORTER_OTLP_ENDPOINT`, padrão http://localhost:4318) ou direto para o Logfire,
+com `OTEL_EXPORTER_OTLP_ENDPOINT=https://logfire-api.pydantic.dev` e
+`OTEL_EXPORTER_OTLP_HEADERS=Authorization=<write token>`.
+"""
+import random
+import threading
+from collections import Counter
+from time import monotonic, time_ns
+
+from opentelemetry import metrics
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor
+from opentelemetry.trace import SpanContext
+
+OVERFLOW_VALUE = "__overflow__"
+# Atributos internos do Logfire/OTel que não passam pelo limite de cardinalidade
+EXEMPT_PREFIXES = ("logfire.", "code.", "otel.", "thread.")
+
+_meter = metrics.get_meter("pipeline_etl.governor")
+dropped = _meter.create_counter(
+    "telemetry_governor_dropped",
+    unit="1",
+    description="Atributos cortados/agrupados e logs suprimidos pelo governador de telemetria",
+)
+
+
+def replace_span(span, **changes):
+    """Cópia de um ReadableSpan com alguns campos trocados (spans finalizados são imutáveis)."""
+    fields = {
+        "name": span.name,
+        "context": span.context,
+        "parent": span.parent,
+        "resource": span.resource,
+        "attributes": span.attributes,
+        "events": span.events,
+        "links": span.links,
+        "kind": span.kind,
+        "status": span.status,
+        "start_time": span.start_time,
+        "end_time": span.end_time,
+        "instrumentation_scope": span.instrumentation_scope,
+    }
+    fields.update(changes)
+    return ReadableSpan(**fields)
+
+
+class _RepeatWindow:
+    __slots__ = ("started", "seen", "suppressed", "last_span")
+
+    def __init__(self, now):
+        self.started = now
+        self.seen = 0
+        self.suppressed = 0
+        self.last_span = None
+
+
+class TelemetryGovernor(SpanProcessor):
+    """Span processor que limita cardinalidade, tamanho e taxa antes de repassar ao `downstream`."""
+
+    def __init__(
+        self,
+        downstream,
+        max_values_per_key=100,
+        max_span_names=1_000,
+        max_attribute_length=1_024,
+        max_sequence_length=64,
+        max_repeats=5,
+        window_s=60.0,
+        exempt_prefixes=EXEMPT_PREFIXES,
+    ):
+        self.downstream = downstream
+        self.max_values_per_key = max_values_per_key
+        self.max_span_names = max_span_names
+        self.max_attribute_length = max_attribute_length
+        self.max_sequence_length = max_sequence_length
+        self.max_repeats = max_repeats
+        self.window_s = window_s
+        self.exempt_prefixes = tuple(exempt_prefixes)
+        self._values = {}  # nome do span -> atributo -> valores vistos
+        self._windows = {}
+        self._stats = Counter()
+        self._lock = threading.Lock()
+
+    # --- cardinalidade ---
+
+    def _owner_values(self, name):
+        values = self._values.get(name)
+        if values is None:
+            if len(self._values) >= self.max_span_names:
+                name = OVERFLOW_VALUE  # nomes além do limite dividem um único conjunto
+            values = self._values.setdefault(name, {})
+        return values
+
+    def _limit_value(self, values, key, value):
+        if key.startswith(self.exempt_prefixes):
+            return value
+        seen = values.setdefault(key, set())
+        hashable = tuple(value) if isinstance(value, list) else value
+        if hashable in seen:
+            return value
+        if len(seen) < self.max_values_per_key:
+            seen.add(hashable)
+            return value
+        self._count("cardinality")
+        return OVERFLOW_VALUE
+
+    # --- tamanho ---
+
+    def _truncate(self, value):
+        if isinstance(value, str) and len(value) > self.max_attribute_length:
+            self._count("truncated")
+            return f"{value[:self.max_attribute_length]}…[+{len(value) - self.max_attribute_length}]"
+        if isinstance(value, (list, tuple)):
+            if len(value) > self.max_sequence_length:
+                self._count("truncated")
+                value = value[:self.max_sequence_length]
+            if any(isinstance(item, str) and len(item) > self.max_attribute_length for item in value):
+                value = tuple(self._truncate(item) for item in value)
+        return value
+
+    def _sanitize(self, span):
+        attributes = span.attributes or {}
+        values = self._owner_values(span.name)
+        changed = False
+        sanitized = {}
+        for key, value in attributes.items():
+            new_value = self._limit_value(values, key, self._truncate(value))
+            changed = changed or new_value is not value
+            sanitized[key] = new_value
+        return replace_span(span, attributes=sanitized) if changed else span
+
+    # --- taxa de logs repetidos ---
+
+    def _rate_limit(self, span, now):
+        """Devolve (deixa_passar, resumos_prontos) para um log do Logfire."""
+        attributes = span.attributes or {}
+        key = (attributes.get("logfire.msg_template", span.name), attributes.get("logfire.level_num"))
+        summaries = self._expired_summaries(now)
+        window = self._windows.get(key)
+        if window is None:
+            window = self._windows[key] = _RepeatWindow(now)
+        window.seen += 1
+        if window.seen <= self.max_repeats:
+            return True, summaries
+        window.suppressed += 1
+        window.last_span = span
+        self._count("rate_limited")
+        return False, summaries
+
+    def _expired_summaries(self, now, force=False):
+        summaries = []
+        for key, window in list(self._windows.items()):
+            if force or now - window.started >= self.window_s:
+                del self._windows[key]
+                if window.suppressed:
+                    summaries.append(self._summary_span(key, window))
+        return summaries
+
+    def _summary_span(self, key, window):
+        template, level = key
+        template = self._truncate(template)
+        last = window.last_span
+        context = SpanContext(
+            trace_id=last.context.trace_id,
+            span_id=random.getrandbits(64),
+            is_remote=False,
+            trace_flags=last.context.trace_flags,
+        )
+        message = f"{window.suppressed} ocorrências suprimidas de: {template}"
+        attributes = {
+            "logfire.span_type": "log",
+            "logfire.msg_template": "{suppressed} ocorrências suprimidas de: {template}",
+            "logfire.msg": message,
+            "suppressed": window.suppressed,
+            "template": template,
+            "window_s": self.window_s,
+        }
+        if level is not None:
+            attributes["logfire.level_num"] = level
+        now = time_ns()
+        return ReadableSpan(
+            name=message,
+            context=context,
+            parent=last.parent,
+            resource=last.resource,
+            attributes=attributes,
+            status=last.status,
+            start_time=now,
+            end_time=now,
+            instrumentation_scope=last.instrumentation_scope,
+        )
+
+    # --- SpanProcessor ---
+
+    def _count(self, reason):
+        self._stats[reason] += 1
+        dropped.add(1, {"reason": reason})
+
+    def on_start(self, span, parent_context=None):
+        self.downstream.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span):
+        with self._lock:
+            keep, summaries = True, []
+            if (span.attributes or {}).get("logfire.span_type") == "log":
+                keep, summaries = self._rate_limit(span, monotonic())
+            span = self._sanitize(span) if keep else None
+        for summary in summaries:
+            self.downstream.on_end(summary)
+        if span is not None:
+            self.downstream.on_end(span)
+
+    def flush_summaries(self):
+        """Emite já os resumos pendentes (chamado também no force_flush e no shutdown)."""
+        with self._lock:
+            summaries = self._expired_summaries(monotonic(), force=True)
+        for summary in summaries:
+            self.downstream.on_end(summary)
+
+    def stats(self):
+        """Contagem do que foi alterado ou descartado, por motivo."""
+        with self._lock:
+            return dict(self._stats)
+
+    def shutdown(self):
+        self.flush_summaries()
+        self.downstream.shutdown()
+
+    def force_flush(self, timeout_millis=30_000):
+        self.flush_summaries()
+        return self.downstream.force_flush(timeout_millis)
+
+
+def governed_otlp_processor(**options):
+    """`TelemetryGovernor` na frente de um `BatchSpanProcessor` com o exporter OTLP/HTTP (config via `OTEL_*`)."""
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    return TelemetryGovernor(BatchSpanProcessor(OTLPSpanExporter()), **options)
@@ -4,11 +4,18 @@ import requests
 from sqlalchemy import create_engine, Column, String, Integer, DateTime
 from sqlalchemy.orm import declarative_base, sessionmaker
 from time import sleep
+import os
 import logfire  # Adicionar
 
 
 # Configurar Logfire ANTES de tudo
-logfire.configure()  # Isso autentica e configura o Logfire
+if os.getenv("GOVERNED_OTLP"):
+    # Opcional: GOVERNED_OTLP=1 passa spans e logs pelo governador (corta o response.json() e agrupa
+    # logs repetidos) e exporta via OTLP para o collector em OTEL_EXPORTER_OTLP_ENDPOINT
+    from governador_telemetria import governed_otlp_processor
+    logfire.configure(send_to_logfire=False, additional_span_processors=[governed_otlp_processor()])
+else:
+    logfire.configure()  # Isso autentica e configura o Logfire
 
 
 # URL da API para buscar o valor atual do Bitcoin
@@ -108,6 +115,12 @@ def load(data):
         session.close()
 
 
+# Vigia de memória opcional: MEMORY_WATCH_EVERY=10 compara snapshots do tracemalloc a cada 10 iterações
+memory_watcher = None
+if os.getenv("MEMORY_WATCH_EVERY"):
+    from memoria import MemoryWatcher
+    memory_watcher = MemoryWatcher(every=int(os.environ["MEMORY_WATCH_EVERY"]))
+
 # Loop contínuo do pipeline ETL
 logfire.info("Iniciando o loop do pipeline ETL")
 try:
@@ -118,6 +131,8 @@ try:
             transformed_data = transform(raw_data)
             load(transformed_data)
             logfire.info("Pipeline concluído. Aguardando 10 segundos...")
+            if memory_watcher is not None:
+                memory_watcher.tick()
             sleep(10)
 except KeyboardInterrupt:
     logfire.warn("Execução interrompida pelo usuário")
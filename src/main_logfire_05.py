@@ -4,10 +4,17 @@ import requests
 from sqlalchemy import create_engine, Column, String, Integer, DateTime
 from sqlalchemy.orm import declarative_base, sessionmaker
 from time import sleep
+import os
 import logfire
 
 # Configuração do Logfire
-logfire.configure()
+if os.getenv("GOVERNED_OTLP"):
+    # Opcional: GOVERNED_OTLP=1 limita cardinalidade, tamanho e taxa de logs com o governador e exporta
+    # via OTLP (collector em OTEL_EXPORTER_OTLP_ENDPOINT) em vez do exporter do Logfire
+    from governador_telemetria import governed_otlp_processor
+    logfire.configure(send_to_logfire=False, additional_span_processors=[governed_otlp_processor()])
+else:
+    logfire.configure()
 
 # Instrumentação automática
 logfire.instrument_requests()
@@ -1,13 +1,45 @@
 from datetime import datetime, timezone
+import os
 from pydantic import BaseModel
-import requests
-from sqlalchemy import create_engine, Column, String, Integer, DateTime
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy.orm import declarative_base
 from time import sleep
 import logfire
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+
+from armazem_metricas import SqliteMetricExporter  # armazém local para as consultas do README_07
+from carga_core import load_core  # INSERT via Core, sem ORM no caminho quente
+from conexao import get_engine
+from consultas_lentas import install_slow_query_explain  # EXPLAIN automático das consultas lentas
+from etapas import stage  # span + métrica stage_duration de cada etapa
+from frescor import FreshnessSLO, stamp  # lag extract→commit e SLO de frescor por par
+from metricas_processo import install_process_metrics
+from metricas_spans import SpanMetricsProcessor
+from reproducao import ResponseRecorder  # gravação das respostas para o reproducao.py
+from tempos_http import timed_session  # DNS/connect/TLS/TTFB/download de cada requisição
+
+# Com METRICS_DB=<arquivo>, as métricas também vão para o armazém SQLite local
+metric_readers = [PeriodicExportingMetricReader(SqliteMetricExporter(os.environ["METRICS_DB"]))] if os.getenv("METRICS_DB") else []
+
+# Com TAIL_SAMPLING=1, só os traces de iteração lentos, com erro ou da amostra base são exportados,
+# via OTLP para o collector em OTEL_EXPORTER_OTLP_ENDPOINT (o exporter do Logfire não aceita o sampler na frente)
+tail_sampling = bool(os.getenv("TAIL_SAMPLING"))
+span_processors = [SpanMetricsProcessor()]  # span_calls, span_errors e span_duration (vê todos os spans)
+if tail_sampling:
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    from amostragem_cauda import TailSamplingProcessor
+    span_processors.append(TailSamplingProcessor(BatchSpanProcessor(OTLPSpanExporter())))
 
 # Configuração do Logfire
-logfire.configure(inspect_arguments=False)  # Desativa a inspeção de argumentos para evitar warnings
+logfire.configure(
+    send_to_logfire=False if tail_sampling else None,
+    inspect_arguments=False,  # Desativa a inspeção de argumentos para evitar warnings
+    additional_span_processors=span_processors,
+    metrics=logfire.MetricsOptions(additional_readers=metric_readers),
+)
+install_process_metrics()  # CPU, GC, threads, descritores e RSS do processo
 
 # URL da API para buscar o valor atual do Bitcoin
 URL = 'https://api.coinbase.com/v2/prices/spot?currency=USD'
@@ -17,20 +49,27 @@ POSTGRES_URI = "postgresql://dbname_mc8n_user:9Lhi7BqSDLhfUwRrJzJRZfUcKAs1qSYM@d
 
 logfire.instrument_requests()
 
+# Session com pool: reaproveita a conexão TLS entre iterações e mede as fases de cada requisição
+http = timed_session()
+
+# Com RECORD_RESPONSES=<arquivo>, cada resposta da API é gravada em JSONL para reprodução posterior
+recorder = ResponseRecorder(os.environ["RECORD_RESPONSES"]) if os.getenv("RECORD_RESPONSES") else None
+
+# SLO: 99% dos preços commitados até 15 s depois do extract
+freshness = FreshnessSLO(objective_s=15, target=0.99)
+
 # Base declarativa do SQLAlchemy
 Base = declarative_base()
 
-# Configurar a engine globalmente
-engine = create_engine(POSTGRES_URI, echo=False)  # echo=False para desativar logs detalhados de SQL
+# Configurar a engine globalmente (pool compartilhado com pre-ping, recycle e métricas do pool)
+engine = get_engine(POSTGRES_URI, echo=False)  # echo=False para desativar logs detalhados de SQL
 
 logfire.instrument_sqlalchemy(engine=engine)
+install_slow_query_explain(engine)  # statements acima de SLOW_QUERY_MS ganham o plano no trace
 
 Base.metadata.create_all(engine)  # Cria as tabelas no banco de dados
 logfire.info("Tabelas criadas no banco de dados (se não existiam).")
 
-# Configurar a sessão do SQLAlchemy
-Session = sessionmaker(bind=engine)
-
 # Modelo da tabela usando SQLAlchemy
 class BitcoinDataModel(Base):
     __tablename__ = "bitcoin_data"
@@ -49,13 +88,6 @@ class BitcoinData(BaseModel):
 class ApiResponse(BaseModel):
     data: BitcoinData
 
-# Definir Métrica: Apenas stage_duration
-stage_duration = logfire.metric_histogram(
-    "stage_duration",
-    unit="ms",
-    description="Duração das etapas do pipeline ETL"
-)
-
 def test_connection():
     """Testa a conexão com o banco PostgreSQL."""
     try:
@@ -66,59 +98,47 @@ def test_connection():
 
 def extract():
     """Faz uma requisição à API para obter o valor do Bitcoin."""
-    with logfire.span("Fazendo a requisição para obter o valor do Bitcoin"):
-        start_time = datetime.now(timezone.utc)
-        response = requests.get(url=URL)
-        duration = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
-        stage_duration.record(duration, {"stage": "extract"})
-        return response.json()
+    with stage("extract", "Fazendo a requisição para obter o valor do Bitcoin"):
+        response = http.get(URL)
+        stamp_ = stamp(response)  # marca o registro para medir o lag até o commit
+        if recorder:
+            recorder.record(response, stamp_)
+        return response.json(), stamp_
 
 def transform(data):
     """Valida os dados recebidos da API usando os modelos Pydantic."""
-    with logfire.span("Validando os dados com Pydantic"):
+    with stage("transform", "Validando os dados com Pydantic"):
         try:
-            start_time = datetime.now(timezone.utc)
             validated_data = ApiResponse(**data)
-            duration = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
-            stage_duration.record(duration, {"stage": "transform"})
-            return validated_data.model_dump()
+            return validated_data.data  # o BitcoinData validado vai direto para o load
         except Exception as e:
             logfire.error(f"Erro na transformação: {e}")
             raise
 
-def load(data):
-    """Carrega os dados validados para um banco de dados PostgreSQL remoto usando SQLAlchemy."""
-    with logfire.span("Carregando os dados no banco de dados PostgreSQL"):
-        start_time = datetime.now(timezone.utc)
-        session = Session()
-        bitcoin_entry = BitcoinDataModel(
-            amount=data['data']['amount'],
-            base=data['data']['base'],
-            currency=data['data']['currency'],
-            timestamp=datetime.now(timezone.utc)  # Adiciona o timestamp da inserção
-        )
-        session.add(bitcoin_entry)
-        session.commit()
-        duration = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
-        stage_duration.record(duration, {"stage": "load"})
+def load(record, stamp_):
+    """Carrega o registro validado no banco de dados PostgreSQL remoto (INSERT pré-compilado do Core)."""
+    with stage("load", "Carregando os dados no banco de dados PostgreSQL"):
+        # O log usa a tupla inserida, sem reler atributos de um objeto do ORM depois do commit
+        [(amount, base, currency, timestamp)] = load_core(engine, record)
+        freshness.committed(f"{base}-{currency}", stamp_)
         logfire.info(
             "Dado inserido no banco: amount={amount}, base={base}, currency={currency}, timestamp={timestamp}",
-            amount=bitcoin_entry.amount,
-            base=bitcoin_entry.base,
-            currency=bitcoin_entry.currency,
-            timestamp=bitcoin_entry.timestamp,
+            amount=amount,
+            base=base,
+            currency=currency,
+            timestamp=timestamp,
         )
-        session.close()
         sleep(10)  # Sleep extra de 5 segundos no final do load
 
 # Loop contínuo do pipeline ETL
+test_connection()
 logfire.info("Iniciando o loop do pipeline ETL. Pressione Ctrl+C para interromper.")
 try:
     while True:
         with logfire.span("Execução completa do pipeline ETL"):
-            raw_data = extract()
+            raw_data, stamp_ = extract()
             transformed_data = transform(raw_data)
-            load(transformed_data)
+            load(transformed_data, stamp_)
             logfire.info("Pipeline concluído. Aguardando 10 segundos antes de repetir.")
         sleep(2)
 except KeyboardInterrupt:
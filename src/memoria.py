@@ -0,0 +1,153 @@
+"""Vigia de memória para os loops `while True` que rodam por dias.
+
+Padrões como o `session.query(...).all()` da tabela inteira em `main2.py`, ou sessões que não são
+fechadas quando dá exceção, fazem o RSS crescer devagar sem nenhum erro. O `MemoryWatcher` é
+opcional e é chamado uma vez por iteração (`watcher.tick()`):
+- a cada `every` iterações tira um snapshot do `tracemalloc` e compara com o anterior, guardando
+  em `last_report` os `top` pontos de alocação que mais cresceram;
+- se o RSS cresceu mais que `growth_threshold` bytes por iteração desde o último snapshot, emite um
+  `logfire.warn` com o crescimento e esses pontos de alocação.
+
+Gauges (via `install_memory_metrics()`, chamado pelo watcher):
+- `process_rss` (bytes) e `tracemalloc_traced` (bytes rastreados pelo tracemalloc, se ativo);
+- `gc_generation_objects`: objetos pendentes em cada geração (`gc.get_count()`);
+- `gc_collections`: coletas acumuladas por geração;
+- `gc_pause` (ms): histograma da duração de cada coleta, medida com `gc.callbacks`.
+
+O `tracemalloc` guarda `frames` frames por alocação e deixa as alocações ~2x mais lentas; por isso
+o watcher é ligado só quando pedido (em `main2.py`, com `MEMORY_WATCH_EVERY=<iterações>`). Cada
+comparação de snapshots custa da ordem de 0,1 s a cada 100 mil blocos vivos.
+"""
+import gc
+import os
+import resource
+import sys
+import tracemalloc
+from time import perf_counter_ns
+
+import logfire
+from opentelemetry import metrics
+from opentelemetry.metrics import Observation
+
+_meter = metrics.get_meter("pipeline_etl.memoria")
+gc_pause = _meter.create_histogram(
+    "gc_pause",
+    unit="ms",
+    description="Duração de cada coleta do garbage collector, por geração",
+)
+# Alocações do próprio tracemalloc e do import system não interessam
+IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib", __file__)
+_installed = False
+_gc_started = {}
+
+
+def rss_bytes():
+    """RSS atual do processo (Linux: /proc; outros: pico do `getrusage`)."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # macOS em bytes, Linux em KiB
+
+
+def _gc_callback(phase, info):
+    generation = info["generation"]
+    if phase == "start":
+        _gc_started[generation] = perf_counter_ns()
+    else:
+        started = _gc_started.pop(generation, None)
+        if started is not None:
+            gc_pause.record((perf_counter_ns() - started) / 1e6, {"generation": generation})
+
+
+def install_memory_metrics():
+    """Registra os gauges de memória/GC e o callback de pausas do GC (uma vez por processo)."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    gc.callbacks.append(_gc_callback)
+    _meter.create_observable_gauge(
+        "process_rss",
+        callbacks=[lambda options: [Observation(rss_bytes())]],
+        unit="By",
+        description="Memória residente (RSS) do processo",
+    )
+    _meter.create_observable_gauge(
+        "tracemalloc_traced",
+        callbacks=[lambda options: [Observation(tracemalloc.get_traced_memory()[0])] if tracemalloc.is_tracing() else []],
+        unit="By",
+        description="Memória alocada pelo Python rastreada pelo tracemalloc",
+    )
+    _meter.create_observable_gauge(
+        "gc_generation_objects",
+        callbacks=[lambda options: [
+            Observation(count, {"generation": generation}) for generation, count in enumerate(gc.get_count())
+        ]],
+        unit="1",
+        description="Objetos pendentes em cada geração do garbage collector",
+    )
+    _meter.create_observable_counter(
+        "gc_collections",
+        callbacks=[lambda options: [
+            Observation(stats["collections"], {"generation": generation})
+            for generation, stats in enumerate(gc.get_stats())
+        ]],
+        unit="1",
+        description="Coletas do garbage collector, por geração",
+    )
+
+
+def _format_size(size):
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:+.0f} {unit}"
+        size /= 1024
+    return f"{size:+.1f} GiB"
+
+
+class MemoryWatcher:
+    """Compara snapshots do tracemalloc a cada `every` iterações e avisa quando a memória cresce."""
+
+    def __init__(self, every=10, top=10, growth_threshold=256 * 1024, frames=5):
+        self.every = every
+        self.top = top
+        self.growth_threshold = growth_threshold
+        self.last_report = []
+        self._iterations = 0
+        install_memory_metrics()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._snapshot = tracemalloc.take_snapshot()
+        self._rss = rss_bytes()
+
+    def tick(self):
+        """Chamar uma vez por iteração do loop."""
+        self._iterations += 1
+        if self._iterations % self.every:
+            return
+        snapshot = tracemalloc.take_snapshot()
+        rss = rss_bytes()
+        growth_per_iteration = (rss - self._rss) / self.every
+        # Filtrar depois do compare_to: `filter_traces` passa o fnmatch em cada trace e fica lento
+        # com centenas de milhares de blocos
+        stats = [
+            stat for stat in snapshot.compare_to(self._snapshot, "lineno")
+            if stat.size_diff > 0 and not stat.traceback[0].filename.startswith(IGNORED_FILES)
+        ]
+        self.last_report = [
+            f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} "
+            f"{_format_size(stat.size_diff)} ({stat.count_diff:+} blocos, total {stat.size / 1024:.0f} KiB)"
+            for stat in stats[:self.top]
+        ]
+        self._snapshot, self._rss = snapshot, rss
+        if growth_per_iteration > self.growth_threshold:
+            logfire.warn(
+                "Memória crescendo {growth} por iteração (RSS {rss_mib:.1f} MiB)",
+                growth=_format_size(growth_per_iteration),
+                growth_bytes=growth_per_iteration,
+                rss_mib=rss / 2**20,
+                iterations=self._iterations,
+                top_allocations=self.last_report,
+            )
@@ -0,0 +1,144 @@
+"""Configuração das métricas: temporalidade delta, allowlist de atributos, limite de cardinalidade
+e buckets explícitos.
+
+`records_processed` (exemplo_01) e `dice.rolls` (app.py) aceitam qualquer atributo: com um
+atributo por par ou por jogador, o SDK cria um agregador por combinação de atributos e nunca os
+descarta (nem com temporalidade delta: o agregador só deixa de gerar ponto, mas continua no
+dicionário do `MeterProvider`). As peças:
+
+- `DELTA_TEMPORALITY`: temporalidade delta para contadores e histogramas (UpDownCounters continuam
+  cumulativos). Cada export leva só o que mudou no intervalo, e atributos que não aparecem mais
+  param de ser exportados. Em `configure_telemetry(metric_temporality=DELTA_TEMPORALITY)`;
+- `metric_views()`: uma View por instrumento configurado, com `attribute_keys` (atributos fora da
+  allowlist são descartados antes da agregação) e buckets explícitos (`stage_duration` e
+  `stage_cpu_time` com `STAGE_BUCKETS_MS`), mais a View genérica de exemplars de `telemetria.py`
+  para os outros histogramas. Substitui o `views=EXEMPLAR_VIEWS` padrão do `configure_telemetry`;
+- `BoundedInstrument`: o SDK 1.38 não tem limite de cardinalidade, então o limite fica no
+  instrumento: passadas `max_attribute_sets` combinações, as novas vão para um único ponto com
+  `otel.metric.overflow=true` (como no limite da especificação do OpenTelemetry) e o contador
+  `metric_cardinality_overflows` registra quantas medições caíram nele. Antes de contar, ele aplica
+  a allowlist de `ATTRIBUTE_ALLOWLISTS` do instrumento; onde não dá para instalar Views (app.py,
+  configurado pelo `opentelemetry-instrument`), é esse filtro que vale.
+
+Uso:
+
+    configure_telemetry(
+        "pipeline-etl",
+        views=metric_views(),
+        metric_temporality=DELTA_TEMPORALITY,
+    )
+    counter = BoundedInstrument(meter.create_counter("records_processed"), max_attribute_sets=500)
+
+O custo em memória de cada caso está em `benchmark_cardinalidade.py`.
+"""
+import threading
+
+from opentelemetry import metrics
+from opentelemetry.sdk.metrics import Counter, Histogram, ObservableCounter
+from opentelemetry.sdk.metrics.export import AggregationTemporality
+from opentelemetry.sdk.metrics.view import ExplicitBucketHistogramAggregation, View
+
+from etapas import STAGE_BUCKETS_MS
+from telemetria import slowest_exemplar_reservoir
+
+DEFAULT_CARDINALITY_LIMIT = 2000  # o padrão da especificação do OpenTelemetry
+OVERFLOW_ATTRIBUTES = {"otel.metric.overflow": True}
+
+DELTA_TEMPORALITY = {
+    Counter: AggregationTemporality.DELTA,
+    ObservableCounter: AggregationTemporality.DELTA,
+    Histogram: AggregationTemporality.DELTA,
+}
+# Instrumento -> atributos mantidos (os demais são descartados pela View)
+ATTRIBUTE_ALLOWLISTS = {
+    "records_processed": ("status", "stage"),
+    "dice.rolls": ("roll.value",),
+    "stage_duration": ("stage", "error"),
+    "stage_cpu_time": ("stage", "error"),
+}
+HISTOGRAM_BUCKETS = {
+    "stage_duration": STAGE_BUCKETS_MS,
+    "stage_cpu_time": STAGE_BUCKETS_MS,
+}
+
+_meter = metrics.get_meter("pipeline_etl.metricas_config")
+cardinality_overflows = _meter.create_counter(
+    "metric_cardinality_overflows",
+    unit="1",
+    description="Medições agregadas no ponto de overflow por passarem do limite de cardinalidade",
+)
+
+
+class HistogramExemplarView(View):
+    """View de exemplars para todos os histogramas, menos os que já têm View própria.
+
+    Duas Views que casam com o mesmo instrumento geram dois streams com o mesmo nome; o SDK não tem
+    filtro de exclusão, então `_match` é estendido.
+    """
+
+    def __init__(self, excluded_names=()):
+        super().__init__(instrument_type=Histogram, exemplar_reservoir_factory=slowest_exemplar_reservoir)
+        self._excluded_names = frozenset(excluded_names)
+
+    def _match(self, instrument):
+        return instrument.name not in self._excluded_names and super()._match(instrument)
+
+
+def metric_views(attribute_keys=ATTRIBUTE_ALLOWLISTS, histogram_buckets=HISTOGRAM_BUCKETS):
+    """Views com allowlist de atributos e buckets explícitos, uma por instrumento configurado."""
+    names = sorted({*attribute_keys, *histogram_buckets})
+    views = []
+    for name in names:
+        buckets = histogram_buckets.get(name)
+        views.append(View(
+            instrument_name=name,
+            # O atributo de overflow do BoundedInstrument passa por qualquer allowlist
+            attribute_keys={*attribute_keys[name], *OVERFLOW_ATTRIBUTES} if name in attribute_keys else None,
+            aggregation=ExplicitBucketHistogramAggregation(boundaries=buckets) if buckets else None,
+            exemplar_reservoir_factory=slowest_exemplar_reservoir,
+        ))
+    views.append(HistogramExemplarView(excluded_names=names))
+    return tuple(views)
+
+
+def _hashable(attributes):
+    return frozenset((key, tuple(value) if isinstance(value, list) else value) for key, value in attributes.items())
+
+
+class BoundedInstrument:
+    """Counter/UpDownCounter/Histogram com no máximo `max_attribute_sets` combinações de atributos."""
+
+    def __init__(self, instrument, max_attribute_sets=DEFAULT_CARDINALITY_LIMIT, attribute_keys=None):
+        self.instrument = instrument
+        self.max_attribute_sets = max_attribute_sets
+        # Instrumentos criados antes do MeterProvider (proxies da API) não expõem `name`
+        self.name = getattr(instrument, "name", None) or getattr(instrument, "_name", None)
+        if attribute_keys is None:
+            # A mesma allowlist da View: sem ela, combinações que a View junta em um ponto gastariam o
+            # limite e mandariam dados válidos para o overflow. `attribute_keys=()` desliga o filtro.
+            attribute_keys = ATTRIBUTE_ALLOWLISTS.get(self.name)
+        self.attribute_keys = tuple(attribute_keys) if attribute_keys else None
+        self._seen = set()
+        self._lock = threading.Lock()
+        self._overflow_attributes = {"metric": self.name}
+
+    def _bounded(self, attributes):
+        if not attributes:
+            return attributes
+        if self.attribute_keys is not None:
+            attributes = {key: attributes[key] for key in self.attribute_keys if key in attributes}
+        key = _hashable(attributes)
+        if key in self._seen:
+            return attributes
+        with self._lock:
+            if key in self._seen or len(self._seen) < self.max_attribute_sets - 1:  # 1 vaga para o overflow
+                self._seen.add(key)
+                return attributes
+        cardinality_overflows.add(1, self._overflow_attributes)
+        return OVERFLOW_ATTRIBUTES
+
+    def add(self, amount, attributes=None, context=None):
+        self.instrument.add(amount, self._bounded(attributes), context)
+
+    def record(self, amount, attributes=None, context=None):
+        self.instrument.record(amount, self._bounded(attributes), context)
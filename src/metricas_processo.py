@@ -0,0 +1,72 @@
+"""Métricas de runtime do processo do pipeline: CPU, GC, threads, descritores e RSS.
+
+Complementa o `stage_cpu_time` de `etapas.py` (CPU por etapa) com a visão do processo inteiro:
+- `process_cpu_time` (s): CPU acumulada do processo, por `mode` (user/system);
+- `process_threads`: threads Python vivas;
+- `process_open_fds`: descritores de arquivo abertos (sockets do pool, arquivos de log...);
+- `process_rss`, `gc_pause`, `gc_collections` e `gc_generation_objects`, de `memoria.py`.
+
+Tudo é gauge/contador observável: o custo só aparece na coleta do MeterProvider (a cada export),
+e as pausas do GC são um `gc.callbacks` que grava um histograma por coleta.
+
+Uso, depois do `logfire.configure()` (ou `configure_telemetry()`):
+
+    install_process_metrics()
+"""
+import os
+import threading
+
+from opentelemetry import metrics
+from opentelemetry.metrics import Observation
+
+from memoria import install_memory_metrics
+
+_meter = metrics.get_meter("pipeline_etl.processo")
+_installed = False
+
+
+def open_fds():
+    """Descritores abertos (Linux/macOS); None se a plataforma não expõe a lista."""
+    for directory in ("/proc/self/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(directory))
+        except OSError:
+            continue
+    return None
+
+
+def _observe_cpu(options):
+    times = os.times()
+    return [Observation(times.user, {"mode": "user"}), Observation(times.system, {"mode": "system"})]
+
+
+def _observe_fds(options):
+    count = open_fds()
+    return [] if count is None else [Observation(count)]
+
+
+def install_process_metrics():
+    """Registra as métricas de runtime (uma vez por processo)."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    install_memory_metrics()
+    _meter.create_observable_counter(
+        "process_cpu_time",
+        callbacks=[_observe_cpu],
+        unit="s",
+        description="Tempo de CPU acumulado do processo",
+    )
+    _meter.create_observable_gauge(
+        "process_threads",
+        callbacks=[lambda options: [Observation(threading.active_count())]],
+        unit="1",
+        description="Threads Python vivas no processo",
+    )
+    _meter.create_observable_gauge(
+        "process_open_fds",
+        callbacks=[_observe_fds],
+        unit="1",
+        description="Descritores de arquivo abertos pelo processo",
+    )
@@ -0,0 +1,221 @@
+"""Endpoint Prometheus (pull) para o processo do pipeline e para os servidores Flask.
+
+Com o `PeriodicExportingMetricReader` as métricas são coletadas e enviadas a cada intervalo, mesmo
+que ninguém olhe. O `PrometheusPullReader` é um `MetricReader` que só coleta quando o Prometheus
+faz o scrape: a coleta (callbacks dos gauges, agregação) e a serialização no formato texto
+acontecem no `GET /metrics`, e o texto fica em cache por `min_interval_s` para que scrapes
+simultâneos (ou vários Prometheus em HA) paguem a coleta uma vez só.
+
+Ele entra no mesmo `MeterProvider` que o reader OTLP, sem interferir: cada reader tem a sua própria
+agregação e temporalidade (aqui sempre cumulativa, como o Prometheus espera).
+
+Nomes seguem a convenção do OpenTelemetry para Prometheus: caracteres inválidos viram `_`, a
+unidade vira sufixo (`stage_duration` em ms -> `stage_duration_milliseconds`) e contadores ganham
+`_total`. Histogramas exponenciais (o Logfire troca todos por exponenciais) são convertidos para
+buckets `le` cumulativos em potências de 2, que não mudam de um scrape para o outro. Os atributos
+do resource saem em `target_info`.
+
+Uso no pipeline (servidor HTTP próprio, em uma thread):
+
+    reader = PrometheusPullReader()
+    logfire.configure(metrics=logfire.MetricsOptions(additional_readers=[reader]))
+    start_http_server(reader, port=9464)
+
+Uso em um app Flask (rota no próprio app):
+
+    reader = PrometheusPullReader()
+    configure_telemetry("exemplo-02-server", metric_readers=[reader])
+    register_metrics_route(app, reader)
+"""
+import math
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic
+
+from opentelemetry.sdk.metrics.export import (
+    ExponentialHistogram as ExponentialHistogramData,
+    Gauge as GaugeData,
+    Histogram as HistogramData,
+    MetricReader,
+    Sum as SumData,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_PORT = 9464
+UNIT_SUFFIXES = {"ms": "milliseconds", "s": "seconds", "By": "bytes", "1": ""}
+
+_INVALID_NAME = re.compile(r"[^a-zA-Z0-9_:]")
+_INVALID_LABEL = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def metric_name(name, unit, counter=False):
+    """Nome Prometheus de uma métrica OTel (unidade como sufixo, `_total` em contadores)."""
+    name = _INVALID_NAME.sub("_", name)
+    if name[:1].isdigit():
+        name = "_" + name
+    suffix = UNIT_SUFFIXES.get(unit, None if unit and not unit.startswith("{") else "")
+    if suffix is None:
+        suffix = _INVALID_NAME.sub("_", unit)
+    if suffix and not name.endswith("_" + suffix):
+        name = f"{name}_{suffix}"
+    return f"{name}_total" if counter and not name.endswith("_total") else name
+
+
+def _escape(value, quote=True):
+    value = str(value).replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if quote else value
+
+
+def _labels(attributes, extra=None):
+    items = [(_INVALID_LABEL.sub("_", str(key)), value) for key, value in (attributes or {}).items()]
+    if extra:
+        items.extend(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+
+def _histogram_lines(name, point):
+    labels = point.attributes
+    lines = []
+    cumulative = 0
+    for bound, count in zip(point.explicit_bounds, point.bucket_counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(labels, [('le', _format_value(float(bound)))])} {cumulative}")
+    lines.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {point.count}")
+    lines.append(f"{name}_sum{_labels(labels)} {_format_value(point.sum)}")
+    lines.append(f"{name}_count{_labels(labels)} {point.count}")
+    return lines
+
+
+def _exponential_histogram_lines(name, point):
+    labels = point.attributes
+    lines = []
+    # Reduz para escala <= 0 (limites em potências de 2): os `le` ficam estáveis entre scrapes em vez
+    # de mudar com cada bucket fino novo, e a conversão continua exata
+    shift = max(point.scale, 0)
+    scale = point.scale - shift
+    merged = {}
+    for index, count in enumerate(point.positive.bucket_counts):
+        if count:
+            coarse = (point.positive.offset + index) >> shift
+            merged[coarse] = merged.get(coarse, 0) + count
+    base = 2 ** (2 ** -scale)
+    # Zeros e negativos (não acontecem em durações) ficam abaixo do primeiro bucket positivo
+    cumulative = point.zero_count + sum(point.negative.bucket_counts)
+    for index in range(min(merged), max(merged) + 1) if merged else ():
+        cumulative += merged.get(index, 0)
+        lines.append(f"{name}_bucket{_labels(labels, [('le', _format_value(base ** (index + 1)))])} {cumulative}")
+    lines.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {point.count}")
+    lines.append(f"{name}_sum{_labels(labels)} {_format_value(point.sum)}")
+    lines.append(f"{name}_count{_labels(labels)} {point.count}")
+    return lines
+
+
+def serialize(metrics_data):
+    """MetricsData (cumulativo) no formato texto de exposição do Prometheus."""
+    families = {}  # nome -> (tipo, descrição, linhas); o mesmo nome pode vir de vários meters
+    targets = []
+    for resource_metrics in metrics_data.resource_metrics:
+        if resource_metrics.resource.attributes:
+            targets.append(f"target_info{_labels(resource_metrics.resource.attributes)} 1")
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                data = metric.data
+                if isinstance(data, SumData):
+                    name = metric_name(metric.name, metric.unit, counter=data.is_monotonic)
+                    kind = "counter" if data.is_monotonic else "gauge"
+                    lines = [f"{name}{_labels(point.attributes)} {_format_value(point.value)}" for point in data.data_points]
+                elif isinstance(data, GaugeData):
+                    name, kind = metric_name(metric.name, metric.unit), "gauge"
+                    lines = [f"{name}{_labels(point.attributes)} {_format_value(point.value)}" for point in data.data_points]
+                elif isinstance(data, HistogramData):
+                    name, kind = metric_name(metric.name, metric.unit), "histogram"
+                    lines = [line for point in data.data_points for line in _histogram_lines(name, point)]
+                elif isinstance(data, ExponentialHistogramData):
+                    name, kind = metric_name(metric.name, metric.unit), "histogram"
+                    lines = [line for point in data.data_points for line in _exponential_histogram_lines(name, point)]
+                else:
+                    continue
+                family = families.setdefault(name, (kind, metric.description, []))
+                family[2].extend(lines)
+    output = []
+    if targets:
+        output += ["# HELP target_info Target metadata", "# TYPE target_info gauge", *targets]
+    for name, (kind, description, lines) in families.items():
+        if description:
+            output.append(f"# HELP {name} {_escape(description, quote=False)}")
+        output.append(f"# TYPE {name} {kind}")
+        output.extend(lines)
+    return "\n".join(output) + "\n"
+
+
+class PrometheusPullReader(MetricReader):
+    """MetricReader que coleta só no scrape e guarda o texto serializado por `min_interval_s`."""
+
+    def __init__(self, min_interval_s=1.0, preferred_aggregation=None):
+        super().__init__(preferred_aggregation=preferred_aggregation)
+        self.min_interval_s = min_interval_s
+        self._lock = threading.Lock()
+        self._metrics_data = None
+        self._body = b""
+        self._collected_at = None
+
+    def _receive_metrics(self, metrics_data, timeout_millis=10_000, **kwargs):
+        self._metrics_data = metrics_data
+
+    def body(self):
+        """Texto de exposição (bytes UTF-8), coletando de novo se o cache passou de `min_interval_s`."""
+        with self._lock:  # scrapes concorrentes esperam a coleta em andamento e usam o resultado
+            now = monotonic()
+            if self._collected_at is None or now - self._collected_at >= self.min_interval_s:
+                self._metrics_data = None
+                self.collect()
+                self._body = serialize(self._metrics_data).encode() if self._metrics_data else b""
+                self._collected_at = now
+            return self._body
+
+    def shutdown(self, timeout_millis=30_000, **kwargs):
+        pass
+
+
+def start_http_server(reader, port=DEFAULT_PORT, addr="0.0.0.0"):
+    """Serve `/metrics` do `reader` em uma thread daemon; devolve o servidor (para `shutdown()`)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = reader.body()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # sem uma linha no stderr a cada scrape
+            pass
+
+    server = ThreadingHTTPServer((addr, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="PrometheusEndpoint", daemon=True).start()
+    return server
+
+
+def register_metrics_route(app, reader, path="/metrics"):
+    """Adiciona a rota de scrape a um app Flask."""
+    from flask import Response
+
+    app.add_url_rule(path, "prometheus_metrics", lambda: Response(reader.body(), content_type=CONTENT_TYPE))
@@ -0,0 +1,85 @@
+"""Métricas RED (rate, errors, duration) derivadas dos spans finalizados.
+
+Só o `main_logfire_06/07` gravam `stage_duration` à mão; os spans de `instrument_requests`,
+`instrument_sqlalchemy` e os `logfire.span` das outras variantes só existem como spans, e para
+montar um gráfico de taxa/erros/latência é preciso varrer o armazenamento de spans. O
+`SpanMetricsProcessor` agrega cada span que termina em:
+- `span_calls`: contador de spans por nome;
+- `span_errors`: contador de spans com status ERROR;
+- `span_duration` (ms): histograma de duração.
+
+Os atributos das métricas são `span_name`, `span_kind` e os atributos do span que estiverem em
+`attribute_allowlist` (etapa, método/status HTTP, host, banco e operação SQL). Atributos fora da
+lista nunca viram dimensão, então a cardinalidade fica sob controle. Logs e "pending spans" do
+Logfire são ignorados.
+
+Uso (não precisa de downstream: é só mais um processor):
+
+    logfire.configure(additional_span_processors=[SpanMetricsProcessor()])
+    tracer_provider.add_span_processor(SpanMetricsProcessor())
+"""
+from opentelemetry import metrics, trace
+from opentelemetry.sdk.trace import SpanProcessor
+from opentelemetry.trace import NonRecordingSpan, StatusCode
+
+DEFAULT_ATTRIBUTE_ALLOWLIST = (
+    "stage",
+    "http.request.method",
+    "http.method",
+    "http.response.status_code",
+    "http.status_code",
+    "server.address",
+    "net.peer.name",
+    "db.system",
+    "db.name",
+    "db.operation",
+    "db.operation.name",
+)
+# Tipos de span do Logfire que não representam uma operação com duração
+IGNORED_SPAN_TYPES = ("log", "pending_span")
+
+_meter = metrics.get_meter("pipeline_etl.span_metrics")
+span_calls = _meter.create_counter(
+    "span_calls",
+    unit="1",
+    description="Spans finalizados, por nome",
+)
+span_errors = _meter.create_counter(
+    "span_errors",
+    unit="1",
+    description="Spans finalizados com status de erro, por nome",
+)
+span_duration = _meter.create_histogram(
+    "span_duration",
+    unit="ms",
+    description="Duração dos spans finalizados, por nome",
+)
+
+
+class SpanMetricsProcessor(SpanProcessor):
+    """Span processor que transforma cada span finalizado em métricas RED."""
+
+    def __init__(self, attribute_allowlist=DEFAULT_ATTRIBUTE_ALLOWLIST):
+        self.attribute_allowlist = tuple(attribute_allowlist)
+
+    def _attributes(self, span):
+        attributes = {"span_name": span.name, "span_kind": span.kind.name.lower()}
+        span_attributes = span.attributes or {}
+        for key in self.attribute_allowlist:
+            value = span_attributes.get(key)
+            if value is not None:
+                attributes[key] = value
+        return attributes
+
+    def on_end(self, span):
+        if (span.attributes or {}).get("logfire.span_type") in IGNORED_SPAN_TYPES:
+            return
+        if span.start_time is None or span.end_time is None:
+            return
+        attributes = self._attributes(span)
+        # O span já foi desanexado do contexto: passa ele explicitamente para os exemplars
+        context = trace.set_span_in_context(NonRecordingSpan(span.context))
+        span_calls.add(1, attributes, context=context)
+        if span.status.status_code is StatusCode.ERROR:
+            span_errors.add(1, attributes, context=context)
+        span_duration.record((span.end_time - span.start_time) / 1e6, attributes, context=context)
@@ -0,0 +1,32 @@
+import os
+from datetime import datetime, timezone
+from pydantic import BaseModel
+from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy.orm import declarative_base
+
+# Modelos compartilhados pelas ferramentas do pipeline (arquivo, exportação, backfill...).
+# Diferente dos scripts main_*.py, este módulo não tem efeitos colaterais ao ser importado.
+
+# URI do banco: por padrão um SQLite local, para rodar as ferramentas sem o Postgres do Render
+POSTGRES_URI = os.getenv("POSTGRES_URI", "sqlite:///bitcoin_data.db")
+
+# Base declarativa do SQLAlchemy
+Base = declarative_base()
+
+# Modelo da tabela usando SQLAlchemy (mesma tabela dos scripts main_logfire_*.py)
+class BitcoinDataModel(Base):
+    __tablename__ = "bitcoin_data"
+    id = Column(Integer, primary_key=True, autoincrement=True)  # ID incremental
+    amount = Column(String, nullable=False)
+    base = Column(String, nullable=False)
+    currency = Column(String, nullable=False)
+    timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))  # Timestamp com valor padrão
+
+# Modelo Pydantic para validação de dados
+class BitcoinData(BaseModel):
+    amount: str
+    base: str
+    currency: str
+
+class ApiResponse(BaseModel):
+    data: BitcoinData
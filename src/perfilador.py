@@ -0,0 +1,192 @@
+"""Profiler por amostragem que liga sozinho nas iterações lentas do pipeline.
+
+Os spans dizem qual etapa demorou, mas não em quais frames Python. `profile_if_slow` envolve uma
+iteração e, se ela passar de `threshold_s`, começa a amostrar a pilha da thread da iteração a cada
+`interval_s` (via `sys._current_frames()`) até ela terminar. No fim:
+- grava `<trace_id>.folded` (formato "folded stacks": `a;b;c contagem` por linha, o que o
+  `flamegraph.pl` e o speedscope leem) e `<trace_id>.svg` (flamegraph) em `output_dir`;
+- marca o span atual (o da iteração) com `profile.samples`, `profile.folded` e `profile.flamegraph`,
+  então o trace no Logfire aponta para os arquivos e vice-versa.
+
+Enquanto nenhuma iteração passa do limite não há thread amostrando: cada iteração só registra um
+prazo em uma thread vigia compartilhada (um heap e uma Condition).
+
+O perfil só cobre o trecho depois do limite (o começo da iteração lenta não é amostrado). Usamos
+um timer em thread em vez de SIGPROF porque sinais só chegam à thread principal.
+
+Uso:
+
+    with logfire.span("Execução completa do pipeline ETL"), profile_if_slow(threshold_s=5):
+        ...
+"""
+import heapq
+import itertools
+import os
+import sys
+import threading
+import zlib
+from collections import Counter
+from html import escape
+from time import monotonic, time
+
+from opentelemetry import trace
+
+OUTPUT_DIR = "perfis"
+
+
+class _Watchdog:
+    """Thread única que dispara o profiler das iterações que passaram do prazo."""
+
+    def __init__(self):
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def schedule(self, deadline, job):
+        with self._condition:
+            heapq.heappush(self._heap, (deadline, next(self._sequence), job))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ProfilerWatchdog", daemon=True)
+                self._thread.start()
+            if self._heap[0][2] is job:  # só acorda a vigia se o prazo mais próximo mudou
+                self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap or self._heap[0][0] > monotonic():
+                    self._condition.wait(self._heap[0][0] - monotonic() if self._heap else None)
+                _, _, job = heapq.heappop(self._heap)
+            if not job.done:
+                job.start_sampling()
+
+
+_watchdog = _Watchdog()
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def fold(frame):
+    """Pilha de `frame` no formato folded: da raiz para a folha, separada por ';'."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class profile_if_slow:
+    """Context manager que amostra a pilha da thread atual se o bloco passar de `threshold_s`."""
+
+    def __init__(self, threshold_s=1.0, interval_s=0.005, output_dir=OUTPUT_DIR, max_samples=50_000):
+        self.threshold_s = threshold_s
+        self.interval_s = interval_s
+        self.output_dir = output_dir
+        self.max_samples = max_samples
+        self.samples = Counter()
+        self.done = False
+        self._stop = None
+        self._sampler = None
+
+    def __enter__(self):
+        self._thread_id = threading.get_ident()
+        self._span = trace.get_current_span()
+        self.done = False
+        self.samples.clear()
+        _watchdog.schedule(monotonic() + self.threshold_s, self)
+        return self
+
+    def start_sampling(self):
+        # Event e thread só existem para as iterações lentas
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="ProfilerSampler", daemon=True)
+        self._sampler.start()
+
+    def _sample(self):
+        total = 0
+        while not self.done and not self._stop.wait(self.interval_s) and total < self.max_samples:
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None or self.done:  # a iteração terminou enquanto amostrávamos
+                return
+            self.samples[fold(frame)] += 1
+            total += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        self.done = True
+        if self._sampler is None:
+            return False
+        self._stop.set()
+        self._sampler.join()
+        self._sampler = None
+        if self.samples:
+            self._write()
+        return False
+
+    def _write(self):
+        span_context = self._span.get_span_context()
+        name = format(span_context.trace_id, "032x") if span_context.is_valid else f"sem-trace-{int(time())}"
+        os.makedirs(self.output_dir, exist_ok=True)
+        folded_path = os.path.join(self.output_dir, f"{name}.folded")
+        svg_path = os.path.join(self.output_dir, f"{name}.svg")
+        write_folded(self.samples, folded_path)
+        write_flamegraph(self.samples, svg_path, title=f"trace {name} ({sum(self.samples.values())} amostras)")
+        self._span.set_attributes({
+            "profile.samples": sum(self.samples.values()),
+            "profile.interval_ms": self.interval_s * 1000,
+            "profile.folded": os.path.abspath(folded_path),
+            "profile.flamegraph": os.path.abspath(svg_path),
+        })
+
+
+def write_folded(samples, path):
+    with open(path, "w", encoding="utf-8") as file:
+        for stack, count in sorted(samples.items()):
+            file.write(f"{stack} {count}\n")
+
+
+def write_flamegraph(samples, path, title="flamegraph", width=1200, frame_height=16):
+    """SVG de flamegraph (raiz embaixo) a partir das pilhas folded, sem dependências externas."""
+    root = {"count": 0, "children": {}}
+    for stack, count in samples.items():
+        root["count"] += count
+        node = root
+        for label in stack.split(";"):
+            node = node["children"].setdefault(label, {"count": 0, "children": {}})
+            node["count"] += count
+
+    rects = []
+
+    def layout(node, x, depth):
+        for label, child in sorted(node["children"].items()):
+            child_width = child["count"] / root["count"] * width
+            rects.append((label, child["count"], x, depth, child_width))
+            layout(child, x, depth + 1)
+            x += child_width
+
+    layout(root, 0.0, 0)
+    max_depth = max((depth for _, _, _, depth, _ in rects), default=0) + 1
+    height = (max_depth + 2) * frame_height
+    lines = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="monospace" font-size="11">',
+        f'<text x="4" y="{frame_height - 4}">{escape(title)}</text>',
+    ]
+    for label, count, x, depth, rect_width in rects:
+        if rect_width < 0.5:
+            continue
+        y = height - (depth + 1) * frame_height
+        hue = zlib.crc32(label.encode()) % 60  # tons de vermelho a amarelo, estáveis por frame
+        share = count / root["count"]
+        text = label if len(label) * 7 < rect_width - 6 else label[: max(0, int((rect_width - 6) / 7) - 1)] + "…"
+        lines.append(
+            f'<g><title>{escape(label)} — {count} amostras ({share:.1%})</title>'
+            f'<rect x="{x:.2f}" y="{y}" width="{rect_width:.2f}" height="{frame_height - 1}" fill="hsl({hue},85%,60%)"/>'
+            + (f'<text x="{x + 3:.2f}" y="{y + frame_height - 4}">{escape(text)}</text>' if rect_width > 20 else "")
+            + "</g>"
+        )
+    lines.append("</svg>")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("\n".join(lines))
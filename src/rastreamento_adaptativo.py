@@ -0,0 +1,347 @@
+"""Auto-tracing com controle adaptativo de overhead.
+
+`exemplo_logfire/pipeline_4.py` usava `logfire.install_auto_tracing(modules=[...], min_duration=0.01)`:
+o limite é fixo e, depois que uma função passa dele uma vez, todas as chamadas seguintes viram span.
+Sob carga isso inunda o backend; com um limite alto demais, nada aparece.
+
+`install_adaptive_auto_tracing()` instala um import hook que embrulha as funções dos módulos
+escolhidos. Cada função fica em um de três modos:
+- `measured`: só mede a duração (média móvel exponencial), sem span;
+- `traced`: abre um span por chamada, medindo quanto custa abrir e fechar o span;
+- `disabled`: chama a função original direto, sem medir nada.
+
+A cada `interval_s` segundos o `AdaptiveAutoTracer` compara o overhead da instrumentação com o
+tempo de CPU do processo no intervalo:
+- acima de `cpu_budget` (ou de `max_spans_per_s`): se o custo vem principalmente dos spans, dobra
+  o `min_duration` efetivo até `max_min_duration`; se vem de medir funções curtas muito chamadas
+  (ou o limite já está no teto), desliga a função que mais custou;
+- abaixo da metade do orçamento: reativa (em `measured`) uma função desligada há mais de
+  `cooldown_s`, ou reduz o `min_duration` pela metade, até o valor configurado;
+- funções cuja duração média está acima do `min_duration` efetivo passam a `traced`, as demais a
+  `measured`.
+
+Entre dois ciclos, uma chamada medida que passa do limite efetivo já promove a função a `traced`.
+
+Métricas: `auto_tracing_min_duration` (ms), `auto_tracing_overhead_ratio`, `auto_tracing_span_rate`,
+`auto_tracing_functions` (por modo) e `auto_tracing_function_duration` (média por função e modo).
+
+Geradores e corrotinas não são embrulhados. Os contadores por função não usam lock: com várias
+threads as contagens são aproximadas, o que basta para o controle.
+
+Uso (antes de importar os módulos instrumentados, como no Logfire):
+
+    logfire.configure()
+    install_adaptive_auto_tracing(modules=["pipeline_2"], min_duration=0.01, cpu_budget=0.02)
+    from pipeline_2 import etl_pipeline
+"""
+import functools
+import importlib.abc
+import inspect
+import sys
+import threading
+from time import perf_counter_ns, process_time_ns
+from types import SimpleNamespace
+
+from opentelemetry import context, metrics, trace
+from opentelemetry.metrics import Observation
+from opentelemetry.trace import Status, StatusCode
+
+MEASURED, TRACED, DISABLED = "measured", "traced", "disabled"
+EWMA_ALPHA = 0.2
+
+_tracer = trace.get_tracer("pipeline_etl.auto_tracing")
+_meter = metrics.get_meter("pipeline_etl.auto_tracing")
+
+
+class FunctionState:
+    """Modo e estatísticas de uma função instrumentada."""
+
+    __slots__ = ("name", "mode", "mean_ns", "calls", "spans", "span_overhead_ns", "disabled_at")
+
+    def __init__(self, name, mode):
+        self.name = name
+        self.mode = mode
+        self.mean_ns = 0.0
+        self.calls = 0  # chamadas medidas no intervalo atual
+        self.spans = 0  # spans abertos no intervalo atual
+        self.span_overhead_ns = 0  # custo de abrir/fechar spans no intervalo atual
+        self.disabled_at = None
+
+    def observe(self, duration_ns):
+        self.calls += 1
+        self.mean_ns += EWMA_ALPHA * (duration_ns - self.mean_ns) if self.mean_ns else duration_ns
+
+
+def instrument(func, state, controller):
+    """Embrulha `func` de acordo com o modo atual de `state`.
+
+    Como no Logfire, uma chamada medida que passa do `min_duration` efetivo do `controller` já
+    promove a função a `traced`, sem esperar o próximo ciclo de controle.
+    """
+    name = state.name
+    attributes = {"code.function": func.__qualname__, "code.namespace": func.__module__}
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        mode = state.mode
+        if mode is DISABLED:
+            return func(*args, **kwargs)
+        if mode is MEASURED:
+            start = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                duration = perf_counter_ns() - start
+                state.observe(duration)
+                if duration >= controller.min_duration_ns:
+                    state.mode = TRACED
+        opened = perf_counter_ns()
+        span = _tracer.start_span(name, attributes=attributes)
+        token = context.attach(trace.set_span_in_context(span))
+        start = perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        except Exception as exc:
+            span.record_exception(exc)
+            span.set_status(Status(StatusCode.ERROR, f"{type(exc).__name__}: {exc}"))
+            raise
+        finally:
+            end = perf_counter_ns()
+            context.detach(token)
+            span.end()
+            state.observe(end - start)
+            state.spans += 1
+            state.span_overhead_ns += (start - opened) + (perf_counter_ns() - end)
+
+    wrapper.__adaptive_auto_tracing__ = state
+    return wrapper
+
+
+def _calibrate_measure_cost(rounds=20_000):
+    """Custo (ns) de uma chamada em modo `measured` comparada à chamada direta."""
+    def noop():
+        pass
+
+    state = FunctionState("calibração", MEASURED)
+    wrapped = instrument(noop, state, SimpleNamespace(min_duration_ns=float("inf")))
+    start = perf_counter_ns()
+    for _ in range(rounds):
+        noop()
+    direct = perf_counter_ns() - start
+    start = perf_counter_ns()
+    for _ in range(rounds):
+        wrapped()
+    return max(0, (perf_counter_ns() - start - direct) / rounds)
+
+
+class AdaptiveAutoTracer:
+    """Mantém os modos das funções instrumentadas dentro do orçamento de CPU."""
+
+    def __init__(
+        self,
+        min_duration=0.01,
+        cpu_budget=0.02,
+        max_spans_per_s=None,
+        max_min_duration=1.0,
+        interval_s=5.0,
+        cooldown_s=60.0,
+    ):
+        self.base_min_duration_ns = int(min_duration * 1e9)
+        self.min_duration_ns = self.base_min_duration_ns
+        self.max_min_duration_ns = int(max_min_duration * 1e9)
+        self.cpu_budget = cpu_budget
+        self.max_spans_per_s = max_spans_per_s
+        self.interval_s = interval_s
+        self.cooldown_s = cooldown_s
+        self.functions = []
+        self.overhead_ratio = 0.0
+        self.span_rate = 0.0
+        self.measure_cost_ns = _calibrate_measure_cost()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._last_cpu = process_time_ns()
+        self._last_tick = perf_counter_ns()
+        self._thread = None
+        self._register_metrics()
+
+    def register(self, func):
+        state = FunctionState(f"{func.__module__}.{func.__qualname__}", MEASURED)
+        with self._lock:
+            self.functions.append(state)
+        return instrument(func, state, self)
+
+    def tick(self):
+        """Um passo do controle: mede o intervalo, ajusta o limite e os modos das funções."""
+        now, cpu = perf_counter_ns(), process_time_ns()
+        elapsed_ns, cpu_ns = max(1, now - self._last_tick), max(1, cpu - self._last_cpu)
+        self._last_tick, self._last_cpu = now, cpu
+        with self._lock:
+            functions = list(self.functions)
+        costs = {}
+        spans = span_cost = 0
+        for state in functions:
+            measured_calls = state.calls - state.spans
+            costs[state] = state.span_overhead_ns + measured_calls * self.measure_cost_ns
+            spans += state.spans
+            span_cost += state.span_overhead_ns
+            state.calls = state.spans = state.span_overhead_ns = 0
+        total_cost = sum(costs.values())
+        self.overhead_ratio = total_cost / cpu_ns
+        self.span_rate = spans / (elapsed_ns / 1e9)
+
+        over_budget = self.overhead_ratio > self.cpu_budget or (
+            self.max_spans_per_s is not None and self.span_rate > self.max_spans_per_s
+        )
+        if over_budget:
+            # Subir o limite só reduz spans; se o custo vem de medir funções curtas e muito
+            # chamadas (ou o limite já está no teto), o jeito é desligar a que mais custa.
+            if span_cost >= total_cost / 2 and self.min_duration_ns < self.max_min_duration_ns:
+                self.min_duration_ns = min(self.min_duration_ns * 2, self.max_min_duration_ns)
+            else:
+                active = [state for state in functions if state.mode is not DISABLED]
+                if active:
+                    worst = max(active, key=costs.get)
+                    worst.mode, worst.disabled_at = DISABLED, now
+        elif self.overhead_ratio < self.cpu_budget / 2:
+            cooled = [
+                state for state in functions
+                if state.mode is DISABLED and now - state.disabled_at >= self.cooldown_s * 1e9
+            ]
+            if cooled:
+                cooled[0].mode, cooled[0].disabled_at = MEASURED, None
+            elif self.min_duration_ns > self.base_min_duration_ns:
+                self.min_duration_ns = max(self.min_duration_ns // 2, self.base_min_duration_ns)
+
+        for state in functions:
+            if state.mode is not DISABLED:
+                state.mode = TRACED if state.mean_ns >= self.min_duration_ns else MEASURED
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self.tick()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="AdaptiveAutoTracer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _register_metrics(self):
+        _meter.create_observable_gauge(
+            "auto_tracing_min_duration",
+            callbacks=[lambda options: [Observation(self.min_duration_ns / 1e6)]],
+            unit="ms",
+            description="min_duration efetivo do auto-tracing adaptativo",
+        )
+        _meter.create_observable_gauge(
+            "auto_tracing_overhead_ratio",
+            callbacks=[lambda options: [Observation(self.overhead_ratio)]],
+            unit="1",
+            description="Fração da CPU do processo gasta com a instrumentação no último intervalo",
+        )
+        _meter.create_observable_gauge(
+            "auto_tracing_span_rate",
+            callbacks=[lambda options: [Observation(self.span_rate)]],
+            unit="1/s",
+            description="Spans por segundo criados pelo auto-tracing no último intervalo",
+        )
+        _meter.create_observable_gauge(
+            "auto_tracing_functions",
+            callbacks=[self._observe_modes],
+            unit="1",
+            description="Funções instrumentadas por modo (measured, traced, disabled)",
+        )
+        _meter.create_observable_gauge(
+            "auto_tracing_function_duration",
+            callbacks=[self._observe_functions],
+            unit="ms",
+            description="Duração média (EWMA) de cada função instrumentada",
+        )
+
+    def _observe_modes(self, options):
+        with self._lock:
+            modes = [state.mode for state in self.functions]
+        return [Observation(modes.count(mode), {"mode": mode}) for mode in (MEASURED, TRACED, DISABLED)]
+
+    def _observe_functions(self, options):
+        with self._lock:
+            functions = list(self.functions)
+        return [
+            Observation(state.mean_ns / 1e6, {"function": state.name, "mode": state.mode})
+            for state in functions
+        ]
+
+
+def _should_wrap(value, module_name):
+    return (
+        inspect.isfunction(value)
+        and value.__module__ == module_name
+        and not inspect.isgeneratorfunction(value)
+        and not inspect.iscoroutinefunction(value)
+        and not inspect.isasyncgenfunction(value)
+        and not hasattr(value, "__adaptive_auto_tracing__")
+    )
+
+
+def instrument_module(module, tracer):
+    """Troca as funções e métodos definidos em `module` pelas versões instrumentadas."""
+    for name, value in list(vars(module).items()):
+        if _should_wrap(value, module.__name__):
+            setattr(module, name, tracer.register(value))
+        elif inspect.isclass(value) and value.__module__ == module.__name__:
+            for attribute, member in list(vars(value).items()):
+                if _should_wrap(member, module.__name__):
+                    setattr(value, attribute, tracer.register(member))
+                elif isinstance(member, (staticmethod, classmethod)) and _should_wrap(member.__func__, module.__name__):
+                    setattr(value, attribute, type(member)(tracer.register(member.__func__)))
+
+
+class _InstrumentingLoader(importlib.abc.Loader):
+    def __init__(self, loader, tracer):
+        self.loader = loader
+        self.tracer = tracer
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.loader.exec_module(module)
+        instrument_module(module, self.tracer)
+
+
+class _AdaptiveFinder(importlib.abc.MetaPathFinder):
+    def __init__(self, modules, tracer):
+        self.modules = tuple(modules)
+        self.tracer = tracer
+
+    def find_spec(self, fullname, path, target=None):
+        if not any(fullname == name or fullname.startswith(name + ".") for name in self.modules):
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _InstrumentingLoader(spec.loader, self.tracer)
+                return spec
+        return None
+
+
+def install_adaptive_auto_tracing(modules, min_duration=0.01, cpu_budget=0.02, **kwargs):
+    """Instrumenta os módulos `modules` (e submódulos) importados daqui em diante.
+
+    Devolve o `AdaptiveAutoTracer` já rodando; `kwargs` vão para ele.
+    """
+    already_imported = [name for name in modules if name in sys.modules]
+    if already_imported:
+        raise RuntimeError(
+            f"Módulos já importados: {already_imported}. Chame install_adaptive_auto_tracing antes de importá-los."
+        )
+    tracer = AdaptiveAutoTracer(min_duration=min_duration, cpu_budget=cpu_budget, **kwargs)
+    sys.meta_path.insert(0, _AdaptiveFinder(modules, tracer))
+    return tracer.start()
@@ -0,0 +1,217 @@
+"""Gravação e reprodução das respostas da API para rodar o pipeline sem tocar a API real.
+
+Cada resposta do extract vira uma linha JSONL com o horário original:
+
+    {"recorded_at": 1760870400.123, "source_at": 1760870400.0, "status": 200, "payload": {"data": {...}}}
+
+`recorded_at` e `source_at` são os mesmos campos do `frescor.Stamp` (epoch em segundos; `source_at`
+vem do header `Date` e pode ser null). No `main_logfire_07_lag.py`, `RECORD_RESPONSES=<arquivo>`
+liga a gravação; fora dele:
+
+    recorder = ResponseRecorder("respostas.jsonl")
+    recorder.record(response, stamp_)
+
+A reprodução lê o arquivo e entrega os payloads no ritmo original, acelerado (`speed=10` comprime
+10 minutos gravados em 1) ou o mais rápido possível (`speed=None`), e a CLI passa cada um por
+transform (Pydantic) e load (`carga_core`) dentro de `stage()`, como o pipeline. Serve para:
+- medir o teto de vazão do pipeline (`--max`, com `--lote` para ver o ganho de transações maiores);
+- reproduzir um incidente com a cadência e os payloads que o causaram (`--timestamp original` grava
+  as linhas com o horário da gravação, para comparar com o que foi para produção).
+
+Quando o pipeline não acompanha a cadência pedida, a reprodução não pula registros: eles saem
+atrasados e o atraso máximo em relação ao cronograma entra no resumo.
+
+Uso:
+    python reproducao.py --arquivo respostas.jsonl --velocidade 10
+    python reproducao.py --arquivo respostas.jsonl --max --lote 100 --repeticoes 50 --uri sqlite:///replay.db
+"""
+import argparse
+import json
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from time import monotonic, perf_counter, sleep, time
+from typing import NamedTuple, Optional
+
+import logfire
+from pydantic import ValidationError
+
+from carga_core import insert_rows, to_rows
+from conexao import get_engine
+from etapas import stage
+from frescor import Stamp
+from modelos import POSTGRES_URI, ApiResponse, Base
+
+replayed_records = logfire.metric_counter(
+    "replay_records", unit="1", description="Registros reproduzidos a partir de uma gravação"
+)
+replay_schedule_lag = logfire.metric_histogram(
+    "replay_schedule_lag", unit="s", description="Atraso de cada registro em relação ao cronograma da gravação"
+)
+
+
+class Recorded(NamedTuple):
+    """Uma resposta gravada: horário original (epoch em segundos), status HTTP e corpo JSON."""
+
+    recorded_at: float
+    payload: dict
+    source_at: Optional[float] = None
+    status: Optional[int] = None
+
+
+class ResponseRecorder:
+    """Acrescenta cada resposta ao arquivo JSONL, uma linha por resposta, com flush a cada linha."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._file = self.path.open("a", encoding="utf-8")
+
+    def record(self, response, stamp_=None):
+        """Grava a resposta `requests` já recebida; `stamp_` é o do extract (senão usa o horário atual)."""
+        stamp_ = stamp_ or Stamp(time())
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {"text": response.text}
+        line = json.dumps({
+            "recorded_at": stamp_.extracted_at,
+            "source_at": stamp_.source_at,
+            "status": response.status_code,
+            "payload": payload,
+        }, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()  # um processo interrompido perde no máximo a linha em andamento
+
+    def close(self):
+        self._file.close()
+
+
+def read_recording(path):
+    """Lê a gravação em ordem de `recorded_at`; linhas vazias ou truncadas são ignoradas."""
+    records = []
+    with open(path, encoding="utf-8") as file:
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                records.append(Recorded(
+                    float(item["recorded_at"]), item["payload"], item.get("source_at"), item.get("status"),
+                ))
+            except (ValueError, KeyError, TypeError):
+                logfire.warn("Linha {number} da gravação ignorada (JSON inválido)", number=number)
+    records.sort(key=lambda record: record.recorded_at)
+    return records
+
+
+class ReplaySource:
+    """Itera os registros gravados respeitando a cadência original dividida por `speed`.
+
+    `speed=None` entrega tudo sem esperar. `repeat` reproduz a gravação várias vezes em sequência
+    (cada volta começa logo depois da anterior, mantendo os intervalos da gravação).
+    """
+
+    def __init__(self, records, speed=1.0, repeat=1):
+        if speed is not None and speed <= 0:
+            raise ValueError("speed deve ser positivo (ou None para o máximo)")
+        self.records = records
+        self.speed = speed
+        self.repeat = repeat
+        self.max_lag_s = 0.0
+
+    def __iter__(self):
+        if not self.records:
+            return
+        first = self.records[0].recorded_at
+        span = self.records[-1].recorded_at - first
+        # Intervalo entre a última resposta de uma volta e a primeira da seguinte: o mediano da gravação
+        gaps = sorted(b.recorded_at - a.recorded_at for a, b in zip(self.records, self.records[1:]))
+        period = span + (gaps[len(gaps) // 2] if gaps else 0)
+        start = monotonic()
+        for lap in range(self.repeat):
+            for record in self.records:
+                if self.speed is not None:
+                    due = start + (lap * period + record.recorded_at - first) / self.speed
+                    wait = due - monotonic()
+                    if wait > 0:
+                        sleep(wait)
+                    else:
+                        self.max_lag_s = max(self.max_lag_s, -wait)
+                    replay_schedule_lag.record(max(-wait, 0))
+                yield record
+
+
+def transform(payload):
+    """Mesma validação do pipeline: `ApiResponse` do Pydantic."""
+    with stage("transform", "Validando os dados com Pydantic"):
+        return ApiResponse(**payload).data
+
+
+def load(engine, batch):
+    """Grava um lote de (registro validado, timestamp) em uma transação."""
+    with stage("load", "Carregando os dados reproduzidos"):
+        with engine.begin() as conn:
+            insert_rows(conn, [row for record, timestamp in batch for row in to_rows([record], timestamp)])
+
+
+def replay(engine, source, batch_size=1, original_timestamps=False):
+    """Passa os registros de `source` por transform e load. Devolve (carregados, inválidos, segundos)."""
+    Base.metadata.create_all(engine)
+    loaded = invalid = 0
+    batch = []
+    began = perf_counter()
+    with logfire.span("Reprodução de {records} respostas gravadas", records=len(source.records) * source.repeat):
+        for record in source:
+            try:
+                data = transform(record.payload)
+            except (ValidationError, TypeError) as e:
+                # Payloads de erro da API (ou do incidente) aparecem como no pipeline, sem parar a reprodução
+                logfire.error(f"Erro na transformação: {e}")
+                invalid += 1
+                replayed_records.add(1, {"status": "invalid"})
+                continue
+            timestamp = datetime.fromtimestamp(record.recorded_at, timezone.utc) if original_timestamps else None
+            batch.append((data, timestamp))
+            if len(batch) >= batch_size:
+                load(engine, batch)
+                loaded += len(batch)
+                replayed_records.add(len(batch), {"status": "loaded"})
+                batch = []
+        if batch:
+            load(engine, batch)
+            loaded += len(batch)
+            replayed_records.add(len(batch), {"status": "loaded"})
+    return loaded, invalid, perf_counter() - began
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--arquivo", required=True, help="gravação JSONL (RECORD_RESPONSES do main_logfire_07_lag.py)")
+    parser.add_argument("--uri", default=POSTGRES_URI)
+    speed = parser.add_mutually_exclusive_group()
+    speed.add_argument("--velocidade", type=float, default=1.0, help="multiplicador da cadência original")
+    speed.add_argument("--max", action="store_true", help="o mais rápido possível, sem esperar")
+    parser.add_argument("--lote", type=int, default=1, help="registros por transação no load")
+    parser.add_argument("--repeticoes", type=int, default=1, help="voltas pela gravação")
+    parser.add_argument("--timestamp", choices=("agora", "original"), default="agora")
+    args = parser.parse_args()
+
+    logfire.configure(send_to_logfire="if-token-present", inspect_arguments=False)
+    records = read_recording(args.arquivo)
+    if not records:
+        logfire.info("Gravação vazia, nada a reproduzir.")
+        return
+    source = ReplaySource(records, speed=None if args.max else args.velocidade, repeat=args.repeticoes)
+    engine = get_engine(args.uri)
+    loaded, invalid, elapsed = replay(engine, source, args.lote, args.timestamp == "original")
+    logfire.info(
+        "Reprodução concluída: {rows} registros ({invalid} inválidos) em {elapsed:.1f}s "
+        "({rate:.0f} registros/s, atraso máximo {lag:.2f}s)",
+        rows=loaded, invalid=invalid, elapsed=elapsed, rate=(loaded + invalid) / elapsed, lag=source.max_lag_s,
+    )
+
+
+if __name__ == "__main__":
+    main()
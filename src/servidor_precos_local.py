@@ -0,0 +1,68 @@
+"""Servidor local que imita as APIs de preço da Coinbase, para testes sem internet.
+
+Rotas:
+- /v2/prices/<par>/spot            -> mesmo formato de https://api.coinbase.com/v2/prices/spot
+- /products/<par>/candles          -> mesmo formato de https://api.exchange.coinbase.com (máx. 300 candles)
+
+Os preços são determinísticos (dependem só do par e do horário), então dois backfills do mesmo
+intervalo produzem os mesmos dados.
+
+Uso:
+    python servidor_precos_local.py --porta 8085 --latencia-ms 50
+"""
+import argparse
+import math
+import zlib
+from datetime import datetime, timezone
+from time import sleep, time
+
+from flask import Flask, jsonify, request
+
+MAX_CANDLES = 300
+
+app = Flask(__name__)
+app.config["LATENCY_S"] = 0.0
+
+
+def price_at(pair, epoch_s):
+    """Preço sintético de um par em um instante."""
+    seed = zlib.crc32(pair.encode()) % 10_000
+    noise = (zlib.crc32(f"{pair}:{int(epoch_s)}".encode()) % 1_000) / 100
+    return round(50_000 + seed + 2_000 * math.sin(epoch_s / 86_400) + noise, 2)
+
+
+def parse_iso(value):
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+@app.route("/v2/prices/<pair>/spot")
+def spot(pair):
+    sleep(app.config["LATENCY_S"])
+    base, currency = pair.split("-")
+    return jsonify({"data": {"amount": f"{price_at(pair, time()):.2f}", "base": base, "currency": currency}})
+
+
+@app.route("/products/<pair>/candles")
+def candles(pair):
+    sleep(app.config["LATENCY_S"])
+    granularity = request.args.get("granularity", default=60, type=int)
+    start = int(parse_iso(request.args["start"]).timestamp()) // granularity * granularity
+    end = int(parse_iso(request.args["end"]).timestamp())
+    buckets = range(start, end, granularity)
+    if len(buckets) > MAX_CANDLES:
+        return jsonify({"message": f"granularity too small for the requested time range. Count of aggregations requested exceeds {MAX_CANDLES}"}), 400
+    rows = []
+    for bucket in reversed(buckets):  # a API devolve do mais recente para o mais antigo
+        close = price_at(pair, bucket)
+        rows.append([bucket, close - 5, close + 5, close - 1, close, 1.5])
+    return jsonify(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--porta", type=int, default=8085)
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    app.config["LATENCY_S"] = args.latencia_ms / 1000
+    app.run(port=args.porta, threaded=True)
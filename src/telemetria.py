@@ -0,0 +1,269 @@
+"""Bootstrap de telemetria compartilhado: traces e métricas via OTLP em lote para o collector.
+
+Os exemplos exportavam para `ConsoleSpanExporter`/`ConsoleMetricExporter`, imprimindo JSON no
+stdout de forma síncrona. `configure_telemetry()` monta:
+- `TracerProvider` com `BatchSpanProcessor` + exporter OTLP (HTTP na 4318 ou gRPC na 4317, com gzip),
+  o mesmo collector de `exemplo_logfire/otel-collector-config.yaml` e do `exemplo_01/compose.yml`;
+- `MeterProvider` com `PeriodicExportingMetricReader` + exporter OTLP de métricas;
+- auto-métricas do próprio export:
+  - `otel_exporter_queue_size`: spans aguardando na fila do BatchSpanProcessor;
+  - `otel_exporter_batch_latency` (ms) e `otel_exporter_batch_size`: por lote exportado;
+  - `otel_exporter_dropped_spans`: spans perdidos (`reason` = queue_full | export_failed).
+
+Tamanho de lote, tamanho da fila e intervalo de envio são parâmetros (ou as variáveis OTEL_BSP_*).
+Processors extras (tail sampling, governador...) entram por `span_processor_wrappers`:
+
+    configure_telemetry(
+        "pipeline-etl",
+        span_processor_wrappers=[TelemetryGovernor, TailSamplingProcessor],
+    )
+
+Exemplars: medições feitas com um span amostrado ativo levam trace_id/span_id junto
+(`TraceBasedExemplarFilter`, o padrão do SDK). Para histogramas, `SlowestExemplarReservoir` guarda
+as medições mais lentas de cada período, então o pico de p99 de `stage_duration` aponta para o
+trace que o causou. Contadores ficam com o reservatório padrão (uma amostra por ponto).
+
+Temporalidade, allowlist de atributos e buckets explícitos: `metric_temporality` e `views` (ver
+`metricas_config.py`). Readers extras entram por `metric_readers`, no mesmo `MeterProvider` que o OTLP (ex.: o
+`PrometheusPullReader` de `metricas_prometheus.py`, que só coleta quando há scrape).
+
+Com `disk_buffer_dir` (só OTLP/HTTP) os lotes que o collector não aceitar vão para disco e são
+reenviados quando ele voltar (ver `buffer_disco.py`).
+
+O padrão é OTLP/HTTP (`opentelemetry-exporter-otlp-proto-http`, que já vem com o `logfire`), como
+o padrão de `OTEL_EXPORTER_OTLP_PROTOCOL` na especificação. `protocol="grpc"` precisa também do
+`opentelemetry-exporter-otlp-proto-grpc` (e do `grpcio`), que não estão nas dependências do projeto.
+"""
+import os
+from time import perf_counter
+
+from opentelemetry import metrics, trace
+from opentelemetry.metrics import Observation
+from opentelemetry.sdk.metrics import (
+    Exemplar,
+    ExemplarReservoir,
+    Histogram,
+    MeterProvider,
+    SimpleFixedSizeExemplarReservoir,
+)
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+from opentelemetry.sdk.metrics.view import View
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+
+GRPC_ENDPOINT = "http://localhost:4317"
+HTTP_ENDPOINT = "http://localhost:4318"
+
+
+class InstrumentedSpanExporter(SpanExporter):
+    """Mede latência, tamanho e falhas de cada lote exportado pelo exporter embrulhado."""
+
+    def __init__(self, exporter, meter, protocol):
+        self.exporter = exporter
+        self._attributes = {"protocol": protocol}
+        self._latency = meter.create_histogram(
+            "otel_exporter_batch_latency",
+            unit="ms",
+            description="Duração de cada export de lote de spans",
+        )
+        self._batch_size = meter.create_histogram(
+            "otel_exporter_batch_size",
+            unit="1",
+            description="Spans por lote exportado",
+        )
+        self.dropped = meter.create_counter(
+            "otel_exporter_dropped_spans",
+            unit="1",
+            description="Spans perdidos antes de chegar ao collector",
+        )
+
+    def export(self, spans):
+        start = perf_counter()
+        try:
+            result = self.exporter.export(spans)
+        except Exception:
+            result = SpanExportResult.FAILURE
+            raise
+        finally:
+            status = "success" if result is SpanExportResult.SUCCESS else "failure"
+            self._latency.record((perf_counter() - start) * 1000, {**self._attributes, "result": status})
+            self._batch_size.record(len(spans), self._attributes)
+            if result is not SpanExportResult.SUCCESS:
+                self.dropped.add(len(spans), {**self._attributes, "reason": "export_failed"})
+        return result
+
+    def shutdown(self):
+        self.exporter.shutdown()
+
+    def force_flush(self, timeout_millis=30_000):
+        return self.exporter.force_flush(timeout_millis)
+
+
+class InstrumentedBatchSpanProcessor(BatchSpanProcessor):
+    """BatchSpanProcessor que conta os spans descartados com a fila cheia e expõe o tamanho da fila.
+
+    A fila interna é um deque com `maxlen`: quando cheia, o SDK descarta o span mais antigo em silêncio.
+    """
+
+    def __init__(self, exporter, meter, **kwargs):
+        super().__init__(exporter, **kwargs)
+        self._dropped = exporter.dropped if isinstance(exporter, InstrumentedSpanExporter) else None
+        self._attributes = exporter._attributes if isinstance(exporter, InstrumentedSpanExporter) else {}
+        meter.create_observable_gauge(
+            "otel_exporter_queue_size",
+            callbacks=[lambda options: [Observation(self.queue_size(), self._attributes)]],
+            unit="1",
+            description="Spans aguardando export na fila do BatchSpanProcessor",
+        )
+
+    def queue_size(self):
+        return len(self._batch_processor._queue)
+
+    def on_end(self, span):
+        queue = self._batch_processor._queue
+        if self._dropped is not None and span.context.trace_flags.sampled and len(queue) >= queue.maxlen:
+            self._dropped.add(1, {**self._attributes, "reason": "queue_full"})
+        super().on_end(span)
+
+
+class SlowestExemplarReservoir(ExemplarReservoir):
+    """Guarda como exemplars as `size` maiores medições de cada período de coleta.
+
+    O reservatório padrão guarda uma amostra aleatória (histograma exponencial) ou a última de cada
+    bucket; para investigar um pico de latência o que interessa são os traces mais lentos. Só
+    recebe medições que passaram pelo exemplar filter, ou seja, com span amostrado ativo.
+    """
+
+    def __init__(self, size=4, **kwargs):
+        self._size = size
+        self._slots = []  # [valor, time_unix_nano, atributos, span_context]
+
+    def offer(self, value, time_unix_nano, attributes, context):
+        slots = self._slots
+        if len(slots) < self._size:
+            slots.append([value, time_unix_nano, attributes, trace.get_current_span(context).get_span_context()])
+            return
+        smallest = min(slots, key=lambda slot: slot[0])
+        if value > smallest[0]:
+            smallest[:] = value, time_unix_nano, attributes, trace.get_current_span(context).get_span_context()
+
+    def collect(self, point_attributes):
+        exemplars = []
+        for value, time_unix_nano, attributes, span_context in sorted(self._slots, key=lambda slot: slot[0]):
+            # Como no SDK: o exemplar só leva os atributos que não estão no ponto
+            filtered = {k: v for k, v in attributes.items() if k not in point_attributes} if attributes else None
+            valid = span_context.is_valid
+            exemplars.append(Exemplar(
+                filtered,
+                value,
+                time_unix_nano,
+                span_context.span_id if valid else None,
+                span_context.trace_id if valid else None,
+            ))
+        self._slots = []
+        return exemplars
+
+
+def slowest_exemplar_reservoir(aggregation_type):
+    # Em Views que também casam com contadores, estes ficam com o reservatório padrão do SDK
+    if aggregation_type.__name__.endswith("HistogramAggregation"):
+        return SlowestExemplarReservoir
+    return SimpleFixedSizeExemplarReservoir
+
+
+# Todos os histogramas (explícitos ou exponenciais) guardam os exemplars das medições mais lentas
+EXEMPLAR_VIEWS = (View(instrument_type=Histogram, exemplar_reservoir_factory=slowest_exemplar_reservoir),)
+
+
+def otlp_exporters(protocol="http", endpoint=None, compression="gzip", headers=None, **metric_exporter_kwargs):
+    """Cria o par (span exporter, metric exporter) OTLP para o protocolo escolhido."""
+    if protocol == "grpc":
+        from grpc import Compression as GrpcCompression
+        from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+
+        endpoint = endpoint or GRPC_ENDPOINT
+        grpc_compression = GrpcCompression.Gzip if compression == "gzip" else GrpcCompression.NoCompression
+        insecure = endpoint.startswith("http://")
+        return (
+            OTLPSpanExporter(endpoint=endpoint, insecure=insecure, compression=grpc_compression, headers=headers),
+            OTLPMetricExporter(endpoint=endpoint, insecure=insecure, compression=grpc_compression, headers=headers, **metric_exporter_kwargs),
+        )
+    if protocol in ("http", "http/protobuf"):
+        from opentelemetry.exporter.otlp.proto.http import Compression as HttpCompression
+        from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        endpoint = (endpoint or HTTP_ENDPOINT).rstrip("/")
+        http_compression = HttpCompression(compression or "none")
+        return (
+            OTLPSpanExporter(endpoint=f"{endpoint}/v1/traces", compression=http_compression, headers=headers),
+            OTLPMetricExporter(endpoint=f"{endpoint}/v1/metrics", compression=http_compression, headers=headers, **metric_exporter_kwargs),
+        )
+    raise ValueError(f"Protocolo OTLP desconhecido: {protocol!r} (use 'grpc' ou 'http')")
+
+
+def configure_telemetry(
+    service_name="pipeline-etl",
+    protocol=None,
+    endpoint=None,
+    compression="gzip",
+    headers=None,
+    max_export_batch_size=None,
+    max_queue_size=None,
+    schedule_delay_millis=None,
+    export_interval_millis=10_000,
+    resource_attributes=None,
+    span_processor_wrappers=(),
+    disk_buffer_dir=None,
+    exemplar_filter=None,
+    views=EXEMPLAR_VIEWS,
+    metric_readers=(),
+    metric_temporality=None,
+    set_global=True,
+):
+    """Configura traces e métricas OTLP em lote. Devolve (tracer_provider, meter_provider)."""
+    protocol = protocol or os.getenv("OTEL_EXPORTER_OTLP_PROTOCOL", "http/protobuf")
+    endpoint = endpoint or os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+    resource = Resource(attributes={SERVICE_NAME: service_name, **(resource_attributes or {})})
+    if disk_buffer_dir:
+        if protocol not in ("http", "http/protobuf"):
+            raise ValueError("disk_buffer_dir só funciona com protocol='http'")
+        from buffer_disco import DiskBufferedMetricExporter, DiskBufferedSpanExporter
+
+        endpoint = endpoint or HTTP_ENDPOINT
+        span_exporter = DiskBufferedSpanExporter(endpoint, os.path.join(disk_buffer_dir, "traces"), headers=headers)
+        metric_exporter = DiskBufferedMetricExporter(
+            endpoint, os.path.join(disk_buffer_dir, "metrics"), preferred_temporality=metric_temporality, headers=headers
+        )
+    else:
+        span_exporter, metric_exporter = otlp_exporters(
+            protocol, endpoint, compression, headers, preferred_temporality=metric_temporality
+        )
+
+    metric_reader = PeriodicExportingMetricReader(metric_exporter, export_interval_millis=export_interval_millis)
+    meter_provider = MeterProvider(
+        resource=resource,
+        metric_readers=[metric_reader, *metric_readers],  # ex.: PrometheusPullReader ao lado do OTLP
+        views=views,
+        exemplar_filter=exemplar_filter,  # None: OTEL_METRICS_EXEMPLAR_FILTER ou trace_based
+    )
+    self_meter = meter_provider.get_meter("telemetria")
+
+    processor = InstrumentedBatchSpanProcessor(
+        InstrumentedSpanExporter(span_exporter, self_meter, protocol),
+        self_meter,
+        max_queue_size=max_queue_size,
+        max_export_batch_size=max_export_batch_size,
+        schedule_delay_millis=schedule_delay_millis,
+    )
+    for wrapper in span_processor_wrappers:
+        processor = wrapper(processor)
+    tracer_provider = TracerProvider(resource=resource)
+    tracer_provider.add_span_processor(processor)
+
+    if set_global:
+        trace.set_tracer_provider(tracer_provider)
+        metrics.set_meter_provider(meter_provider)
+    return tracer_provider, meter_provider
@@ -0,0 +1,194 @@
+"""Quebra do tempo das requisições HTTP do extract: DNS, connect, TLS, TTFB e download.
+
+O `logfire.instrument_requests()` dá um span por chamada, então não dá para saber se um `extract()`
+lento foi resolução de nome, conexão TCP, handshake TLS, tempo do servidor ou transferência do
+corpo. `timed_session()` devolve uma `requests.Session` com um adapter cujas conexões urllib3
+medem cada fase:
+- `dns`: `getaddrinfo` do host;
+- `connect`: conexão TCP;
+- `tls`: handshake TLS (só HTTPS);
+- `ttfb`: do fim do envio da requisição até ler os headers da resposta (tempo do servidor + rede);
+- `download`: leitura do corpo.
+
+Em conexões reaproveitadas do pool só existem `ttfb` e `download`. Cada fase vira:
+- um evento `http.<fase>` no span atual (o da requisição, com `instrument_requests`), mais os
+  atributos `http.timing.<fase>_ms` e `http.connection.reused`;
+- um ponto do histograma `http_client_phase_duration` (ms), por `server.address` e `phase`.
+O contador `http_client_connections` separa requisições em conexão nova ou reaproveitada, para
+medir quanto o reuso (ou uma região mais perto) economizaria.
+
+Uso:
+
+    http = timed_session()
+    response = http.get(URL)
+"""
+import socket
+import threading
+from time import perf_counter_ns, time_ns
+
+import requests
+from opentelemetry import metrics, trace
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NameResolutionError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+PHASES = ("dns", "connect", "tls", "ttfb", "download")
+
+_meter = metrics.get_meter("pipeline_etl.http")
+phase_duration = _meter.create_histogram(
+    "http_client_phase_duration",
+    unit="ms",
+    description="Duração de cada fase das requisições HTTP (dns, connect, tls, ttfb, download)",
+)
+connections = _meter.create_counter(
+    "http_client_connections",
+    unit="1",
+    description="Requisições HTTP por tipo de conexão (nova ou reaproveitada do pool)",
+)
+
+_current = threading.local()
+
+
+class RequestTimings:
+    """Marcas de tempo de uma requisição; preenchidas pelas conexões e gravadas pelo adapter."""
+
+    __slots__ = ("started_perf", "started_wall", "phases", "reused", "_sent_at")
+
+    def __init__(self):
+        self.started_perf = perf_counter_ns()
+        self.started_wall = time_ns()
+        self.phases = {}  # fase -> (fim em perf_counter_ns, duração em ns)
+        self.reused = True
+        self._sent_at = None
+
+    def mark(self, phase, start, end):
+        self.phases[phase] = (end, end - start)
+
+    def record(self, host):
+        attributes = {"server.address": host}
+        connections.add(1, {**attributes, "connection": "reused" if self.reused else "new"})
+        span = trace.get_current_span()
+        recording = span.is_recording()
+        for phase in PHASES:
+            if phase not in self.phases:
+                continue
+            end, duration = self.phases[phase]
+            duration_ms = duration / 1e6
+            phase_duration.record(duration_ms, {**attributes, "phase": phase})
+            if recording:
+                span.set_attribute(f"http.timing.{phase}_ms", duration_ms)
+                span.add_event(
+                    f"http.{phase}",
+                    {"duration_ms": duration_ms},
+                    timestamp=self.started_wall + (end - self.started_perf),
+                )
+        if recording:
+            span.set_attribute("http.connection.reused", self.reused)
+
+
+class _TimedConnectionMixin:
+    def _new_conn(self):
+        timings = getattr(_current, "timings", None)
+        if timings is None:
+            return super()._new_conn()
+        start = perf_counter_ns()
+        try:
+            infos = socket.getaddrinfo(self._dns_host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        resolved = perf_counter_ns()
+        timings.mark("dns", start, resolved)
+        # Conecta direto nos IPs já resolvidos (a urllib3 resolveria de novo), tentando cada um em ordem
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        dns_host = self._dns_host
+        try:
+            for index, address in enumerate(addresses):
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except NewConnectionError:
+                    if index == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = dns_host
+        timings.mark("connect", resolved, perf_counter_ns())
+        return sock
+
+    def connect(self):
+        timings = getattr(_current, "timings", None)
+        start = perf_counter_ns()
+        super().connect()
+        if timings is not None:
+            timings.reused = False
+            if "connect" in timings.phases:
+                connected_at = timings.phases["connect"][0]
+                if isinstance(self, HTTPSConnection):
+                    timings.mark("tls", connected_at, perf_counter_ns())
+            else:
+                timings.mark("connect", start, perf_counter_ns())
+
+    def request(self, *args, **kwargs):
+        super().request(*args, **kwargs)
+        timings = getattr(_current, "timings", None)
+        if timings is not None:
+            timings._sent_at = perf_counter_ns()
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)
+        timings = getattr(_current, "timings", None)
+        if timings is not None and timings._sent_at is not None:
+            timings.mark("ttfb", timings._sent_at, perf_counter_ns())
+        return response
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter cujas conexões medem as fases de cada requisição."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+    def send(self, request, stream=False, **kwargs):
+        timings = _current.timings = RequestTimings()
+        try:
+            response = super().send(request, stream=stream, **kwargs)
+            if not stream:
+                # Lê o corpo aqui (a Session leria logo depois) para medir o download
+                start = perf_counter_ns()
+                response.content
+                timings.mark("download", start, perf_counter_ns())
+        finally:
+            _current.timings = None
+        timings.record(requests.utils.urlparse(request.url).hostname)
+        return response
+
+
+def timed_session():
+    """`requests.Session` com o `TimedHTTPAdapter` montado para http e https."""
+    session = requests.Session()
+    adapter = TimedHTTPAdapter()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session